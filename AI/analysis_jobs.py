@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Jobbkø for /analyze.
+
+En full analyse (mapping + CatBoost + VC-vurdering med LLaMA) kan ta opptil
+et par minutter. I stedet for å holde HTTP-forbindelsen åpen hele tiden:
+- POST /analyze/jobs legger jobben i køen og svarer med en jobb-id med en gang
+- et fast antall asyncio-arbeidere kjører analysene
+- resultatet ligger i et lokalt lager (i minnet, med TTL) og hentes med
+  GET /analyze/jobs/{id}, eventuelt med long-poll (?wait=sekunder)
+
+Identiske innsendinger (samme normaliserte forespørsel) mens en jobb
+fortsatt står i kø eller kjører, får samme jobb-id i stedet for en ny jobb.
+
+Lageret ligger i prosessen, så tjenesten må kjøres med én uvicorn-worker
+for at polling skal treffe samme jobb.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 256))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 600))
+JOB_MAX_POLL_WAIT = float(os.environ.get("JOB_MAX_POLL_WAIT", 30))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PURGE_INTERVAL = 1.0
+
+JobRunner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFull(RuntimeError):
+    """For mange jobber venter allerede i køen."""
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """
+    Nøkkel for deduplisering: tomme felt fjernes og tekst normaliseres
+    (whitespace), så samme idé sendt to ganger gir samme nøkkel.
+    """
+    normalized = {}
+    for name, value in payload.items():
+        if isinstance(value, str):
+            value = _WHITESPACE_RE.sub(" ", value).strip()
+        if value is None or value == "":
+            continue
+        normalized[name] = value
+    encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    payload: Dict[str, Any]
+    status: str = STATUS_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (STATUS_DONE, STATUS_FAILED)
+
+
+class AnalysisJobQueue:
+    """Arbeiderpool + resultatlager for analysejobber."""
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = JOB_WORKERS,
+        max_pending: int = JOB_MAX_PENDING,
+        result_ttl: float = JOB_RESULT_TTL,
+    ) -> None:
+        self.runner = runner
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+
+        self._jobs: Dict[str, Job] = {}
+        self._inflight: Dict[str, str] = {}  # nøkkel -> jobb-id
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._last_purge = 0.0
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # ---------- livssyklus ----------
+
+    def start(self) -> None:
+        """Starter arbeiderne i gjeldende event-loop (gjøres også ved første submit)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"analysis-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    # ---------- offentlig API ----------
+
+    def submit(self, payload: Dict[str, Any]) -> Tuple[Job, bool]:
+        """
+        Legger en analyse i køen. Returnerer (jobb, deduplisert) – deduplisert
+        er True hvis en identisk jobb allerede var i kø eller kjørte.
+        """
+        self.start()
+        self._purge_expired()
+
+        key = request_key(payload)
+        existing_id = self._inflight.get(key)
+        if existing_id is not None:
+            existing = self._jobs.get(existing_id)
+            if existing is not None and not existing.finished:
+                self.deduplicated += 1
+                return existing, True
+
+        assert self._queue is not None
+        if self._queue.qsize() >= self.max_pending:
+            self.rejected += 1
+            raise JobQueueFull(f"{self._queue.qsize()} analysejobber venter allerede")
+
+        job = Job(id=uuid.uuid4().hex, key=key, payload=payload)
+        self._jobs[job.id] = job
+        self._inflight[key] = job.id
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Long-poll: venter til jobben er ferdig, eller maks `timeout` sekunder."""
+        job = self.get(job_id)
+        if job is None or job.finished or timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=min(timeout, JOB_MAX_POLL_WAIT))
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": len(self._tasks),
+            "queued": statuses.count(STATUS_QUEUED),
+            "running": statuses.count(STATUS_RUNNING),
+            "stored": len(statuses),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    # ---------- internt ----------
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            job: Job = await queue.get()
+            try:
+                await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = STATUS_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = await self.runner(job.payload)
+            job.status = STATUS_DONE
+            self.completed += 1
+        except asyncio.CancelledError:
+            job.status = STATUS_FAILED
+            job.error = "Avbrutt (tjenesten stenges ned)"
+            raise
+        except Exception as exc:
+            job.status = STATUS_FAILED
+            job.error = str(getattr(exc, "detail", None) or exc) or type(exc).__name__
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+            if self._inflight.get(job.key) == job.id:
+                del self._inflight[job.key]
+            job.done.set()
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        if now - self._last_purge < _PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for AI-tjenesten. Kjøres fra AI-mappen, f.eks.:
+    python -m benchmarks.prompt_prefix
+
+- fake_ollama:  lokal Ollama-stand-in med styrbar latens, token-rate og feil
+- load_test:    fast-RPS-last mot /analyze med p50/p95/p99 og regresjonssjekk
+- model_micro:  preprocess_features, predict_success_score(s) og scorer-backendene
+- preprocess_large: tid og minne for feature-pipelinen på 1M rader, mot gammel versjon
+- prompt_prefix: prompt-evaluering med/uten fast prefiks (krever ekte Ollama)
+"""
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Lokal stand-in for Ollama (/api/generate) til last- og regresjonstester.
+
+Svarer med gyldig innhold for hver kall-type tjenesten bruker (VC-JSON,
+single-shot med `format`, kategori, idé-score, forklaring), så hele
+pipelinen kjøres uten GPU og uten modellen. Tidsbruken styres som hos en
+ekte modell:
+
+- --latency:      tid før første token (modell-last/prompt-evaluering)
+- --tokens-per-second: genereringshastighet (ett token ≈ 4 tegn)
+- --parallel:     hvor mange genereringer som kjører samtidig (som
+                  OLLAMA_NUM_PARALLEL); resten venter i kø
+- --failure-rate + --failure-mode: andel kall som feiler, og hvordan
+    error      HTTP 500
+    overload   HTTP 503
+    hang       svarer ikke før --hang-seconds (tester timeouts)
+    malformed  svarer med tekst som ikke er JSON / ikke en kategori
+    truncate   stopper strømmen midt i svaret
+
+Svarene er deterministiske per prompt (--seed), så cache og single-flight
+oppfører seg som mot en ekte modell med temperature 0.
+
+    cd AI
+    python -m benchmarks.fake_ollama --port 11434 --latency 0.3 --tokens-per-second 40
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+from ollama_explainer import (
+    CATEGORY_NAME_SYSTEM,
+    CATEGORY_SYSTEM,
+    EXPLAIN_SYSTEM,
+    MODEL_NAME,
+    SCORE_SYSTEM,
+    VC_SYSTEM,
+)
+from vc_stream_parser import VC_BLOCKS
+
+FAILURE_MODES = ("error", "overload", "hang", "malformed", "truncate")
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class FakeOllamaConfig:
+    latency: float = 0.2
+    tokens_per_second: float = 50.0
+    parallel: int = 1
+    failure_rate: float = 0.0
+    failure_mode: str = "error"
+    hang_seconds: float = 600.0
+    seed: int = 42
+
+
+class FakeOllama:
+    """Genererer svar og holder tellere; delt av alle request-trådene."""
+
+    def __init__(self, config: FakeOllamaConfig) -> None:
+        if config.failure_mode not in FAILURE_MODES:
+            raise ValueError(f"Ukjent failure_mode: {config.failure_mode}")
+        self.config = config
+        self._slots = threading.BoundedSemaphore(max(1, config.parallel))
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    # ---------- innhold ----------
+
+    def _digest(self, payload: Dict[str, Any]) -> int:
+        key = f"{self.config.seed}|{payload.get('system', '')}|{payload.get('prompt', '')}"
+        return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+
+    def _vc_blocks(self, digest: int) -> Dict[str, Dict[str, Any]]:
+        rng = random.Random(digest)
+        return {
+            name: {
+                "score": round(rng.uniform(3.0, 9.0), 1),
+                "comment": f"Syntetisk vurdering av {name} for lasttest.",
+            }
+            for name in VC_BLOCKS
+        }
+
+    def response_text(self, payload: Dict[str, Any]) -> str:
+        """Svaret en modell ville gitt på denne payloaden."""
+        system = payload.get("system", "")
+        prompt = payload.get("prompt", "")
+        digest = self._digest(payload)
+
+        if payload.get("format"):
+            # Single-shot: velg første kandidat for hvert kategorifelt
+            head = prompt.split("\n\nStartup-data", 1)[0]
+            sections = re.split(r"\n\n(?=tech_category)", head, maxsplit=1)
+            answer: Dict[str, Any] = {"market_category": None, "tech_category": None}
+            for field_name, section in zip(("market_category", "tech_category"), sections):
+                if "(fritekst)" in section:
+                    candidates = re.findall(r"^- (.+)$", section, flags=re.M)
+                    answer[field_name] = candidates[0] if candidates else "Software"
+            return json.dumps({**answer, **self._vc_blocks(digest)}, ensure_ascii=False)
+
+        if system == VC_SYSTEM or "venture capital" in prompt:
+            # Som llama: pen JSON og litt hale etterpå
+            body = json.dumps(self._vc_blocks(digest), ensure_ascii=False, indent=2)
+            return f"{body}\n\nHåper dette var nyttig!"
+
+        if system == CATEGORY_SYSTEM:
+            candidates = re.findall(r"^- (.+)$", prompt, flags=re.M)
+            return candidates[digest % len(candidates)] if candidates else "Software"
+
+        if system == CATEGORY_NAME_SYSTEM:
+            return ("Software", "Health Care", "E-Commerce", "Education")[digest % 4]
+
+        if system == SCORE_SYSTEM:
+            return str(20 + digest % 70)
+
+        if system == EXPLAIN_SYSTEM:
+            return " ".join(["Syntetisk forklaring av scoren."] * 40)
+
+        return "OK"
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            failed = self._rng.random() < self.config.failure_rate
+            self.failures += int(failed)
+        return failed
+
+    # ---------- timing ----------
+
+    def _tokens(self, text: str) -> List[str]:
+        return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+
+    def _token_delay(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1.0 / rate if rate > 0 else 0.0
+
+    def _final_chunk(self, payload: Dict[str, Any], tokens: List[str], started: float) -> Dict[str, Any]:
+        prompt_chars = len(payload.get("system", "")) + len(payload.get("prompt", ""))
+        return {
+            "model": payload.get("model", MODEL_NAME),
+            "response": "",
+            "done": True,
+            "prompt_eval_count": max(1, prompt_chars // CHARS_PER_TOKEN),
+            "prompt_eval_duration": int(self.config.latency * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(len(tokens) * self._token_delay() * 1e9),
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+        }
+
+    def _limit(self, payload: Dict[str, Any], tokens: List[str]) -> List[str]:
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        if isinstance(num_predict, int) and num_predict >= 0:
+            return tokens[:num_predict]
+        return tokens
+
+    def generate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with self._slots:
+            time.sleep(self.config.latency)
+            tokens = self._limit(payload, self._tokens(self.response_text(payload)))
+            time.sleep(len(tokens) * self._token_delay())
+        return {**self._final_chunk(payload, tokens, started), "response": "".join(tokens)}
+
+    def stream(self, payload: Dict[str, Any], truncate: bool = False) -> Iterator[Dict[str, Any]]:
+        started = time.perf_counter()
+        with self._slots:
+            time.sleep(self.config.latency)
+            tokens = self._limit(payload, self._tokens(self.response_text(payload)))
+            if truncate:
+                tokens = tokens[: len(tokens) // 2]
+            delay = self._token_delay()
+            for token in tokens:
+                time.sleep(delay)
+                yield {"model": payload.get("model", MODEL_NAME), "response": token, "done": False}
+        if not truncate:
+            yield self._final_chunk(payload, tokens, started)
+
+
+def _make_handler(fake: FakeOllama) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self) -> None:
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": MODEL_NAME, "model": MODEL_NAME}]})
+            elif self.path == "/api/version":
+                self._send_json(200, {"version": "fake"})
+            elif self.path == "/stats":
+                self._send_json(200, {"requests": fake.requests, "failures": fake.failures})
+            else:
+                self._send_json(200, {"status": "Ollama is running (fake)"})
+
+        def do_POST(self) -> None:
+            if self.path != "/api/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            truncate = False
+            if payload.get("prompt") and fake._should_fail():
+                mode = fake.config.failure_mode
+                if mode == "error":
+                    self._send_json(500, {"error": "fake internal error"})
+                    return
+                if mode == "overload":
+                    self._send_json(503, {"error": "server busy, please try again"})
+                    return
+                if mode == "hang":
+                    time.sleep(fake.config.hang_seconds)
+                    self._send_json(500, {"error": "fake hang"})
+                    return
+                if mode == "malformed":
+                    payload = {**payload, "system": "", "prompt": "", "format": None}
+                truncate = mode == "truncate"
+
+            if not payload.get("stream", True):
+                self._send_json(200, fake.generate(payload))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for chunk in fake.stream(payload, truncate=truncate):
+                    self._write_chunk((json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # klienten avbrøt strømmen (VC-parseren er ferdig)
+            if truncate:
+                self.close_connection = True
+
+    return Handler
+
+
+def start_fake_ollama(
+    config: Optional[FakeOllamaConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> ThreadingHTTPServer:
+    """
+    Starter serveren i en bakgrunnstråd (port=0 gir ledig port). Adressen
+    er server.server_address; stopp med server.shutdown().
+    """
+    fake = FakeOllama(config or FakeOllamaConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(fake))
+    server.daemon_threads = True
+    server.fake = fake  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="sekunder før første token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="error")
+    parser.add_argument("--hang-seconds", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        parallel=args.parallel,
+        failure_rate=args.failure_rate,
+        failure_mode=args.failure_mode,
+        hang_seconds=args.hang_seconds,
+        seed=args.seed,
+    )
+    server = start_fake_ollama(config, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"[fake_ollama] Lytter på http://{host}:{port} ({config})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Lastgenerator for POST /analyze (eller /analyze/jobs) med fast RPS.
+
+Forespørslene sendes etter en fast tidsplan (open loop): forespørsel i
+starter på t0 + i/rps uansett hvor trege de forrige var, og latensen måles
+fra planlagt starttid. Da skjuler ikke en treg tjeneste sin egen kø
+(coordinated omission).
+
+Rapporterer p50/p95/p99/max-latens, throughput og feilrate per type, og
+tid per steg fra Server-Timing når tjenesten kjører med SERVER_TIMING=1.
+Med --json lagres resultatet; med --baseline sammenlignes mot et tidligere
+resultat og prosessen avslutter med kode 1 ved regresjon.
+
+Typisk oppsett uten GPU (tre terminaler, fra AI-mappen):
+    python -m benchmarks.fake_ollama --latency 0.3 --tokens-per-second 40
+    SERVER_TIMING=1 uvicorn service:app --port 8000
+    python -m benchmarks.load_test --rps 5 --duration 60 --json resultat.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+PITCHES = [
+    "En app som matcher frivillige med idrettslag som mangler trenere og dommere.",
+    "Abonnement på reparasjon av sykler for bedrifter, hentet og levert på arbeidsplassen.",
+    "AI-verktøy som lager ukeplaner for lærere ut fra læreplanmål og elevenes nivå.",
+    "Markedsplass for brukte byggematerialer fra riving, med logistikk og sertifisering.",
+    "Sensorer for fuktmåling i hytter, med varsel på mobil og forsikringsrabatt.",
+    "A B2B platform that automates invoice reconciliation for small accounting firms.",
+]
+MARKETS = ["utdanning", "eiendom", "Health Care", "fintech", "E-Commerce", "idrett og frivillighet"]
+TECH = ["mobilapp", "maskinlæring", "SaaS", "IoT-sensorer", "Software", "markedsplass"]
+GEOGRAPHY = [("NOR", "Oslo", "Oslo"), ("USA", "SF Bay Area", "San Francisco"), ("GBR", "London", "London")]
+
+
+def make_request(i: int, unique_ratio: float, rng: random.Random) -> Dict[str, Any]:
+    """
+    Body til /analyze. Med unique_ratio=1 er hver pitch unik (ingen cache-
+    eller single-flight-treff); med 0 gjentas et lite sett.
+    """
+    k = rng.randrange(len(PITCHES))
+    content = PITCHES[k]
+    if rng.random() < unique_ratio:
+        content = f"{content} Variant {i}-{rng.randrange(10**9)}."
+    country, region, city = GEOGRAPHY[k % len(GEOGRAPHY)]
+    return {
+        "title": f"Lasttest {k}",
+        "content": content,
+        "market": MARKETS[k],
+        "tech_service": TECH[k],
+        "team_description": "To gründere med bransjeerfaring.",
+        "country": country,
+        "region": region,
+        "city": city,
+        "funding_total": float(rng.choice([0, 50_000, 500_000, 5_000_000])),
+        "funding_rounds": rng.randrange(0, 4),
+    }
+
+
+@dataclass
+class LoadResult:
+    latencies: List[float] = field(default_factory=list)  # kun vellykkede, sekunder
+    errors: Counter = field(default_factory=Counter)
+    stage_ms: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    sent: int = 0
+    elapsed: float = 0.0
+
+    def record_server_timing(self, header: Optional[str]) -> None:
+        for part in (header or "").split(","):
+            name, _, params = part.strip().partition(";")
+            if params.startswith("dur="):
+                self.stage_ms[name].append(float(params[4:]))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(result: LoadResult) -> Dict[str, Any]:
+    ok = len(result.latencies)
+    ms = [s * 1000 for s in result.latencies]
+    return {
+        "sent": result.sent,
+        "ok": ok,
+        "errors": dict(result.errors),
+        "error_rate": (result.sent - ok) / result.sent if result.sent else 0.0,
+        "elapsed_seconds": round(result.elapsed, 2),
+        "throughput_rps": ok / result.elapsed if result.elapsed else 0.0,
+        "latency_ms": {
+            "p50": _percentile(ms, 50),
+            "p95": _percentile(ms, 95),
+            "p99": _percentile(ms, 99),
+            "max": max(ms) if ms else float("nan"),
+            "mean": statistics.mean(ms) if ms else float("nan"),
+        },
+        "stages_ms_p50": {name: statistics.median(v) for name, v in result.stage_ms.items()},
+        "stages_ms_p95": {name: _percentile(v, 95) for name, v in result.stage_ms.items()},
+    }
+
+
+async def _analyze_direct(client: httpx.AsyncClient, body: Dict[str, Any], timeout: float) -> httpx.Response:
+    return await client.post("/analyze", json=body, timeout=timeout)
+
+
+async def _analyze_job(client: httpx.AsyncClient, body: Dict[str, Any], timeout: float) -> httpx.Response:
+    # Samme flyt som backend: send jobb, long-poll til den er ferdig
+    deadline = time.monotonic() + timeout
+    resp = await client.post("/analyze/jobs", json=body, timeout=timeout)
+    if resp.status_code != 202:
+        return resp
+    job_id = resp.json()["job_id"]
+    while True:
+        wait = min(20.0, max(0.0, deadline - time.monotonic()))
+        resp = await client.get(f"/analyze/jobs/{job_id}", params={"wait": wait}, timeout=wait + 5)
+        if resp.status_code != 200 or resp.json().get("status") in ("done", "failed"):
+            return resp
+        if time.monotonic() >= deadline:
+            raise httpx.ReadTimeout("jobben ble ikke ferdig innen timeout")
+
+
+async def _one(
+    client: httpx.AsyncClient,
+    body: Dict[str, Any],
+    scheduled: float,
+    result: LoadResult,
+    use_jobs: bool,
+    timeout: float,
+) -> None:
+    call = _analyze_job if use_jobs else _analyze_direct
+    try:
+        resp = await call(client, body, timeout)
+    except httpx.TimeoutException:
+        result.errors["timeout"] += 1
+        return
+    except httpx.TransportError as exc:
+        result.errors[type(exc).__name__] += 1
+        return
+
+    if resp.status_code != 200:
+        result.errors[f"http_{resp.status_code}"] += 1
+        return
+    if use_jobs and resp.json().get("status") == "failed":
+        result.errors["job_failed"] += 1
+        return
+    result.latencies.append(time.perf_counter() - scheduled)
+    result.record_server_timing(resp.headers.get("server-timing"))
+
+
+async def run_load(
+    base_url: str,
+    rps: float,
+    duration: float,
+    unique_ratio: float = 1.0,
+    use_jobs: bool = False,
+    timeout: float = 150.0,
+    max_connections: int = 200,
+    seed: int = 42,
+) -> LoadResult:
+    rng = random.Random(seed)
+    total = max(1, int(rps * duration))
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        started = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = make_request(i, unique_ratio, rng)
+            tasks.append(asyncio.create_task(_one(client, body, scheduled, result, use_jobs, timeout)))
+            result.sent += 1
+        await asyncio.gather(*tasks)
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regresjoner (tekst) der nåværende kjøring er dårligere enn baseline."""
+    problems = []
+    for q in ("p50", "p95", "p99"):
+        before, now = baseline["latency_ms"][q], current["latency_ms"][q]
+        if before and now > before * (1 + tolerance):
+            problems.append(f"{q}: {now:.0f} ms mot {before:.0f} ms (+{(now / before - 1) * 100:.0f} %)")
+    if current["error_rate"] > baseline["error_rate"] + 0.01:
+        problems.append(f"feilrate: {current['error_rate']:.1%} mot {baseline['error_rate']:.1%}")
+    if current["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        problems.append(
+            f"throughput: {current['throughput_rps']:.2f} mot {baseline['throughput_rps']:.2f} req/s"
+        )
+    return problems
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    lat = summary["latency_ms"]
+    print(f"Sendt: {summary['sent']}  OK: {summary['ok']}  feilrate: {summary['error_rate']:.1%}")
+    if summary["errors"]:
+        print("Feil: " + ", ".join(f"{k}={v}" for k, v in sorted(summary["errors"].items())))
+    print(f"Throughput: {summary['throughput_rps']:.2f} req/s over {summary['elapsed_seconds']} s")
+    print(
+        f"Latens (ms): p50={lat['p50']:.0f}  p95={lat['p95']:.0f}  p99={lat['p99']:.0f}  "
+        f"max={lat['max']:.0f}  snitt={lat['mean']:.0f}"
+    )
+    if summary["stages_ms_p50"]:
+        print(f"{'steg':<20} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, p50 in summary["stages_ms_p50"].items():
+            print(f"{name:<20} {p50:>9.1f} {summary['stages_ms_p95'][name]:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="sekunder med sending")
+    parser.add_argument("--unique-ratio", type=float, default=1.0, help="andel unike pitcher (0–1)")
+    parser.add_argument("--jobs", action="store_true", help="bruk /analyze/jobs + long-poll som backend")
+    parser.add_argument("--timeout", type=float, default=150.0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="lagre resultatet som JSON")
+    parser.add_argument("--baseline", help="JSON fra en tidligere kjøring å sammenligne mot")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="tillatt forverring (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run_load(
+            args.url,
+            args.rps,
+            args.duration,
+            unique_ratio=args.unique_ratio,
+            use_jobs=args.jobs,
+            timeout=args.timeout,
+            max_connections=args.max_connections,
+            seed=args.seed,
+        )
+    )
+    summary = summarize(result)
+    summary["config"] = {k: v for k, v in vars(args).items() if k not in ("json", "baseline")}
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(summary, json.load(f), args.tolerance)
+        if problems:
+            print("\nREGRESJON mot baseline:")
+            for problem in problems:
+                print(f"- {problem}")
+            sys.exit(1)
+        print("\nIngen regresjon mot baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Mikro-benchmarks for data-modellen: preprocess_features,
+predict_success_score / predict_success_scores og scorer-backendene
+(scorers.py) direkte på ferdig preprosesserte rader.
+
+Uten --model trenes en liten CatBoost-modell på syntetiske rader i en
+midlertidig mappe, så målingene kan kjøres overalt (uten datasettet og
+uten den ekte modellen). Tallene er da sammenlignbare mellom commits,
+men ikke med produksjonsmodellen. Den syntetiske modellen eksporteres
+også (export_model), så eksport-backendene kan måles; med --model brukes
+eksporten i --export-dir.
+
+    cd AI
+    python -m benchmarks.model_micro
+    python -m benchmarks.model_micro --model catboost_startup_success.cbm \\
+        --metadata preprocess_metadata.joblib --rows 1,100,10000
+    python -m benchmarks.model_micro --backends catboost,numpy,python
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, Tuple
+
+import joblib
+from catboost import CatBoostClassifier, Pool
+
+from benchmarks.synthetic import synthetic_requests, synthetic_startups
+from scorers import MODEL_EXPORT_DIR, CatBoostScorer, Scorer, create_export_scorer
+from train_startup_model import (
+    build_target,
+    export_model,
+    get_model_registry,
+    predict_success_score,
+    predict_success_scores,
+    preprocess_features,
+)
+
+
+def _train_synthetic_model(directory: str, rows: int = 5000) -> Tuple[str, str]:
+    df = synthetic_startups(rows, seed=7)
+    df.to_csv(os.path.join(directory, "startups.csv"), index=False)
+    y, unknown = build_target(df)
+    X, metadata = preprocess_features(df[~unknown].reset_index(drop=True), is_train=True)
+    model = CatBoostClassifier(
+        iterations=300, depth=6, random_seed=42, verbose=False, train_dir=os.path.join(directory, "catboost_info")
+    )
+    model.fit(Pool(X, label=y[~unknown].reset_index(drop=True), cat_features=metadata.cat_feature_indices))
+
+    model_path = os.path.join(directory, "model.cbm")
+    metadata_path = os.path.join(directory, "metadata.joblib")
+    model.save_model(model_path)
+    joblib.dump(metadata, metadata_path)
+    return model_path, metadata_path
+
+
+def bench(fn: Callable[[], object], repeats: int, min_seconds: float = 0.2) -> Dict[str, float]:
+    """Kjører fn i runder til både repeats og min_seconds er nådd; tider i ms."""
+    fn()  # oppvarming (registry, lazy imports)
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeats or time.perf_counter() - started < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+        if len(times) >= repeats * 100:
+            break
+    return {
+        "runs": len(times),
+        "p50_ms": statistics.median(times),
+        "min_ms": min(times),
+        "p95_ms": statistics.quantiles(times, n=20)[-1] if len(times) > 1 else times[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="CatBoost-modell (.cbm); uten denne trenes en syntetisk")
+    parser.add_argument("--metadata", help="preprocess-metadata (.joblib) til --model")
+    parser.add_argument("--rows", default="1,100,10000", help="batch-størrelser, kommaseparert")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument(
+        "--backends", default="catboost,numpy", help="scorer-backends å måle direkte, kommaseparert (tom: ingen)"
+    )
+    parser.add_argument("--export-dir", default=MODEL_EXPORT_DIR, help="eksporten til --model")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            model_path, metadata_path, export_dir = args.model, args.metadata, args.export_dir
+        else:
+            print("Trener syntetisk modell ...")
+            model_path, metadata_path = _train_synthetic_model(tmp)
+            export_dir = os.path.join(tmp, "model_export")
+            export_model(os.path.join(tmp, "startups.csv"), model_path, metadata_path, export_dir)
+        metadata = get_model_registry(model_path, metadata_path).get().metadata
+
+        scorers: Dict[str, Scorer] = {}
+        for backend in filter(None, args.backends.split(",")):
+            if backend == CatBoostScorer.backend:
+                scorers[backend] = CatBoostScorer.from_file(model_path, metadata)
+            else:
+                scorers[backend] = create_export_scorer(backend, export_dir, metadata)
+
+        print(f"{'benchmark':<36} {'rader':>7} {'p50 ms':>9} {'min ms':>9} {'p95 ms':>9} {'rader/s':>11}")
+
+        def report(name: str, n: int, r: Dict[str, float]) -> None:
+            per_sec = n / (r["p50_ms"] / 1000) if r["p50_ms"] else float("inf")
+            print(f"{name:<36} {n:>7} {r['p50_ms']:>9.3f} {r['min_ms']:>9.3f} {r['p95_ms']:>9.3f} {per_sec:>11.0f}")
+
+        for n in (int(x) for x in args.rows.split(",")):
+            df = synthetic_startups(n, seed=1)
+            report(
+                "preprocess_features (is_train=False)",
+                n,
+                bench(lambda: preprocess_features(df, metadata=metadata, is_train=False), args.repeats),
+            )
+            report("preprocess_features (is_train=True)", n, bench(lambda: preprocess_features(df), args.repeats))
+
+            requests = synthetic_requests(n, seed=1)
+            report(
+                "predict_success_scores (batch)",
+                n,
+                bench(lambda: predict_success_scores(requests, model_path, metadata_path), args.repeats),
+            )
+
+            X, _ = preprocess_features(df, metadata=metadata, is_train=False)
+            for backend, scorer in scorers.items():
+                report(f"scorer {backend} (batch)", n, bench(lambda: scorer.predict_proba(X), args.repeats))
+
+        one = synthetic_requests(1, seed=2)[0]
+        report(
+            "predict_success_score (én rad)",
+            1,
+            bench(lambda: predict_success_score(one, model_path, metadata_path), args.repeats * 10),
+        )
+
+        X, _ = preprocess_features(synthetic_startups(1, seed=2), metadata=metadata, is_train=False)
+        row = X.to_numpy(dtype=object).tolist()
+        for backend, scorer in scorers.items():
+            report(f"scorer {backend} (én rad)", 1, bench(lambda: scorer.predict_proba(row), args.repeats * 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Tid og minne for build_target + preprocess_features på store rammer.
+
+Sammenligner dagens vektoriserte pipeline med den gamle (rad-for-rad
+.apply, full df.copy() og astype(str) på hele kolonner), som er tatt med
+under som referanse, og sjekker at X, metadata og target er identiske.
+Minne er topp-allokering målt med tracemalloc (numpy/pandas-buffere
+telles med).
+
+    cd AI
+    python -m benchmarks.preprocess_large --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+import warnings
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_startups
+from dataset_cache import _typed
+from train_startup_model import (
+    FEATURE_CANDIDATES,
+    MIN_OPERATING_YEARS,
+    PreprocessMetadata,
+    _extract_main_category,
+    build_target,
+    preprocess_features,
+)
+
+
+# ---------- referanse: pipelinen slik den var før vektoriseringen ----------
+
+def legacy_build_target(df: pd.DataFrame, min_operating_years: int = MIN_OPERATING_YEARS):
+    df = df.copy()
+    for c in ["founded_at", "last_funding_at"]:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    status = df.get("status", pd.Series(index=df.index, dtype=object)).fillna("unknown").str.lower()
+    age_years = ((df["last_funding_at"] - df["founded_at"]).dt.days / 365.25).fillna(0)
+    success = pd.Series(0, index=df.index, dtype=int)
+    success[status.isin(["acquired", "ipo"])] = 1
+    success[(status == "operating") & (age_years >= min_operating_years)] = 1
+    unknown_mask = (status == "operating") & (age_years < min_operating_years)
+    return success, unknown_mask
+
+
+def legacy_preprocess_features(
+    df: pd.DataFrame,
+    metadata: Optional[PreprocessMetadata] = None,
+    is_train: bool = True,
+) -> Tuple[pd.DataFrame, PreprocessMetadata]:
+    df = df.copy()
+    if "funding_total_usd" in df.columns:
+        df["funding_total_usd"] = df["funding_total_usd"].replace("-", np.nan).replace("", np.nan)
+        df["funding_total_usd"] = pd.to_numeric(df["funding_total_usd"], errors="coerce")
+        df["funding_total_log"] = np.log1p(df["funding_total_usd"].fillna(0.0).clip(lower=0.0))
+    else:
+        df["funding_total_usd"] = 0.0
+        df["funding_total_log"] = 0.0
+    if "funding_rounds" in df.columns:
+        df["funding_rounds"] = pd.to_numeric(df["funding_rounds"], errors="coerce").fillna(0).astype(float)
+    else:
+        df["funding_rounds"] = 0.0
+    if "category_list" in df.columns:
+        df["main_category"] = df["category_list"].apply(_extract_main_category)
+    else:
+        df["main_category"] = "Unknown"
+
+    df = df[[c for c in FEATURE_CANDIDATES if c in df.columns]]
+    for col in df.columns:
+        if df[col].dtype == "O":
+            df[col] = df[col].fillna("Unknown").astype(str)
+    num_cols = df.select_dtypes(exclude=["object"]).columns.tolist()
+    df[num_cols] = df[num_cols].fillna(0.0)
+
+    if is_train:
+        feature_cols = list(df.columns)
+        cat_features = df.select_dtypes(include=["object"]).columns.tolist()
+        metadata = PreprocessMetadata(
+            feature_cols=feature_cols,
+            cat_features=cat_features,
+            cat_feature_indices=[feature_cols.index(c) for c in cat_features],
+        )
+    else:
+        for col in metadata.feature_cols:
+            if col not in df.columns:
+                df[col] = "Unknown" if col in metadata.cat_features else 0.0
+        df = df[metadata.feature_cols]
+        for col in metadata.cat_features:
+            df[col] = df[col].fillna("Unknown").astype(str)
+        for col in df.columns:
+            if col not in metadata.cat_features:
+                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+    return df, metadata
+
+
+# ---------- måling ----------
+
+def measure(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    """
+    (resultat, sekunder, topp-allokering i MB). Tid og minne måles i hver
+    sin kjøring – tracemalloc gjør objekt-allokeringer mange ganger tregere.
+    """
+    gc.collect()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def _pipeline(target_fn: Callable, preprocess_fn: Callable, df: pd.DataFrame):
+    y, unknown = target_fn(df)
+    X, metadata = preprocess_fn(df[~unknown].reset_index(drop=True), is_train=True)
+    X_pred, _ = preprocess_fn(df, metadata=metadata, is_train=False)
+    return y, unknown, X, metadata, X_pred
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="mål bare dagens pipeline")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    print(f"Lager {args.rows} syntetiske rader ...")
+    raw = synthetic_startups(args.rows, seed=11)
+    typed = _typed(raw.copy())
+
+    runs: List[Tuple[str, Callable, Callable, pd.DataFrame]] = [
+        ("vektorisert (CSV-typer)", build_target, preprocess_features, raw),
+        ("vektorisert (datasett-cache)", build_target, preprocess_features, typed),
+    ]
+    if not args.skip_legacy:
+        runs.insert(0, ("gammel", legacy_build_target, legacy_preprocess_features, raw))
+
+    print(f"{'pipeline':<30} {'sekunder':>9} {'topp MB':>9} {'rader/s':>12}")
+    results = {}
+    for name, target_fn, preprocess_fn, df in runs:
+        result, seconds, peak_mb = measure(lambda: _pipeline(target_fn, preprocess_fn, df))
+        results[name] = result
+        print(f"{name:<30} {seconds:>9.2f} {peak_mb:>9.0f} {args.rows / seconds:>12.0f}")
+
+    if "gammel" in results:
+        y0, u0, X0, m0, P0 = results["gammel"]
+        for name, (y, u, X, m, P) in results.items():
+            pd.testing.assert_series_equal(y0, y)
+            pd.testing.assert_series_equal(u0, u)
+            pd.testing.assert_frame_equal(X0, X, check_exact=True)
+            pd.testing.assert_frame_equal(P0, P, check_exact=True)
+            assert m0 == m, f"{name}: metadata avviker"
+        print("Identisk output (target, X for trening/prediksjon og metadata).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Måler prompt-evaluering i Ollama for gjentatte VC-kall med ulike pitcher.
+
+Tre oppsett sammenlignes (samme modell, samme data, num_predict=1 så bare
+prompt-prosesseringen måles):
+- prefix:  dagens oppsett – fast `system` + kort variabel `prompt`
+- legacy:  alt i én prompt, slik kallene var bygget før
+- nocache: som prefix, men med et unikt tall først i system-prompten, så
+           Ollama aldri kan gjenbruke noe (viser kostnaden uten gjenbruk)
+
+Krever at Ollama kjører med modellen lastet ned:
+    cd AI
+    python -m benchmarks.prompt_prefix --repeats 10
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import uuid
+
+from ollama_client import OllamaClient, OLLAMA_BASE_URL
+from ollama_explainer import MODEL_NAME, OLLAMA_KEEP_ALIVE, VC_SYSTEM, _vc_prompt
+from prompt_budget import compact_json
+
+PITCHES = [
+    "Jeg skal lage en ny restaurantkjede som prioriterer oversikt over makroer først.",
+    "En app som matcher frivillige med idrettslag som mangler trenere og dommere.",
+    "Abonnement på reparasjon av sykler for bedrifter, hentet og levert på arbeidsplassen.",
+    "AI-verktøy som lager ukeplaner for lærere ut fra læreplanmål og elevenes nivå.",
+    "Markedsplass for brukte byggematerialer fra riving, med logistikk og sertifisering.",
+    "Sensorer for fuktmåling i hytter, med varsel på mobil og forsikringsrabatt.",
+]
+
+STARTUP_DATA = {"category_list": "Restaurants", "country_code": "NOR", "funding_rounds": 0}
+
+
+def _payloads(mode: str, pitch: str) -> dict:
+    prompt = _vc_prompt(pitch, compact_json(STARTUP_DATA))
+    payload = {
+        "model": MODEL_NAME,
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": 0.0, "num_predict": 1},
+    }
+    if mode == "prefix":
+        return {**payload, "system": VC_SYSTEM, "prompt": prompt}
+    if mode == "legacy":
+        return {**payload, "prompt": f"{VC_SYSTEM}\n\n{prompt}"}
+    if mode == "nocache":
+        return {**payload, "system": f"[{uuid.uuid4().hex}]\n{VC_SYSTEM}", "prompt": prompt}
+    raise ValueError(mode)
+
+
+def run(client: OllamaClient, mode: str, repeats: int) -> dict:
+    evals, durations, wall = [], [], []
+    for i in range(repeats):
+        pitch = f"{PITCHES[i % len(PITCHES)]} (variant {i})"
+        started = time.perf_counter()
+        data = client.generate(_payloads(mode, pitch))
+        wall.append(time.perf_counter() - started)
+        evals.append(data.get("prompt_eval_count", 0))
+        durations.append(data.get("prompt_eval_duration", 0) / 1e6)  # ns -> ms
+    return {
+        "mode": mode,
+        "prompt_eval_count": statistics.mean(evals),
+        "prompt_eval_ms": statistics.mean(durations),
+        "prompt_eval_ms_p50": statistics.median(durations),
+        "wall_ms": statistics.mean(wall) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=OLLAMA_BASE_URL)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--modes", default="nocache,legacy,prefix")
+    args = parser.parse_args()
+
+    client = OllamaClient(base_url=args.url)
+    # Last modellen og fyll KV-cachen én gang før vi måler
+    client.generate(_payloads("prefix", PITCHES[0]))
+
+    print(f"{'modus':<8} {'prompt-tokens':>14} {'eval ms (snitt)':>16} {'eval ms (p50)':>14} {'vegg ms':>9}")
+    for mode in args.modes.split(","):
+        r = run(client, mode.strip(), args.repeats)
+        print(
+            f"{r['mode']:<8} {r['prompt_eval_count']:>14.0f} {r['prompt_eval_ms']:>16.1f} "
+            f"{r['prompt_eval_ms_p50']:>14.1f} {r['wall_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Syntetiske Crunchbase-lignende rader for benchmarks.
+
+Samme kolonner og samme "skitne" verdier som i datasettet (funding som
+streng med "-", manglende geografi, pipe-separert category_list), så
+preprocess og CatBoost får realistisk arbeid uten at CSV-en må finnes.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = [
+    "Software", "Biotechnology", "E-Commerce", "Mobile", "Enterprise Software",
+    "Health Care", "Advertising", "Education", "Games", "Analytics",
+    "Finance", "Clean Technology", "Hardware + Software", "Restaurants", "Social Media",
+]
+GEOGRAPHY = [
+    ("USA", "CA", "SF Bay Area", "San Francisco"),
+    ("USA", "NY", "New York City", "New York"),
+    ("USA", "MA", "Boston", "Cambridge"),
+    ("GBR", "H9", "London", "London"),
+    ("NOR", "12", "Oslo", "Oslo"),
+    ("DEU", "16", "Berlin", "Berlin"),
+    ("IND", "19", "Bangalore", "Bangalore"),
+    ("CAN", "ON", "Toronto", "Toronto"),
+]
+STATUSES = ["operating", "acquired", "closed", "ipo"]
+STATUS_WEIGHTS = [0.7, 0.15, 0.12, 0.03]
+
+
+def synthetic_startups(n: int, seed: int = 42) -> pd.DataFrame:
+    """n rader med rådata-kolonnene train_startup_model forventer."""
+    rng = np.random.default_rng(seed)
+
+    first = rng.integers(len(CATEGORIES), size=n)
+    second = rng.integers(len(CATEGORIES), size=n)
+    categories = np.array(CATEGORIES, dtype=object)
+    category_list = np.where(
+        rng.random(n) < 0.5,
+        categories[first],
+        categories[first] + "|" + categories[second],
+    )
+    category_list[rng.random(n) < 0.03] = None
+
+    funding = np.round(np.exp(rng.normal(14.0, 2.0, size=n)), -3)
+    funding_str = funding.astype(np.int64).astype(str).astype(object)
+    funding_str[rng.random(n) < 0.15] = "-"
+
+    geo = np.array(GEOGRAPHY, dtype=object)[rng.integers(len(GEOGRAPHY), size=n)]
+    geo[rng.random(n) < 0.05, 1:] = None
+
+    founded = pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 14 * 365, size=n), unit="D")
+    last_funding = founded + pd.to_timedelta(rng.integers(0, 8 * 365, size=n), unit="D")
+
+    return pd.DataFrame(
+        {
+            "name": [f"startup-{i}" for i in range(n)],
+            "category_list": category_list,
+            "funding_total_usd": funding_str,
+            "status": rng.choice(STATUSES, size=n, p=STATUS_WEIGHTS),
+            "country_code": geo[:, 0],
+            "state_code": geo[:, 1],
+            "region": geo[:, 2],
+            "city": geo[:, 3],
+            "funding_rounds": rng.integers(1, 8, size=n),
+            "founded_at": founded.strftime("%Y-%m-%d"),
+            "first_funding_at": founded.strftime("%Y-%m-%d"),
+            "last_funding_at": last_funding.strftime("%Y-%m-%d"),
+        }
+    )
+
+
+def synthetic_requests(n: int, seed: int = 42) -> list[dict]:
+    """Rader som dicts, slik service sender dem til predict_success_score."""
+    df = synthetic_startups(n, seed)
+    cols = ["funding_total_usd", "funding_rounds", "country_code", "state_code", "region", "city", "category_list"]
+    return df[cols].to_dict(orient="records")
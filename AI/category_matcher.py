@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Lokal matching av fritekst mot kategoriene i all_categories.json.
+
+Bygger én gang en TF-IDF-indeks (tegn-trigrammer + hele ord) over alle
+kategoriene, med en invertert indeks slik at et oppslag bare berører
+kategorier som deler n-grammer med teksten. Brukes av
+map_text_to_category_with_llama for å:
+- løse de fleste input lokalt (eksakt eller nær-eksakt treff), og
+- lage en kort kandidatliste til LLaMA når treffet er usikkert.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+NGRAM_SIZE = 3
+WORD_WEIGHT = 2.0  # hele ord teller mer enn enkelt-trigrammer
+
+MIN_CONFIDENT_SCORE = 0.8   # cosinus-likhet for å godta lokalt treff uten LLaMA
+MIN_CONFIDENT_MARGIN = 0.05  # avstand ned til nest beste kategori
+SHORTLIST_SIZE = 25
+MIN_SHORTLIST_SCORE = 0.3  # under dette er overlappen tilfeldig (f.eks. norsk tekst)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Små bokstaver, kun ord-tegn, ett mellomrom mellom ord."""
+    return " ".join(_TOKEN_RE.findall(text.lower().replace("_", " ")))
+
+
+def loose_key(normalized: str) -> str:
+    """Nøkkel uten mellomrom og flertalls-s ('health care' == 'healthcare')."""
+    return "".join(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in normalized.split())
+
+
+def _features(normalized: str) -> Counter:
+    feats: Counter = Counter()
+    padded = f" {normalized} "
+    for i in range(len(padded) - NGRAM_SIZE + 1):
+        feats["c:" + padded[i:i + NGRAM_SIZE]] += 1.0
+    for word in normalized.split():
+        feats["w:" + word] += WORD_WEIGHT
+    return feats
+
+
+@dataclass(frozen=True)
+class CategoryHit:
+    category: str
+    score: float
+
+
+class CategoryMatcher:
+    """TF-IDF-indeks over et fast sett kategorier."""
+
+    def __init__(self, categories: Iterable[str]) -> None:
+        self.categories: List[str] = list(dict.fromkeys(categories))
+
+        self._exact: Dict[str, str] = {}
+        self._loose: Dict[str, str] = {}
+        for cat in self.categories:
+            normalized = normalize_text(cat)
+            self._exact.setdefault(normalized, cat)
+            self._loose.setdefault(loose_key(normalized), cat)
+
+        cat_features = [_features(normalize_text(cat)) for cat in self.categories]
+
+        doc_freq: Counter = Counter()
+        for feats in cat_features:
+            doc_freq.update(feats.keys())
+
+        n_docs = len(self.categories)
+        self._idf: Dict[str, float] = {
+            feat: math.log((n_docs + 1) / (df + 1)) + 1.0 for feat, df in doc_freq.items()
+        }
+        # Ukjente n-grammer i spørringen vektes som de sjeldneste kjente
+        self._unknown_idf = math.log(n_docs + 1) + 1.0
+
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for idx, feats in enumerate(cat_features):
+            weights = {f: tf * self._idf[f] for f, tf in feats.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for feat, w in weights.items():
+                self._postings[feat].append((idx, w / norm))
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def exact(self, text: str) -> Optional[str]:
+        """
+        Kategori med samme navn etter normalisering (store/små bokstaver,
+        tegnsetting, mellomrom og flertalls-s), ellers None.
+        """
+        normalized = normalize_text(text)
+        return self._exact.get(normalized) or self._loose.get(loose_key(normalized))
+
+    def search(self, text: str, k: int = 10) -> List[CategoryHit]:
+        """De k mest like kategoriene (cosinus-likhet, 0–1), beste først."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return []
+
+        exact = self.exact(normalized)
+
+        # Ukjente hele ord ignoreres (skrivefeil skal ikke straffes dobbelt),
+        # ukjente trigrammer trekker ned likheten
+        weights = {
+            f: tf * self._idf.get(f, self._unknown_idf)
+            for f, tf in _features(normalized).items()
+            if f in self._idf or f.startswith("c:")
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        scores: Dict[int, float] = defaultdict(float)
+        for feat, w in weights.items():
+            for idx, cat_w in self._postings.get(feat, ()):
+                scores[idx] += (w / norm) * cat_w
+
+        hits = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        result = [CategoryHit(self.categories[idx], min(score, 1.0)) for idx, score in hits]
+
+        if exact is not None:
+            result = [CategoryHit(exact, 1.0)] + [h for h in result if h.category != exact]
+            result = result[:k]
+        return result
+
+    def match(
+        self,
+        text: str,
+        min_score: float = MIN_CONFIDENT_SCORE,
+        min_margin: float = MIN_CONFIDENT_MARGIN,
+    ) -> Optional[str]:
+        """
+        Sikker lokal match, eller None hvis teksten er for tvetydig.
+
+        Eksakt (normalisert) navn gir alltid treff. Ellers må beste kategori
+        ha score >= min_score og ligge minst min_margin over nest beste.
+        """
+        exact = self.exact(text)
+        if exact is not None:
+            return exact
+
+        hits = self.search(text, k=2)
+        if not hits or hits[0].score < min_score:
+            return None
+        if len(hits) > 1 and hits[0].score - hits[1].score < min_margin:
+            return None
+        return hits[0].category
+
+    def shortlist(self, text: str, k: int = SHORTLIST_SIZE) -> List[str]:
+        """
+        Kandidater å gi til LLaMA. Tom liste hvis selv beste treff er for
+        svakt til at kandidatene sier noe om teksten.
+        """
+        hits = self.search(text, k=k)
+        if not hits or hits[0].score < MIN_SHORTLIST_SCORE:
+            return []
+        return [hit.category for hit in hits if hit.score > 0.0]
+
+
+@lru_cache(maxsize=8)
+def _cached_matcher(categories: Tuple[str, ...]) -> CategoryMatcher:
+    return CategoryMatcher(categories)
+
+
+def get_category_matcher(categories: Sequence[str]) -> CategoryMatcher:
+    """Delt matcher per kategoriliste – bygges bare første gang."""
+    return _cached_matcher(tuple(categories))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Datasett-cache for trening: rå-CSV-en parses én gang til typet Parquet.
+
+`pd.read_csv` på hele Crunchbase-CSV-en (alle kolonner, low_memory=False)
+er mesteparten av veggtiden når man itererer på hyperparametre. Her:
+- leses bare kolonnene pipelinen bruker (DATASET_COLUMNS)
+- parses datoer til datetime og funding_total_usd til tall ("-" → NaN)
+- lagres tekstkolonner med få unike verdier som category
+- skrives resultatet til <cache-mappe>/<navn>-<sha256>.parquet
+
+Neste kjøring leser Parquet-filen så lenge kildefilens SHA-256 er uendret.
+Hashen lagres i en manifest-fil sammen med størrelse/mtime, så CSV-en bare
+hashes på nytt når den faktisk er endret på disk.
+
+Slås av med DATASET_CACHE=0 (leser da CSV-en direkte, med samme typing).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DATASET_CACHE = os.environ.get("DATASET_CACHE", "1") not in ("0", "false", "no")
+DATASET_CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", ".dataset_cache")
+
+# Øk når typingen/kolonnevalget endres, så gamle Parquet-filer ikke brukes
+DATASET_SCHEMA_VERSION = 1
+
+# Kolonnene build_target og preprocess_features leser
+DATE_COLUMNS = ["founded_at", "last_funding_at"]
+CATEGORY_COLUMNS = ["status", "country_code", "state_code", "region", "city", "category_list"]
+NUMERIC_COLUMNS = ["funding_total_usd", "funding_rounds"]
+DATASET_COLUMNS = CATEGORY_COLUMNS + NUMERIC_COLUMNS + DATE_COLUMNS
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, "manifest.json")
+
+
+def _read_manifest(cache_dir: str) -> Dict[str, dict]:
+    try:
+        with open(_manifest_path(cache_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir: str, manifest: Dict[str, dict]) -> None:
+    tmp = _manifest_path(cache_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path(cache_dir))
+
+
+def source_sha256(csv_path: str, cache_dir: str = DATASET_CACHE_DIR) -> str:
+    """SHA-256 av kildefilen; gjenbrukes fra manifestet når størrelse/mtime er uendret."""
+    st = os.stat(csv_path)
+    key = os.path.abspath(csv_path)
+    entry = _read_manifest(cache_dir).get(key)
+    if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        return entry["sha256"]
+
+    sha = file_sha256(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _read_manifest(cache_dir)
+    manifest[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+    _write_manifest(cache_dir, manifest)
+    return sha
+
+
+def cache_path_for(csv_path: str, sha256: str, cache_dir: str = DATASET_CACHE_DIR) -> str:
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{sha256[:16]}-v{DATASET_SCHEMA_VERSION}.parquet")
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Gir kolonnene faste typer (samme verdier som pipelinen ellers ville parset fram)."""
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    if "funding_total_usd" in df.columns:
+        # Samme som preprocess_features: "-" og "" er ukjent
+        df["funding_total_usd"] = pd.to_numeric(
+            df["funding_total_usd"].replace({"-": np.nan, "": np.nan}), errors="coerce"
+        ).astype("float64")
+    if "funding_rounds" in df.columns:
+        df["funding_rounds"] = pd.to_numeric(df["funding_rounds"], errors="coerce")
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def read_raw_csv(csv_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Leser bare kolonnene som trengs fra CSV-en, og typer dem."""
+    wanted = set(columns or DATASET_COLUMNS)
+    df = pd.read_csv(
+        csv_path,
+        usecols=lambda c: c in wanted,
+        dtype={c: "object" for c in CATEGORY_COLUMNS + ["funding_total_usd"]},
+        low_memory=False,
+    )
+    return _typed(df)
+
+
+def load_dataset(
+    csv_path: str,
+    cache_dir: str = DATASET_CACHE_DIR,
+    use_cache: bool = DATASET_CACHE,
+) -> pd.DataFrame:
+    """
+    Rådata til trening: fra Parquet-cachen hvis kilde-hashen er uendret,
+    ellers fra CSV-en (og cachen skrives for neste kjøring).
+    """
+    if not use_cache:
+        return read_raw_csv(csv_path)
+
+    started = time.perf_counter()
+    sha = source_sha256(csv_path, cache_dir)
+    path = cache_path_for(csv_path, sha, cache_dir)
+    if os.path.exists(path):
+        df = pd.read_parquet(path)
+        print(f"[dataset_cache] Leste {len(df)} rader fra {path} på {time.perf_counter() - started:.2f} s")
+        return df
+
+    df = read_raw_csv(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    print(
+        f"[dataset_cache] Parset {csv_path} ({len(df)} rader) og lagret {path} "
+        f"på {time.perf_counter() - started:.2f} s"
+    )
+    return df
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Inkrementell (warm-start) trening når nye startups med kjent utfall kommer.
+
+I stedet for full train_model på hele datasettet:
+- leses en delta-CSV og merkes med build_target (ukjente utfall droppes)
+- preprocesses den med den lagrede PreprocessMetadata
+- deles deltaen i tre: trening, eval-sett for early stopping og en
+  holdout som treningen aldri ser
+- fortsetter boostingen fra catboost_startup_success.cbm (init_model) på
+  treningsdelen, med early stopping (use_best_model) mot eval-settet
+- sammenlignes gammel og ny modell på holdouten; ny modell tas i bruk bare
+  hvis AUC ikke blir dårligere enn --tolerance (eller med --force). Eval-
+  settet har valgt beste iterasjon og ville gitt en for optimistisk AUC
+
+Alle modeller som tas i bruk (og den de erstatter) lagres som versjoner i
+MODEL_VERSIONS_DIR, så man kan rulle tilbake. Service plukker opp byttet
+selv (ModelRegistry følger modellfilen). En standalone-eksport fra
+train_startup_model.export_model passer ikke lenger til ny modell, så
+service scorer med catboost til eksporten kjøres på nytt.
+
+Full trening trengs bare når feature-skjemaet endres: hvis deltaen gir
+andre feature-kolonner eller kategoriske kolonner enn PreprocessMetadata,
+kastes SchemaChanged.
+
+    python incremental_training.py nye_startups.csv
+    python incremental_training.py --list
+    python incremental_training.py --rollback            # til forrige versjon
+    python incremental_training.py --rollback 20260101-120000-full
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from catboost import CatBoostClassifier, Pool
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from dataset_cache import file_sha256, read_raw_csv
+from train_startup_model import (
+    CATBOOST_PARAMS,
+    METADATA_PATH,
+    MIN_OPERATING_YEARS,
+    MODEL_PATH,
+    RANDOM_STATE,
+    PreprocessMetadata,
+    build_target,
+    get_model_registry,
+    load_trained_model_and_metadata,
+    preprocess_features,
+)
+
+MODEL_VERSIONS_DIR = os.environ.get("MODEL_VERSIONS_DIR", "model_versions")
+INCREMENTAL_ITERATIONS = int(os.environ.get("INCREMENTAL_ITERATIONS", 300))
+INCREMENTAL_HOLDOUT = 0.2  # andel av deltaen til akseptansetesten
+INCREMENTAL_EVAL = 0.2  # andel av deltaen til early stopping
+
+_MODEL_FILE = "model.cbm"
+_METADATA_FILE = "metadata.joblib"
+_INFO_FILE = "info.json"
+
+
+class SchemaChanged(ValueError):
+    """Deltaen passer ikke til modellens feature-skjema – kjør full train_model."""
+
+
+def schema_changes(current: PreprocessMetadata, delta: PreprocessMetadata) -> List[str]:
+    """Forskjeller mellom lagret skjema og skjemaet deltaen gir (tom = kompatibel)."""
+    changes = []
+    added = [c for c in delta.feature_cols if c not in current.feature_cols]
+    if added:
+        changes.append(f"nye feature-kolonner: {added}")
+    retyped = [
+        c for c in delta.feature_cols
+        if c in current.feature_cols and (c in delta.cat_features) != (c in current.cat_features)
+    ]
+    if retyped:
+        changes.append(f"kolonner som har byttet mellom kategorisk og numerisk: {retyped}")
+    return changes
+
+
+# ---------------------------------------------------------------------------
+# Versjoner
+# ---------------------------------------------------------------------------
+
+def _version_dir(version_id: str, versions_dir: str) -> str:
+    return os.path.join(versions_dir, version_id)
+
+
+def list_versions(versions_dir: str = MODEL_VERSIONS_DIR) -> List[Dict[str, Any]]:
+    """Alle lagrede versjoner, eldste først."""
+    if not os.path.isdir(versions_dir):
+        return []
+    versions = []
+    for name in sorted(os.listdir(versions_dir)):
+        info_path = os.path.join(versions_dir, name, _INFO_FILE)
+        if os.path.exists(info_path):
+            with open(info_path, encoding="utf-8") as f:
+                versions.append(json.load(f))
+    return versions
+
+
+def active_version(model_path: str = MODEL_PATH, versions_dir: str = MODEL_VERSIONS_DIR) -> Optional[str]:
+    if not os.path.exists(model_path):
+        return None
+    sha = file_sha256(model_path)
+    for info in reversed(list_versions(versions_dir)):
+        if info["model_sha256"] == sha:
+            return info["version"]
+    return None
+
+
+def save_version(
+    model_path: str,
+    metadata_path: str,
+    kind: str,
+    info: Optional[Dict[str, Any]] = None,
+    versions_dir: str = MODEL_VERSIONS_DIR,
+) -> str:
+    """Kopierer (modell, metadata) inn som ny versjon og returnerer versjons-id."""
+    version_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}"
+    n = 1
+    while os.path.exists(_version_dir(version_id, versions_dir)):
+        n += 1
+        version_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{n}"
+
+    directory = _version_dir(version_id, versions_dir)
+    os.makedirs(directory)
+    shutil.copy2(model_path, os.path.join(directory, _MODEL_FILE))
+    shutil.copy2(metadata_path, os.path.join(directory, _METADATA_FILE))
+    with open(os.path.join(directory, _INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": version_id,
+                "kind": kind,
+                "created_at": time.time(),
+                "model_sha256": file_sha256(model_path),
+                **(info or {}),
+            },
+            f,
+            indent=2,
+        )
+    return version_id
+
+
+def _ensure_active_versioned(model_path: str, metadata_path: str, versions_dir: str) -> str:
+    """Versjonerer modellen som er i bruk nå (f.eks. fra full train_model) før den erstattes."""
+    return active_version(model_path, versions_dir) or save_version(
+        model_path, metadata_path, "full", versions_dir=versions_dir
+    )
+
+
+def _replace_file(src: str, dst: str) -> None:
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def activate_version(
+    version_id: str,
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+    versions_dir: str = MODEL_VERSIONS_DIR,
+) -> None:
+    """Tar en lagret versjon i bruk (atomisk bytte av filene service leser)."""
+    directory = _version_dir(version_id, versions_dir)
+    if not os.path.exists(os.path.join(directory, _INFO_FILE)):
+        raise FileNotFoundError(f"Fant ikke modellversjon: {version_id}")
+    _replace_file(os.path.join(directory, _METADATA_FILE), metadata_path)
+    _replace_file(os.path.join(directory, _MODEL_FILE), model_path)
+    get_model_registry(model_path, metadata_path).reload()
+    print(f"[incremental] Modellversjon {version_id} er i bruk")
+
+
+def rollback(
+    to_version: Optional[str] = None,
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+    versions_dir: str = MODEL_VERSIONS_DIR,
+) -> str:
+    """Ruller tilbake til to_version, eller til versjonen den aktive ble bygget fra."""
+    if to_version is None:
+        current = active_version(model_path, versions_dir)
+        info = next((v for v in list_versions(versions_dir) if v["version"] == current), None)
+        to_version = (info or {}).get("parent")
+        if not to_version:
+            raise ValueError("Fant ingen forrige versjon å rulle tilbake til")
+    activate_version(to_version, model_path, metadata_path, versions_dir)
+    return to_version
+
+
+# ---------------------------------------------------------------------------
+# Inkrementell trening
+# ---------------------------------------------------------------------------
+
+def _holdout_auc(model: CatBoostClassifier, X: pd.DataFrame, y: pd.Series, metadata: PreprocessMetadata) -> float:
+    proba = model.predict_proba(Pool(X, cat_features=metadata.cat_feature_indices))[:, 1]
+    return float(roc_auc_score(y, proba))
+
+
+def train_incremental(
+    delta_csv: str,
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+    iterations: int = INCREMENTAL_ITERATIONS,
+    learning_rate: Optional[float] = None,
+    holdout_size: float = INCREMENTAL_HOLDOUT,
+    eval_size: float = INCREMENTAL_EVAL,
+    tolerance: float = 0.0,
+    force: bool = False,
+    versions_dir: str = MODEL_VERSIONS_DIR,
+) -> Dict[str, Any]:
+    """
+    Fortsetter boostingen fra lagret modell med radene i delta_csv.
+    Returnerer en rapport (AUC før/etter, versjon, om den ble tatt i bruk).
+    """
+    old_model, metadata = load_trained_model_and_metadata(model_path, metadata_path)
+
+    df_raw = read_raw_csv(delta_csv)
+    y_all, unknown_mask = build_target(df_raw, min_operating_years=MIN_OPERATING_YEARS)
+    df = df_raw[~unknown_mask].reset_index(drop=True)
+    y = y_all[~unknown_mask].reset_index(drop=True)
+    print(f"[incremental] {len(df)} rader med kjent utfall i {delta_csv} (av {len(df_raw)})")
+    if y.nunique() < 2:
+        raise ValueError("Deltaen må ha både suksess og ikke-suksess for å kunne valideres")
+
+    _, delta_metadata = preprocess_features(df, is_train=True)
+    changes = schema_changes(metadata, delta_metadata)
+    if changes:
+        raise SchemaChanged("Feature-skjemaet er endret, kjør full train_model: " + "; ".join(changes))
+    X, _ = preprocess_features(df, metadata=metadata, is_train=False)
+
+    # Holdouten skilles ut først og brukes bare til akseptansen; eval-settet
+    # (andel av hele deltaen) styrer early stopping
+    X_rest, X_hold, y_rest, y_hold = train_test_split(
+        X, y, test_size=holdout_size, random_state=RANDOM_STATE, stratify=y
+    )
+    X_train, X_eval, y_train, y_eval = train_test_split(
+        X_rest,
+        y_rest,
+        test_size=eval_size / (1.0 - holdout_size),
+        random_state=RANDOM_STATE,
+        stratify=y_rest,
+    )
+    train_pool = Pool(X_train, label=y_train, cat_features=metadata.cat_feature_indices)
+    eval_pool = Pool(X_eval, label=y_eval, cat_features=metadata.cat_feature_indices)
+
+    # Samme tre-parametre som den lagrede modellen, færre iterasjoner. Klassevektene
+    # må være de samme som i init_model (auto_class_weights ville regnet nye fra deltaen).
+    old_params = old_model.get_all_params()
+    inherited = ("depth", "l2_leaf_reg", "border_count", "learning_rate", "class_weights")
+    params = {
+        **{k: v for k, v in CATBOOST_PARAMS.items() if k != "auto_class_weights"},
+        **{k: old_params[k] for k in inherited if k in old_params},
+        "iterations": iterations,
+        "verbose": 100,
+    }
+    if learning_rate is not None:
+        params["learning_rate"] = learning_rate
+
+    model = CatBoostClassifier(**params)
+    model.fit(train_pool, eval_set=eval_pool, use_best_model=True, init_model=old_model)
+
+    auc_before = _holdout_auc(old_model, X_hold, y_hold, metadata)
+    auc_after = _holdout_auc(model, X_hold, y_hold, metadata)
+    accepted = force or auc_after >= auc_before - tolerance
+    print(f"[incremental] Holdout-AUC før: {auc_before:.4f}, etter: {auc_after:.4f}")
+
+    parent = _ensure_active_versioned(model_path, metadata_path, versions_dir)
+    candidate_path = f"{model_path}.{os.getpid()}.candidate"
+    model.save_model(candidate_path)
+    try:
+        version = save_version(
+            candidate_path,
+            metadata_path,
+            "incremental" if accepted else "rejected",
+            {
+                "parent": parent,
+                "delta_csv": os.path.abspath(delta_csv),
+                "delta_sha256": file_sha256(delta_csv),
+                "delta_rows": len(df),
+                "holdout_rows": len(y_hold),
+                "holdout_auc_before": auc_before,
+                "holdout_auc_after": auc_after,
+                "tree_count": model.tree_count_,
+            },
+            versions_dir,
+        )
+    finally:
+        os.remove(candidate_path)
+
+    if accepted:
+        activate_version(version, model_path, metadata_path, versions_dir)
+    else:
+        print(f"[incremental] Ny modell er dårligere på holdout, beholder {parent} (lagret som {version})")
+
+    return {
+        "version": version,
+        "parent": parent,
+        "accepted": accepted,
+        "holdout_auc_before": auc_before,
+        "holdout_auc_after": auc_after,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("delta_csv", nargs="?", help="CSV med nye startups (samme kolonner som datasettet)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--metadata", default=METADATA_PATH)
+    parser.add_argument("--iterations", type=int, default=INCREMENTAL_ITERATIONS)
+    parser.add_argument("--learning-rate", type=float)
+    parser.add_argument("--holdout", type=float, default=INCREMENTAL_HOLDOUT, help="andel til akseptansetesten")
+    parser.add_argument("--eval", type=float, default=INCREMENTAL_EVAL, help="andel til early stopping")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="tillatt AUC-fall på holdout")
+    parser.add_argument("--force", action="store_true", help="ta i bruk ny modell uansett holdout-AUC")
+    parser.add_argument("--versions-dir", default=MODEL_VERSIONS_DIR)
+    parser.add_argument("--list", action="store_true", help="vis lagrede versjoner")
+    parser.add_argument("--rollback", nargs="?", const="", metavar="VERSJON", help="rull tilbake")
+    args = parser.parse_args()
+
+    if args.list:
+        active = active_version(args.model, args.versions_dir)
+        for info in list_versions(args.versions_dir):
+            marker = "*" if info["version"] == active else " "
+            auc = info.get("holdout_auc_after")
+            auc_text = f"AUC {auc:.4f}" if auc is not None else ""
+            print(f"{marker} {info['version']:<32} parent={info.get('parent', '-'):<32} {auc_text}")
+        return
+
+    if args.rollback is not None:
+        rollback(args.rollback or None, args.model, args.metadata, args.versions_dir)
+        return
+
+    if not args.delta_csv:
+        parser.error("delta_csv mangler")
+    train_incremental(
+        args.delta_csv,
+        model_path=args.model,
+        metadata_path=args.metadata,
+        iterations=args.iterations,
+        learning_rate=args.learning_rate,
+        holdout_size=args.holdout,
+        eval_size=args.eval,
+        tolerance=args.tolerance,
+        force=args.force,
+        versions_dir=args.versions_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
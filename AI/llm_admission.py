@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Adgangskontroll foran Ollama.
+
+Ollama klarer bare noen få generasjoner samtidig. I stedet for å sende alle
+samtidige /analyze-kall rett videre (og la alle time ut sammen) slipper
+AdmissionController inn maks `max_concurrency` kall om gangen. Resten venter
+i en prioritetskø:
+- kategori-mapping (kort, billig) går foran full VC-vurdering
+- er køen full, kastes den minst viktige ventende jobben ut (eller den nye
+  avvises) med LLMOverloaded
+- venter en jobb lenger enn `max_wait`, avvises den med LLMOverloaded
+
+Kalleren faller da tilbake til data-only-resultat.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 2))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", 32))
+LLM_MAX_QUEUE_WAIT = float(os.environ.get("LLM_MAX_QUEUE_WAIT", 30))
+
+# Lavere tall = høyere prioritet
+PRIORITY_CATEGORY = 0
+PRIORITY_SCORE = 10
+PRIORITY_VC = 20
+PRIORITY_EXPLAIN = 30
+
+_WAIT_SAMPLES = 1000
+
+
+class LLMOverloaded(RuntimeError):
+    """LLM-kallet ble avvist av adgangskontrollen (full kø eller for lang ventetid)."""
+
+
+class AdmissionController:
+    """Begrenset samtidighet + prioritetskø for async LLM-kall."""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        max_wait: float = LLM_MAX_QUEUE_WAIT,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self.in_flight = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.evicted = 0
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._max_wait_seen = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._queue if not fut.done())
+
+    def _record_wait(self, waited: float) -> None:
+        self.admitted += 1
+        self._waits.append(waited)
+        self._max_wait_seen = max(self._max_wait_seen, waited)
+
+    def _make_room(self, priority: int) -> None:
+        """Full kø: kast ut en ventende jobb med lavere prioritet, ellers avvis."""
+        waiting = [entry for entry in self._queue if not entry[2].done()]
+        if len(waiting) < self.max_queue:
+            return
+
+        worst = max(waiting, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            self.rejected_queue_full += 1
+            raise LLMOverloaded("LLM-køen er full")
+
+        worst[2].set_exception(LLMOverloaded("Fortrengt av høyere prioritert LLM-kall"))
+        self.evicted += 1
+
+    async def acquire(self, priority: int) -> None:
+        if self.in_flight < self.max_concurrency and self.queue_depth == 0:
+            self.in_flight += 1
+            self._record_wait(0.0)
+            return
+
+        self._make_room(priority)
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), fut))
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                # Fikk plass akkurat idet ventetiden gikk ut – behold den
+                self._record_wait(time.monotonic() - started)
+                return
+            fut.cancel()
+            self.rejected_timeout += 1
+            raise LLMOverloaded(f"Ventet over {self.max_wait} s i LLM-køen")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self.release()  # plassen ble gitt til oss, men vi rakk ikke bruke den
+            else:
+                fut.cancel()
+            raise
+
+        self._record_wait(time.monotonic() - started)
+
+    def release(self) -> None:
+        # Gi plassen direkte videre til neste ventende med høyest prioritet
+        while self._queue:
+            _, _, fut = heapq.heappop(self._queue)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = list(self._waits)
+        if len(waits) >= 2:
+            quantiles = statistics.quantiles(waits, n=100, method="inclusive")
+            p50, p95 = quantiles[49], quantiles[94]
+        else:
+            p50 = p95 = waits[0] if waits else 0.0
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "evicted": self.evicted,
+            "wait_seconds_p50": p50,
+            "wait_seconds_p95": p95,
+            "wait_seconds_max": self._max_wait_seen,
+        }
+
+
+_CONTROLLER: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Delt kontroller for prosessen (brukes fra service sin event-loop)."""
+    global _CONTROLLER
+    if _CONTROLLER is None:
+        _CONTROLLER = AdmissionController()
+    return _CONTROLLER
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Cache for Ollama-svar.
+
+Alle kall går med temperature 0–0.1, så samme (modell, prompt, options) gir
+i praksis samme svar. Cachen har to nivåer:
+- minne: LRU med et fast antall oppføringer
+- disk: SQLite-fil som overlever restart, med TTL og størrelsesgrense
+  (eldst brukte oppføringer kastes først)
+
+Nøkkelen er en SHA-256 av modellnavn, prompt (med normalisert whitespace)
+og options, så små whitespace-endringer i en innsendt idé treffer samme svar.
+
+Fra async-kode brukes aget/aset: minne-nivået sjekkes direkte, mens
+SQLite-arbeidet kjøres i en tråd (asyncio.to_thread), så en treg fsync
+aldri stopper event-loopen. Minne og disk har hver sin lås. Disk-treff
+oppdaterer last_access samlet (LLM_CACHE_TOUCH_BATCH om gangen, eller ved
+neste skriving) i stedet for én UPDATE + commit per lesing.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", 512))
+LLM_CACHE_MAX_DISK_BYTES = int(os.environ.get("LLM_CACHE_MAX_DISK_BYTES", 200 * 1024 * 1024))
+LLM_CACHE_TOUCH_BATCH = int(os.environ.get("LLM_CACHE_TOUCH_BATCH", 64))
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_DISABLED", "") not in ("1", "true", "yes")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def make_cache_key(
+    model: str,
+    prompt: str,
+    options: Optional[Dict[str, Any]] = None,
+    **extra: Any,
+) -> str:
+    """
+    Innholdsadressert nøkkel for ett generate-kall. `extra` er andre felt
+    som påvirker svaret (f.eks. system eller format).
+    """
+    material = {
+        "model": model,
+        "prompt": _WHITESPACE_RE.sub(" ", prompt).strip(),
+        "options": options or {},
+        **{k: v for k, v in extra.items() if v is not None},
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """To-nivå cache (minne-LRU + SQLite) for ferdige Ollama-svar."""
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        max_memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_disk_bytes: int = LLM_CACHE_MAX_DISK_BYTES,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()  # minne-nivået og tellerne
+        self._disk_lock = threading.Lock()  # SQLite-forbindelsen og _touches
+        self._conn: Optional[sqlite3.Connection] = None
+        # key -> last_access som ikke er skrevet til disk ennå
+        self._touches: Dict[str, float] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_responses_last_access "
+                    "ON responses(last_access)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLMResponseCache] Disk-cache utilgjengelig, bruker kun minne: {e}")
+                self._conn = None
+
+    # ---------- minne-nivå ----------
+
+    def _memory_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # ---------- disk-nivå ----------
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value_json, created_at = row
+        expires_at = created_at + self.ttl_seconds
+        if expires_at <= now:
+            self._touches.pop(key, None)
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._touches[key] = now
+        if len(self._touches) >= LLM_CACHE_TOUCH_BATCH:
+            self._flush_touches()
+            self._conn.commit()
+        return expires_at, json.loads(value_json)
+
+    def _flush_touches(self) -> None:
+        """Skriver ventende last_access (commit gjøres av kalleren)."""
+        if self._conn is None or not self._touches:
+            return
+        self._conn.executemany(
+            "UPDATE responses SET last_access = ? WHERE key = ?",
+            [(at, key) for key, at in self._touches.items()],
+        )
+        self._touches.clear()
+
+    def _disk_put(self, key: str, value: Dict[str, Any], now: float) -> None:
+        if self._conn is None:
+            return
+        value_json = json.dumps(value, ensure_ascii=False)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, value_json, len(value_json.encode("utf-8")), now, now),
+        )
+        self._touches.pop(key, None)
+        self._flush_touches()  # eviction skal se oppdatert last_access
+        self._evict_disk(now)
+        self._conn.commit()
+
+    def _evict_disk(self, now: float) -> None:
+        assert self._conn is not None
+        cur = self._conn.execute(
+            "DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,)
+        )
+        self.evictions += max(cur.rowcount, 0)
+
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_disk_bytes:
+            return
+
+        # Kast eldst brukte til vi er under grensen
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+
+    # ---------- oppslag/lagring per nivå ----------
+
+    def _lookup_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._memory_get(key, now)
+            if value is not None:
+                self.memory_hits += 1
+            return value
+
+    def _lookup_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        disk_entry = None
+        if self._conn is not None:
+            try:
+                with self._disk_lock:
+                    disk_entry = self._disk_get(key, now)
+            except sqlite3.Error as e:
+                print(f"[LLMResponseCache] Lesefeil: {e}")
+
+        with self._lock:
+            if disk_entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = disk_entry
+            self._memory_put(key, value, expires_at)
+            self.disk_hits += 1
+            return value
+
+    def _remember(self, key: str, value: Dict[str, Any], now: float) -> None:
+        with self._lock:
+            self._memory_put(key, value, now + self.ttl_seconds)
+            self.stores += 1
+
+    def _store_disk(self, key: str, value: Dict[str, Any], now: float) -> None:
+        try:
+            with self._disk_lock:
+                self._disk_put(key, value, now)
+        except sqlite3.Error as e:
+            print(f"[LLMResponseCache] Skrivefeil: {e}")
+
+    # ---------- offentlig API ----------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Synkront oppslag – for tråder/sync-kode. Fra async-kode: aget."""
+        now = time.time()
+        value = self._lookup_memory(key, now)
+        if value is not None:
+            return value
+        return self._lookup_disk(key, now)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Synkron lagring – for tråder/sync-kode. Fra async-kode: aset."""
+        now = time.time()
+        self._remember(key, value, now)
+        if self._conn is not None:
+            self._store_disk(key, value, now)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Som get, men disk-oppslaget kjøres utenfor event-loopen."""
+        now = time.time()
+        value = self._lookup_memory(key, now)
+        if value is not None or self._conn is None:
+            return value if value is not None else self._lookup_disk(key, now)
+        return await asyncio.to_thread(self._lookup_disk, key, now)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """Som set, men disk-skrivingen kjøres utenfor event-loopen."""
+        now = time.time()
+        self._remember(key, value, now)
+        if self._conn is not None:
+            await asyncio.to_thread(self._store_disk, key, value, now)
+
+    def flush(self) -> None:
+        """Skriver ventende last_access til disk."""
+        if self._conn is None:
+            return
+        with self._disk_lock:
+            self._flush_touches()
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._disk_lock:
+            self._touches.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        disk_entries = 0
+        disk_bytes = 0
+        if self._conn is not None:
+            with self._disk_lock:
+                disk_entries, disk_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+            }
+
+
+_CACHE: Optional[LLMResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Prosess-global cache, eller None hvis den er slått av (LLM_CACHE_DISABLED=1)."""
+    global _CACHE
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = LLMResponseCache()
+    return _CACHE
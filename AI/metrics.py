@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Metrikker for analyse-pipelinen i Prometheus-tekstformat (uten ekstra
+avhengigheter).
+
+- Counter / Gauge / Histogram med labels, trådsikre (CatBoost kjører i
+  tråder via asyncio.to_thread)
+- stage("navn"): måler et steg i pipelinen (kategori-mapping, preprocess,
+  predict_proba, VC-generering, ...) inn i analysis_stage_seconds og i
+  Server-Timing for forespørselen som pågår
+- start_fallback_tracking(): LLM_FALLBACKS noterer også hvilke steg som
+  falt tilbake i analysen som pågår (brukes av gjenbruksvinduet i service)
+- register_collector(fn): tall som allerede telles andre steder (LLM-cache,
+  adgangskontroll, jobbkø, prompt-tokens) hentes først når /metrics leses
+- render(): hele registeret som tekst til GET /metrics
+"""
+from __future__ import annotations
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+LabelKey = Tuple[str, ...]
+# (navn, type, hjelpetekst, [(labels, verdi)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: forventet labels {self.labelnames}, fikk {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:  # pragma: no cover - overstyres
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(k))} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> ([antall per bøtte], sum, antall)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), s, n) for k, (c, s, n) in self._values.items()]
+        lines = []
+        for key, counts, total, n in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {n}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrikk {metric.name} er allerede registrert")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as exc:  # en feilende kilde skal ikke ta ned /metrics
+                print(f"[metrics] Collector feilet: {exc}")
+                continue
+            for name, type_name, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(float(value))}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def gauge(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labelnames))
+
+
+def histogram(
+    name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]) -> None:
+    REGISTRY.register_collector(collector)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ---------- fallbacks per analyse ----------
+
+_REQUEST_FALLBACKS: contextvars.ContextVar[Optional[List[Tuple[str, str]]]] = contextvars.ContextVar(
+    "request_fallbacks", default=None
+)
+
+
+def start_fallback_tracking() -> contextvars.Token:
+    """Ny liste over (steg, årsak) for fallbacks i analysen (arves av tasks)."""
+    return _REQUEST_FALLBACKS.set([])
+
+
+def finish_fallback_tracking(token: contextvars.Token) -> List[Tuple[str, str]]:
+    fallbacks = _REQUEST_FALLBACKS.get() or []
+    _REQUEST_FALLBACKS.reset(token)
+    return fallbacks
+
+
+class _FallbackCounter(Counter):
+    """Counter som også noterer fallbacken på analysen som pågår."""
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        super().inc(amount, **labels)
+        fallbacks = _REQUEST_FALLBACKS.get()
+        if fallbacks is not None:
+            fallbacks.append((str(labels.get("stage")), str(labels.get("reason"))))
+
+
+# ---------- metrikker for pipelinen ----------
+
+STAGE_SECONDS = histogram(
+    "analysis_stage_seconds",
+    "Tid per steg i analyse-pipelinen",
+    ["stage"],
+)
+ANALYSES_IN_FLIGHT = gauge("analysis_in_flight", "Analyser som kjører nå")
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_seconds",
+    "Tid for Ollama-kall (kun cache-bom), per kall-type",
+    ["kind"],
+)
+LLM_PROMPT_TOKENS = counter(
+    "llm_prompt_tokens_total", "Prompt-tokens evaluert av Ollama (prompt_eval_count)", ["kind"]
+)
+LLM_COMPLETION_TOKENS = counter(
+    "llm_completion_tokens_total", "Tokens generert av Ollama (eval_count)", ["kind"]
+)
+LLM_FALLBACKS = REGISTRY.register(
+    _FallbackCounter(
+        "llm_fallbacks_total",
+        "LLM-steg som falt tilbake (overloaded, error, partial, weak_pitch)",
+        ["stage", "reason"],
+    )
+)
+LLM_PARSE_FAILURES = counter(
+    "llm_parse_failures_total", "Svar fra LLaMA som ikke kunne tolkes helt", ["kind"]
+)
+CATEGORY_MAPPINGS = counter(
+    "category_mappings_total", "Kategori-mappinger etter kilde (local, llm, none)", ["source"]
+)
+
+
+def record_llm_usage(kind: str, response: Dict[str, Any]) -> None:
+    """Token-tellere fra et Ollama-svar (siste linje ved streaming)."""
+    prompt_tokens = response.get("prompt_eval_count")
+    if isinstance(prompt_tokens, int):
+        LLM_PROMPT_TOKENS.inc(prompt_tokens, kind=kind)
+    completion_tokens = response.get("eval_count")
+    if isinstance(completion_tokens, int):
+        LLM_COMPLETION_TOKENS.inc(completion_tokens, kind=kind)
+
+
+# ---------- Server-Timing per forespørsel ----------
+
+_REQUEST_TIMINGS: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timing() -> contextvars.Token:
+    """Ny timing-liste for forespørselen (arves av tasks og asyncio.to_thread)."""
+    return _REQUEST_TIMINGS.set([])
+
+
+def finish_request_timing(token: contextvars.Token) -> List[Tuple[str, float]]:
+    timings = _REQUEST_TIMINGS.get() or []
+    _REQUEST_TIMINGS.reset(token)
+    return timings
+
+
+def server_timing_header(timings: Sequence[Tuple[str, float]]) -> str:
+    """Server-Timing: stage;dur=<ms>, ... (samme steg summeres)."""
+    totals: Dict[str, float] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Måler et steg: histogram + Server-Timing for gjeldende forespørsel."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _REQUEST_TIMINGS.get()
+        if timings is not None:
+            timings.append((name, elapsed))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Oppvarming og readiness for AI-tjenesten.
+
+Første /analyze etter en omstart (eller etter at Ollama har lastet ut
+modellen) betaler for å laste llama3.1:8b og for å deserialisere CatBoost.
+Ved oppstart:
+- lastes CatBoost-modellen og kategori-indeksen, og det gjøres én
+  prediksjon (gjøres i service sin lifespan)
+- sendes en oppvarmings-generering til Ollama med keep_alive, som laster
+  modellen og fyller KV-cachen med det faste VC-prefikset
+- holdes modellen i minnet med en periodisk keep-alive-ping
+
+Readiness holdes adskilt fra liveness: tjenesten lever så snart prosessen
+svarer, men er "ready" først når de påkrevde sjekkene er grønne. LLaMA er
+bare påkrevd med READY_REQUIRES_LLM=1, siden /analyze ellers faller
+tilbake til data-score.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from ollama_client import get_async_ollama_client
+from ollama_explainer import MODEL_NAME, OLLAMA_KEEP_ALIVE, VC_SYSTEM
+
+OLLAMA_WARMUP = os.environ.get("OLLAMA_WARMUP", "1") not in ("0", "false", "no")
+OLLAMA_WARMUP_TIMEOUT = float(os.environ.get("OLLAMA_WARMUP_TIMEOUT", 300))
+OLLAMA_KEEP_ALIVE_INTERVAL = float(os.environ.get("OLLAMA_KEEP_ALIVE_INTERVAL", 240))
+READY_REQUIRES_LLM = os.environ.get("READY_REQUIRES_LLM", "") in ("1", "true", "yes")
+
+CHECK_CATBOOST = "catboost"
+CHECK_CATEGORIES = "categories"
+CHECK_LLM = "llm"
+
+
+class Readiness:
+    """Status per oppstartssjekk; ready når alle påkrevde er OK."""
+
+    def __init__(self, require_llm: bool = READY_REQUIRES_LLM) -> None:
+        self.required = [CHECK_CATBOOST, CHECK_CATEGORIES] + ([CHECK_LLM] if require_llm else [])
+        self._checks: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+
+    def mark(self, name: str, ok: bool, detail: str = "") -> None:
+        self._checks[name] = {"ok": ok, "detail": detail, "checked_at": time.time()}
+
+    @property
+    def ready(self) -> bool:
+        return all(self._checks.get(name, {}).get("ok") for name in self.required)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "required": self.required,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "checks": dict(self._checks),
+        }
+
+
+READINESS = Readiness()
+
+
+async def _load_llm(timeout: float) -> Dict[str, Any]:
+    # Generate uten prompt laster bare modellen (og forlenger keep_alive)
+    return await get_async_ollama_client().generate(
+        {"model": MODEL_NAME, "keep_alive": OLLAMA_KEEP_ALIVE, "stream": False},
+        timeout=timeout,
+    )
+
+
+async def warm_up_llm(readiness: Readiness = READINESS) -> None:
+    """
+    Laster modellen i Ollama og evaluerer det faste VC-prefikset én gang,
+    så første ekte kall slipper begge deler. Feil logges og markeres, men
+    stopper ikke oppstarten.
+    """
+    started = time.monotonic()
+    try:
+        await _load_llm(OLLAMA_WARMUP_TIMEOUT)
+        await get_async_ollama_client().generate(
+            {
+                "model": MODEL_NAME,
+                "system": VC_SYSTEM,
+                "prompt": "Oppvarming.",
+                "stream": False,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+                "options": {"temperature": 0.0, "num_predict": 1},
+            },
+            timeout=OLLAMA_WARMUP_TIMEOUT,
+        )
+    except Exception as exc:
+        print(f"[warmup] Klarte ikke å varme opp {MODEL_NAME}: {exc}")
+        readiness.mark(CHECK_LLM, False, str(exc))
+        return
+
+    elapsed = time.monotonic() - started
+    print(f"[warmup] {MODEL_NAME} lastet og varmet opp på {elapsed:.1f} s")
+    readiness.mark(CHECK_LLM, True, f"varmet opp på {elapsed:.1f} s")
+
+
+async def keep_llm_resident(
+    interval: float = OLLAMA_KEEP_ALIVE_INTERVAL,
+    readiness: Readiness = READINESS,
+) -> None:
+    """Pinger Ollama jevnlig så modellen ikke lastes ut mellom forespørsler."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await _load_llm(OLLAMA_WARMUP_TIMEOUT)
+            readiness.mark(CHECK_LLM, True, "keep-alive OK")
+        except Exception as exc:
+            print(f"[warmup] Keep-alive mot Ollama feilet: {exc}")
+            readiness.mark(CHECK_LLM, False, str(exc))
+
+
+def start_llm_warmup(readiness: Readiness = READINESS) -> Optional[asyncio.Task]:
+    """
+    Starter oppvarming + keep-alive i bakgrunnen (oppstarten venter ikke på
+    Ollama). Returnerer tasken, som kanselleres ved nedstenging.
+    """
+    if not OLLAMA_WARMUP:
+        readiness.mark(CHECK_LLM, False, "oppvarming slått av (OLLAMA_WARMUP=0)")
+        return None
+
+    async def run() -> None:
+        await warm_up_llm(readiness)
+        if OLLAMA_KEEP_ALIVE_INTERVAL > 0:
+            await keep_llm_resident(OLLAMA_KEEP_ALIVE_INTERVAL, readiness)
+
+    return asyncio.create_task(run(), name="llm-warmup")
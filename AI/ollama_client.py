@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Felles HTTP-klient mot Ollama.
+
+- Én keep-alive-sesjon med connection pool per prosess (sync: requests,
+  async: httpx), i stedet for ny TCP-forbindelse per kall.
+- Timeout kan settes per kall; connect-timeout er kort og separat.
+- Begrenset antall nye forsøk med eksponentiell backoff ved
+  forbindelsesfeil og 429/5xx. Lese-timeout prøves IKKE på nytt
+  (da har modellen allerede brukt hele budsjettet).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", 120))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", 5))
+OLLAMA_MAX_RETRIES = int(os.environ.get("OLLAMA_MAX_RETRIES", 2))
+OLLAMA_RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", 0.5))
+OLLAMA_POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", 16))
+
+GENERATE_PATH = "/api/generate"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OllamaError(RuntimeError):
+    """Ollama svarte ikke, eller svarte med feil etter alle forsøk."""
+
+
+def _backoff_delay(attempt: int, base: float) -> float:
+    # 0.5s, 1s, 2s ... med litt jitter så samtidige klienter ikke synkroniseres
+    return base * (2 ** attempt) * random.uniform(0.75, 1.25)
+
+
+class OllamaClient:
+    """Synkron klient med requests.Session (keep-alive + pool)."""
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        timeout: float = OLLAMA_TIMEOUT,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        backoff: float = OLLAMA_RETRY_BACKOFF,
+        pool_size: int = OLLAMA_POOL_SIZE,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST til /api/generate (payload["stream"] bør være False)."""
+        url = self.base_url + GENERATE_PATH
+        read_timeout = self.timeout if timeout is None else timeout
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                resp = self._session.post(
+                    url, json=payload, timeout=(self.connect_timeout, read_timeout)
+                )
+            except requests.ReadTimeout as e:
+                raise OllamaError(f"Ollama svarte ikke innen {read_timeout} s") from e
+            except requests.ConnectionError as e:
+                if last_attempt:
+                    raise OllamaError(f"Fikk ikke kontakt med Ollama: {e}") from e
+            else:
+                if resp.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    resp.raise_for_status()
+                    return resp.json()
+            time.sleep(_backoff_delay(attempt, self.backoff))
+
+        raise OllamaError("Ingen forsøk igjen")  # pragma: no cover - løkken returnerer/kaster
+
+    def stream_generate(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        POST til /api/generate med "stream": true. Gir én dict per linje fra
+        Ollama. Lukkes generatoren før svaret er ferdig, lukkes forbindelsen
+        og Ollama avbryter genereringen. Nye forsøk bare før første linje.
+        """
+        url = self.base_url + GENERATE_PATH
+        read_timeout = self.timeout if timeout is None else timeout
+        payload = {**payload, "stream": True}
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            received_any = False
+            try:
+                with self._session.post(
+                    url,
+                    json=payload,
+                    timeout=(self.connect_timeout, read_timeout),
+                    stream=True,
+                ) as resp:
+                    if resp.status_code not in RETRY_STATUS_CODES or last_attempt:
+                        resp.raise_for_status()
+                        for line in resp.iter_lines():
+                            if line.strip():
+                                received_any = True
+                                yield json.loads(line)
+                        return
+            except requests.ReadTimeout as e:
+                raise OllamaError(f"Ollama svarte ikke innen {read_timeout} s") from e
+            except requests.ConnectionError as e:
+                if last_attempt or received_any:
+                    raise OllamaError(f"Forbindelsen til Ollama feilet: {e}") from e
+            time.sleep(_backoff_delay(attempt, self.backoff))
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class AsyncOllamaClient:
+    """Async klient med httpx.AsyncClient (keep-alive + pool)."""
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        timeout: float = OLLAMA_TIMEOUT,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        backoff: float = OLLAMA_RETRY_BACKOFF,
+        pool_size: int = OLLAMA_POOL_SIZE,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.timeout if timeout is None else timeout, connect=self.connect_timeout
+        )
+
+    async def generate(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """POST til /api/generate (payload["stream"] bør være False)."""
+        call_timeout = self._timeout(timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                resp = await self._client.post(GENERATE_PATH, json=payload, timeout=call_timeout)
+            except httpx.ReadTimeout as e:
+                raise OllamaError(f"Ollama svarte ikke innen {call_timeout.read} s") from e
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise OllamaError(f"Fikk ikke kontakt med Ollama: {e}") from e
+            else:
+                if resp.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    resp.raise_for_status()
+                    return resp.json()
+            await asyncio.sleep(_backoff_delay(attempt, self.backoff))
+
+        raise OllamaError("Ingen forsøk igjen")  # pragma: no cover - løkken returnerer/kaster
+
+    async def stream_generate(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        POST til /api/generate med "stream": true. Gir én dict per linje fra
+        Ollama ({"response": "<token>", "done": false, ...}). Timeout gjelder
+        per lesing, ikke hele genereringen. Nye forsøk gjøres bare før første
+        linje er mottatt.
+        """
+        call_timeout = self._timeout(timeout)
+        payload = {**payload, "stream": True}
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            received_any = False
+            try:
+                async with self._client.stream(
+                    "POST", GENERATE_PATH, json=payload, timeout=call_timeout
+                ) as resp:
+                    if resp.status_code not in RETRY_STATUS_CODES or last_attempt:
+                        resp.raise_for_status()
+                        async for line in resp.aiter_lines():
+                            if line.strip():
+                                received_any = True
+                                yield json.loads(line)
+                        return
+            except httpx.ReadTimeout as e:
+                raise OllamaError(f"Ollama svarte ikke innen {call_timeout.read} s") from e
+            except httpx.TransportError as e:
+                if last_attempt or received_any:
+                    raise OllamaError(f"Forbindelsen til Ollama feilet: {e}") from e
+            await asyncio.sleep(_backoff_delay(attempt, self.backoff))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_SYNC_CLIENT: Optional[OllamaClient] = None
+_SYNC_LOCK = threading.Lock()
+_ASYNC_CLIENTS: Dict[int, Tuple[asyncio.AbstractEventLoop, AsyncOllamaClient]] = {}
+
+
+def get_ollama_client() -> OllamaClient:
+    """Delt synkron klient for hele prosessen."""
+    global _SYNC_CLIENT
+    if _SYNC_CLIENT is None:
+        with _SYNC_LOCK:
+            if _SYNC_CLIENT is None:
+                _SYNC_CLIENT = OllamaClient()
+    return _SYNC_CLIENT
+
+
+def get_async_ollama_client() -> AsyncOllamaClient:
+    """
+    Delt async klient for event-loopen som kjører nå. httpx-klienter er
+    bundet til loopen de ble laget i, så hver loop får sin egen.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _ASYNC_CLIENTS.get(id(loop))
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+
+    # Rydd bort klienter fra looper som er lukket
+    for key in [k for k, (l, _) in _ASYNC_CLIENTS.items() if l.is_closed()]:
+        del _ASYNC_CLIENTS[key]
+
+    client = AsyncOllamaClient()
+    _ASYNC_CLIENTS[id(loop)] = (loop, client)
+    return client
+
+
+async def close_async_ollama_client() -> None:
+    """Lukker klienten for gjeldende loop (kalles ved nedstenging)."""
+    loop = asyncio.get_running_loop()
+    entry = _ASYNC_CLIENTS.pop(id(loop), None)
+    if entry is not None:
+        await entry[1].aclose()
@@ -7,30 +7,172 @@ Created on Wed Dec 10 10:36:26 2025
 
 # ollama_explainer.py
 import json
-import requests
+import os
+from contextlib import aclosing, closing
 from textwrap import dedent
+from typing import AsyncIterator
+
+from category_matcher import CategoryMatcher, get_category_matcher
+from llm_admission import (
+    PRIORITY_CATEGORY,
+    PRIORITY_VC,
+    LLMOverloaded,
+    get_admission_controller,
+)
+from llm_cache import get_llm_cache, make_cache_key
+from metrics import (
+    CATEGORY_MAPPINGS,
+    LLM_FALLBACKS,
+    LLM_PARSE_FAILURES,
+    LLM_REQUEST_SECONDS,
+    record_llm_usage,
+)
+from ollama_client import get_async_ollama_client, get_ollama_client
+from prompt_budget import PROMPT_STATS, compact_json, compact_startup_data, fit_prompt
+from vc_stream_parser import VC_BLOCKS, VCStreamParser
 
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "llama3.1:8b"   # endre hvis du bruker en annen modell
 
+# Timeout (sekunder) per type kall – kan overstyres med miljøvariabler
+CATEGORY_TIMEOUT = float(os.environ.get("OLLAMA_CATEGORY_TIMEOUT", 60))
+SCORE_TIMEOUT = float(os.environ.get("OLLAMA_SCORE_TIMEOUT", 60))
+VC_TIMEOUT = float(os.environ.get("OLLAMA_VC_TIMEOUT", 120))
+EXPLAIN_TIMEOUT = float(os.environ.get("OLLAMA_EXPLAIN_TIMEOUT", 120))
+
+# Hvor lenge Ollama holder modellen (og KV-cachen for system-prefikset) i
+# minnet etter siste kall
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+
+def _payload(system: str, prompt: str, temperature: float) -> dict:
+    """
+    Payload for /api/generate. De faste instruksjonene ligger i `system` og er
+    byte-identiske fra kall til kall; bare `prompt` (dataene) varierer. Da
+    kan Ollama gjenbruke den allerede prosesserte prefiksen i KV-cachen og
+    bare evaluere de nye tokenene.
+    """
+    return {
+        "model": MODEL_NAME,
+        "system": system,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": temperature},
+    }
+
+
+def _cache_key(payload: dict) -> str:
+    return make_cache_key(
+        payload["model"],
+        payload["prompt"],
+        payload.get("options"),
+        system=payload.get("system"),
+        format=payload.get("format"),
+    )
+
+
+def _finish_response(data: dict, kind: str) -> bool:
+    """Rydder svaret og registrerer bruk. True hvis svaret skal caches."""
+    data.pop("context", None)  # token-kontekst er stor og trengs ikke
+    PROMPT_STATS.record_prompt_eval(kind, data)
+    record_llm_usage(kind, data)
+    return bool(data.get("response", "").strip())
+
+
+def _ollama_generate(payload: dict, timeout: float, kind: str) -> dict:
+    """
+    Kaller Ollama /api/generate (uten streaming) og returnerer svar-JSON.
+    Identiske (modell, prompt, options) hentes fra llm_cache i stedet.
+    """
+    cache = get_llm_cache()
+    key = None
+    if cache is not None:
+        key = _cache_key(payload)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    with LLM_REQUEST_SECONDS.time(kind=kind):
+        data = get_ollama_client().generate(payload, timeout=timeout)
+    if _finish_response(data, kind) and cache is not None:
+        cache.set(key, data)
+    return data
+
+
+async def _ollama_generate_async(
+    payload: dict, timeout: float, priority: int, kind: str
+) -> dict:
+    """
+    Async-variant av _ollama_generate, med samme cache (aget/aset, så
+    SQLite-arbeidet ikke kjører på event-loopen). Ved cache-bom må kallet
+    gjennom adgangskontrollen (llm_admission) før det når Ollama; kaster
+    LLMOverloaded hvis det blir avvist.
+    """
+    cache = get_llm_cache()
+    key = None
+    if cache is not None:
+        key = _cache_key(payload)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return cached
+
+    async with get_admission_controller().slot(priority):
+        with LLM_REQUEST_SECONDS.time(kind=kind):
+            data = await get_async_ollama_client().generate(payload, timeout=timeout)
+    if _finish_response(data, kind) and cache is not None:
+        await cache.aset(key, data)
+    return data
+
+
+async def generate_structured_async(
+    system: str,
+    prompt: str,
+    schema: dict,
+    *,
+    kind: str,
+    priority: int = PRIORITY_VC,
+    timeout: float = VC_TIMEOUT,
+) -> dict:
+    """
+    Ett generate-kall med JSON-schema (Ollamas `format`) og temperature 0,
+    gjennom samme cache og adgangskontroll som de andre async-kallene.
+    Returnerer svar-JSON fra Ollama; kaster LLMOverloaded hvis kallet avvises.
+    """
+    payload = {**_payload(system, prompt, temperature=0.0), "format": schema}
+    return await _ollama_generate_async(payload, timeout=timeout, priority=priority, kind=kind)
+
+
+# (felt i startup_data, etikett i prompten) – felt uten innhold utelates
+_STARTUP_FIELDS = (
+    ("category_list", "Marked / hovedkategori"),
+    ("country_code", "Land"),
+    ("region", "Region"),
+    ("city", "By"),
+    ("funding_total_usd", "Total funding (USD)"),
+    ("funding_rounds", "Antall funding-runder"),
+    ("founded_at", "Stiftelsesdato"),
+    ("first_funding_at", "Dato for første funding"),
+    ("last_funding_at", "Dato for siste funding"),
+)
+
+
+def _startup_lines(startup_data: dict, fields=_STARTUP_FIELDS) -> list[str]:
+    """Punktliste over feltene som faktisk har innhold (ingen "Unknown"/None)."""
+    compact = compact_startup_data(startup_data)
+    return [f"- {label}: {compact[key]}" for key, label in fields if key in compact]
+
 
 def _build_context(startup_data: dict, result: dict, idea_text: str | None = None) -> str:
     """Bygger en lesbar tekst av structured data + modellresultat + pitch."""
     lines = []
 
-    lines.append("Strukturert informasjon om startupen:")
-    lines.append(f"- Marked / hovedkategori: {startup_data.get('category_list')}")
-    lines.append(f"- Land: {startup_data.get('country_code')}")
-    lines.append(f"- Region: {startup_data.get('region')}")
-    lines.append(f"- By: {startup_data.get('city')}")
-    lines.append(f"- Total funding (USD): {startup_data.get('funding_total_usd')}")
-    lines.append(f"- Antall funding-runder: {startup_data.get('funding_rounds')}")
-    lines.append(f"- Stiftelsesdato: {startup_data.get('founded_at')}")
-    lines.append(f"- Dato for første funding: {startup_data.get('first_funding_at')}")
-    lines.append(f"- Dato for siste funding: {startup_data.get('last_funding_at')}")
-
-    lines.append("")
+    startup_lines = _startup_lines(startup_data)
+    if startup_lines:
+        lines.append("Strukturert informasjon om startupen:")
+        lines.extend(startup_lines)
+        lines.append("")
+
     lines.append("Prediksjon fra maskinlæringsmodellen:")
     lines.append(f"- Sannsynlighet for suksess: {result['success_probability']:.3f}")
     lines.append(f"- Suksess-score (0–100): {result['success_score']:.2f}")
@@ -44,6 +186,33 @@ def _build_context(startup_data: dict, result: dict, idea_text: str | None = Non
     return "\n".join(lines)
 
 
+EXPLAIN_SYSTEM = dedent("""
+    Du er en erfaren startup-rådgiver og investoranalytiker.
+
+    Du får:
+    - strukturert informasjon om en startup
+    - resultatet fra en data-basert prediksjonsmodell (historiske mønstre)
+    - en separat idé-score som vurderer selve forretningsidéen
+    - en kombinert totalscore (dersom begge finnes)
+    - eventuelt en kort pitch skrevet av gründeren
+
+    Forklaringsoppgave:
+    1. Forklar kort hva den data-baserte scoren sier (uten å overdytte detaljer).
+    2. Forklar hvordan idé-scoren påvirker helhetsbildet:
+       - Er idéen sterkere/svakere enn det dataene skulle tilsi?
+    3. Sett dette sammen til en forståelig tolkning av den kombinerte scoren
+       (hvis totalscore er gitt).
+    4. Gi 3–5 konkrete, praktiske råd til gründeren om hvordan de kan
+       forbedre posisjonen sin (produkt, marked, finansiering, strategi).
+    5. Skriv på norsk, i en vennlig men ærlig tone.
+    6. Ikke vær altfor lang; 3–6 avsnitt holder, bruk gjerne punktlister.
+""").strip()
+
+
+def _explain_prompt(context: str) -> str:
+    return f"Her er dataene:\n\n{context}\n\nNå kan du skrive analysen din på norsk:"
+
+
 def explain_prediction(
     startup_data: dict,
     result: dict,
@@ -57,17 +226,11 @@ def explain_prediction(
     """
     lines = []
 
-    lines.append("Strukturert informasjon om startupen:")
-    lines.append(f"- Marked / hovedkategori: {startup_data.get('category_list')}")
-    lines.append(f"- Land: {startup_data.get('country_code')}")
-    lines.append(f"- Region: {startup_data.get('region')}")
-    lines.append(f"- By: {startup_data.get('city')}")
-    lines.append(f"- Total funding (USD): {startup_data.get('funding_total_usd')}")
-    lines.append(f"- Antall funding-runder: {startup_data.get('funding_rounds')}")
-    lines.append(f"- Stiftelsesdato: {startup_data.get('founded_at')}")
-    lines.append(f"- Dato for første funding: {startup_data.get('first_funding_at')}")
-    lines.append(f"- Dato for siste funding: {startup_data.get('last_funding_at')}")
-    lines.append("")
+    startup_lines = _startup_lines(startup_data)
+    if startup_lines:
+        lines.append("Strukturert informasjon om startupen:")
+        lines.extend(startup_lines)
+        lines.append("")
 
     lines.append("Data-basert prediksjon (historiske mønstre):")
     lines.append(f"- Sannsynlighet for suksess (data-modell): {result['success_probability']:.3f}")
@@ -84,87 +247,26 @@ def explain_prediction(
         lines.append("Kombinert vurdering:")
         lines.append(f"- Total suksess-score (kombinert): {final_score:.2f}")
 
-    if idea_text and idea_text.strip():
-        lines.append("")
-        lines.append("Gründerens idé / pitch:")
-        lines.append(idea_text.strip())
-
-    context = "\n".join(lines)
-
-    prompt = dedent(f"""
-    Du er en erfaren startup-rådgiver og investoranalytiker.
-
-    Du får:
-    - strukturert informasjon om en startup
-    - resultatet fra en data-basert prediksjonsmodell (historiske mønstre)
-    - en separat idé-score som vurderer selve forretningsidéen
-    - en kombinert totalscore (dersom begge finnes)
-    - eventuelt en kort pitch skrevet av gründeren
-
-    Forklaringsoppgave:
-    1. Forklar kort hva den data-baserte scoren sier (uten å overdytte detaljer).
-    2. Forklar hvordan idé-scoren påvirker helhetsbildet:
-       - Er idéen sterkere/svakere enn det dataene skulle tilsi?
-    3. Sett dette sammen til en forståelig tolkning av den kombinerte scoren
-       (hvis totalscore er gitt).
-    4. Gi 3–5 konkrete, praktiske råd til gründeren om hvordan de kan
-       forbedre posisjonen sin (produkt, marked, finansiering, strategi).
-    5. Skriv på norsk, i en vennlig men ærlig tone.
-    6. Ikke vær altfor lang; 3–6 avsnitt holder, bruk gjerne punktlister.
-
-    Her er dataene:
-
-    {context}
-
-    Nå kan du skrive analysen din på norsk:
-    """).strip()
+    def render(pitch: str) -> str:
+        context_lines = list(lines)
+        if pitch.strip():
+            context_lines.append("")
+            context_lines.append("Gründerens idé / pitch:")
+            context_lines.append(pitch.strip())
+        return _explain_prompt("\n".join(context_lines))
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.0
-        },
-    }
+    prompt, _ = fit_prompt("explain", render, idea_text or "", prefix=EXPLAIN_SYSTEM)
+    payload = _payload(EXPLAIN_SYSTEM, prompt, temperature=0.0)
 
     try:
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=120)
-        resp.raise_for_status()
-        data = resp.json()
+        data = _ollama_generate(payload, timeout=EXPLAIN_TIMEOUT, kind="explain")
         text = data.get("response", "").strip()
         return text or "Klarte ikke å generere en forklaring fra modellen."
     except Exception as e:
         return f"(Feil ved kall til Ollama: {e})"
 
-    
-def score_idea_with_ollama(idea_text: str, startup_data: dict | None = None) -> float:
-    """
-    Bruker Ollama til å gi en idé-score (0–100) basert på pitch-teksten,
-    og evt. litt strukturert info om startupen.
 
-    Returnerer et flyttall mellom 0 og 100.
-    Hvis noe går galt, returnerer den 50.0 som "nøytral" score.
-    """
-    if not idea_text or not idea_text.strip() or len(idea_text.split()) < 5:
-        return 10.0  # veldig svak idé
-
-    context_lines = []
-    if startup_data is not None:
-        context_lines.append("Strukturert informasjon (kontekst, ikke fasit):")
-        context_lines.append(f"- Marked / hovedkategori: {startup_data.get('category_list')}")
-        context_lines.append(f"- Land: {startup_data.get('country_code')}")
-        context_lines.append(f"- Region: {startup_data.get('region')}")
-        context_lines.append(f"- By: {startup_data.get('city')}")
-        context_lines.append(f"- Total funding (USD): {startup_data.get('funding_total_usd')}")
-        context_lines.append(f"- Antall funding-runder: {startup_data.get('funding_rounds')}")
-        context_lines.append("")
-    context_lines.append("Pitch / idé skrevet av gründeren:")
-    context_lines.append(idea_text.strip())
-
-    context = "\n".join(context_lines)
-
-    prompt = dedent(f"""
+SCORE_SYSTEM = dedent("""
     Du er en erfaren tidligfase-investor.
 
     Du skal vurdere KUN selve forretningsidéen, basert på:
@@ -186,27 +288,40 @@ def score_idea_with_ollama(idea_text: str, startup_data: dict | None = None) ->
     - Vurder bare idéen slik den er beskrevet her.
     - Svar KUN med ett heltall mellom 0 og 100.
     - Ingen forklaring, ingen ekstra tekst, bare tallet.
+""").strip()
 
-    Her er informasjonen:
 
-    {context}
+def _score_prompt(context: str) -> str:
+    return f"Her er informasjonen:\n\n{context}\n\nNå: svar KUN med tallet (0–100)."
 
-    Nå: svar KUN med tallet (0–100).
-    """).strip()
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.0,  # mer stabil vurdering
-        },
-    }
+def score_idea_with_ollama(idea_text: str, startup_data: dict | None = None) -> float:
+    """
+    Bruker Ollama til å gi en idé-score (0–100) basert på pitch-teksten,
+    og evt. litt strukturert info om startupen.
+
+    Returnerer et flyttall mellom 0 og 100.
+    Hvis noe går galt, returnerer den 50.0 som "nøytral" score.
+    """
+    if not idea_text or not idea_text.strip() or len(idea_text.split()) < 5:
+        return 10.0  # veldig svak idé
+
+    structured = []
+    startup_lines = _startup_lines(startup_data, _STARTUP_FIELDS[:6]) if startup_data else []
+    if startup_lines:
+        structured.append("Strukturert informasjon (kontekst, ikke fasit):")
+        structured.extend(startup_lines)
+        structured.append("")
+
+    def render(pitch: str) -> str:
+        context_lines = structured + ["Pitch / idé skrevet av gründeren:", pitch.strip()]
+        return _score_prompt("\n".join(context_lines))
+
+    prompt, _ = fit_prompt("score", render, idea_text, prefix=SCORE_SYSTEM)
+    payload = _payload(SCORE_SYSTEM, prompt, temperature=0.0)  # lav temp = stabil vurdering
 
     try:
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
+        data = _ollama_generate(payload, timeout=SCORE_TIMEOUT, kind="score")
         raw = data.get("response", "").strip()
 
         import re
@@ -221,95 +336,205 @@ def score_idea_with_ollama(idea_text: str, startup_data: dict | None = None) ->
         print(f"[score_idea_with_ollama] Feil ved kall til Ollama: {e}")
         return 50.0
 
-def map_text_to_category_with_llama(text: str, all_categories: list[str]) -> str:
+
+def resolve_llm_category(
+    raw: str,
+    matcher: CategoryMatcher,
+    candidates: list[str],
+) -> str | None:
+    """Finner kategorien LLaMA mente, via indeksen i stedet for lineære søk."""
+    # 1) Eksakt match (case-/tegnsettings-insensitivt)
+    exact = matcher.exact(raw)
+    if exact is not None:
+        return exact
+
+    # 2) Delvis match mot kandidatlisten: svaret er inni en kategori eller omvendt
+    raw_lower = raw.lower()
+    for cat in candidates:
+        if raw_lower in cat.lower() or cat.lower() in raw_lower:
+            return cat
+
+    # 3) Nærmeste kategori i hele indeksen, med lavere terskel enn for fritekst
+    return matcher.match(raw, min_score=0.6, min_margin=0.0)
+
+
+CATEGORY_SYSTEM = dedent("""
+    Du skal matche en fritekst-beskrivelse av et marked eller en teknologi
+    til den kategorien fra listen du får som passer best.
+
+    Regler:
+    - Velg KUN én kategori.
+    - Kategorien MÅ være hentet fra listen.
+    - Svar KUN med kategorinavnet, uten ekstra tekst.
+""").strip()
+
+# Ingen overlapp med noen kategori (typisk norsk tekst): be om et kort
+# engelsk bransjenavn og slå det opp i indeksen etterpå
+CATEGORY_NAME_SYSTEM = dedent("""
+    Du skal beskrive et marked eller en teknologi med et kort engelsk
+    bransjenavn slik det brukes i Crunchbase (f.eks. "Software", "Health Care",
+    "E-Commerce", "Restaurants", "Education").
+
+    Regler:
+    - Svar med ETT navn på 1–3 engelske ord.
+    - Svar KUN med navnet, uten ekstra tekst.
+""").strip()
+
+
+def _category_mapping_prompt(text: str, candidates: list[str]) -> str:
+    if candidates:
+        categories_preview = "\n".join(f"- {c}" for c in candidates)
+        return (
+            f"Kategorier:\n{categories_preview}\n\n"
+            f"Fritekst:\n{text}\n\n"
+            "Svar kun med kategorinavnet:"
+        )
+    return f"Fritekst:\n{text}\n\nSvar kun med bransjenavnet:"
+
+
+def _category_mapping_payload(text: str, candidates: list[str]) -> dict:
+    system = CATEGORY_SYSTEM if candidates else CATEGORY_NAME_SYSTEM
+    prompt, _ = fit_prompt(
+        "category", lambda t: _category_mapping_prompt(t, candidates), text, prefix=system
+    )
+    return _payload(system, prompt, temperature=0.1)
+
+
+def _parse_category_response(
+    raw: str,
+    matcher: CategoryMatcher,
+    candidates: list[str],
+) -> str | None:
+    raw = raw.strip().strip('"').strip("'")
+
+    if not raw:
+        return None
+
+    # Debug: se hva modellen faktisk svarte
+    print(f"[map_text_to_category_with_llama] LLaMA svarte: {raw!r}")
+
+    resolved = resolve_llm_category(raw, matcher, candidates)
+    if resolved is None:
+        LLM_PARSE_FAILURES.inc(kind="category")
+    return resolved
+
+
+def _count_mapping(result: str | None, source: str) -> str | None:
+    CATEGORY_MAPPINGS.inc(source=source if result is not None else "none")
+    return result
+
+
+def map_text_to_category_with_llama(
+    text: str,
+    all_categories: list[str],
+    matcher: CategoryMatcher | None = None,
+) -> str:
     """
     Mapper brukerens fritekst inn i én kategori som finnes i datasettet.
     Returnerer None hvis den ikke klarer å mappe.
+
+    Lokal indeks (category_matcher) prøves først; LLaMA brukes bare når
+    treffet er usikkert, og får da kun en kort kandidatliste.
     """
 
     if not text or not text.strip():
         return None
 
-    # Bruk ALLE kategorier – ikke kutt til 200
-    categories_preview = "\n".join(f"- {c}" for c in all_categories)
+    if matcher is None:
+        matcher = get_category_matcher(all_categories)
 
-    prompt = f"""
-Du skal matche en fritekst-beskrivelse av et marked eller en teknologi
-til den kategorien fra listen under som passer best.
+    local = matcher.match(text)
+    if local is not None:
+        return _count_mapping(local, "local")
 
-Regler:
-- Velg KUN én kategori.
-- Kategorien MÅ være hentet fra listen.
-- Svar KUN med kategorinavnet, uten ekstra tekst.
+    candidates = matcher.shortlist(text)
+    payload = _category_mapping_payload(text, candidates)
 
-Kategorier:
-{categories_preview}
+    try:
+        data = _ollama_generate(payload, timeout=CATEGORY_TIMEOUT, kind="category")
+        return _count_mapping(
+            _parse_category_response(data.get("response", ""), matcher, candidates), "llm"
+        )
+    except Exception as e:
+        print(f"[map_text_to_category_with_llama] Feil: {e}")
+        LLM_FALLBACKS.inc(stage="category", reason="error")
+        return _count_mapping(None, "llm")
 
-Fritekst:
-{text}
 
-Svar kun med kategorinavnet:
-"""
+async def map_text_to_category_with_llama_async(
+    text: str,
+    all_categories: list[str],
+    matcher: CategoryMatcher | None = None,
+) -> str:
+    """Async-variant av map_text_to_category_with_llama."""
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {"temperature": 0.1},
-    }
+    if not text or not text.strip():
+        return None
 
-    try:
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        resp.raise_for_status()
-        raw = resp.json().get("response", "")
-        raw = raw.strip().strip('"').strip("'")
+    if matcher is None:
+        matcher = get_category_matcher(all_categories)
 
-        if not raw:
-            return None
+    local = matcher.match(text)
+    if local is not None:
+        return _count_mapping(local, "local")
 
-        # Debug: se hva modellen faktisk svarte
-        print(f"[map_text_to_category_with_llama] LLaMA svarte: {raw!r}")
+    candidates = matcher.shortlist(text)
+    payload = _category_mapping_payload(text, candidates)
 
-        # 1) Eksakt match (case-insensitivt)
-        for cat in all_categories:
-            if raw.lower() == cat.lower():
-                return cat
+    try:
+        data = await _ollama_generate_async(
+            payload, timeout=CATEGORY_TIMEOUT, priority=PRIORITY_CATEGORY, kind="category"
+        )
+        return _count_mapping(
+            _parse_category_response(data.get("response", ""), matcher, candidates), "llm"
+        )
+    except Exception as e:
+        print(f"[map_text_to_category_with_llama] Feil: {e}")
+        reason = "overloaded" if isinstance(e, LLMOverloaded) else "error"
+        LLM_FALLBACKS.inc(stage="category", reason=reason)
+        return _count_mapping(None, "llm")
 
-        # 2) Delvis match: hvis svaret er inni en kategori eller omvendt
-        for cat in all_categories:
-            if raw.lower() in cat.lower() or cat.lower() in raw.lower():
-                return cat
 
-        return None
+def is_weak_pitch(idea_text: str) -> bool:
+    """Tom eller veldig kort pitch (under fem ord) – vurderes uten LLaMA."""
+    return not idea_text or not idea_text.strip() or len(idea_text.split()) < 5
 
-    except Exception as e:
-        print(f"[map_text_to_category_with_llama] Feil: {e}")
-        return None
 
+def _vc_weak_pitch_result() -> dict:
+    """Veldig lav score når pitch er tom eller ekstremt kort/uinformativ."""
+    LLM_FALLBACKS.inc(stage="vc", reason="weak_pitch")
+    return {
+        "team": {"score": 1.0, "comment": "Ingen reell pitch eller beskrivelse av team."},
+        "market": {"score": 1.0, "comment": "Ingen beskrivelse av marked eller kunde."},
+        "product": {"score": 1.0, "comment": "Ingen produkt- eller tjenestebeskrivelse."},
+        "potential": {"score": 1.0, "comment": "Ingen informasjon om potensial eller forretningsmodell."},
+        "valuation": {"score": 1.0, "comment": "Ingen informasjon om finansiering, verdsettelse eller exit."},
+        "product_market_fit": {
+            "score": 1.0,
+            "comment": "Ingen beskrivelse av hvordan produktet passer markedet."
+        },
+        "overall_score": 10.0,
+        "overall_comment": "Svært svak vurdering – det er i praksis ingen pitch å vurdere.",
+    }
 
-def vc_evaluate_startup_with_ollama(idea_text: str, startup_data: dict) -> dict:
-    """
-    LLaMA-basert VC-vurdering av en startup.
-    Nå inkluderer den også en eksplisitt vurdering av product–market fit.
-    """
 
-    # Hvis pitch er tom eller ekstremt kort/uinformativ, gi veldig lav score
-    if not idea_text or not idea_text.strip() or len(idea_text.split()) < 5:
-        return {
-            "team": {"score": 1.0, "comment": "Ingen reell pitch eller beskrivelse av team."},
-            "market": {"score": 1.0, "comment": "Ingen beskrivelse av marked eller kunde."},
-            "product": {"score": 1.0, "comment": "Ingen produkt- eller tjenestebeskrivelse."},
-            "potential": {"score": 1.0, "comment": "Ingen informasjon om potensial eller forretningsmodell."},
-            "valuation": {"score": 1.0, "comment": "Ingen informasjon om finansiering, verdsettelse eller exit."},
-            "product_market_fit": {
-                "score": 1.0,
-                "comment": "Ingen beskrivelse av hvordan produktet passer markedet."
-            },
-            "overall_score": 10.0,
-            "overall_comment": "Svært svak vurdering – det er i praksis ingen pitch å vurdere.",
-        }
-
-    prompt = f"""
+def _vc_error_result() -> dict:
+    return {
+        "team": {"score": 5.0, "comment": "Feil under vurdering."},
+        "market": {"score": 5.0, "comment": "Feil under vurdering."},
+        "product": {"score": 5.0, "comment": "Feil under vurdering."},
+        "potential": {"score": 5.0, "comment": "Feil under vurdering."},
+        "valuation": {"score": 5.0, "comment": "Feil under vurdering."},
+        "product_market_fit": {
+            "score": 5.0,
+            "comment": "Feil under vurdering."
+        },
+        "overall_score": 50.0,
+        "overall_comment": "Standardverdi pga teknisk feil i VC-vurderingen.",
+    }
+
+
+VC_SYSTEM = """
 Du er en venture capital-investor.
 
 Vurder denne startupen basert på seks kategorier:
@@ -327,152 +552,278 @@ For hver kategori skal du:
 
 Du skal returnere STRICT JSON med følgende struktur (ingen ekstra tekst):
 
-{{
-  "team": {{
+{
+  "team": {
     "score": <float 0-10>,
     "comment": "<tekst>"
-  }},
-  "market": {{
+  },
+  "market": {
     "score": <float 0-10>,
     "comment": "<tekst>"
-  }},
-  "product": {{
+  },
+  "product": {
     "score": <float 0-10>,
     "comment": "<tekst>"
-  }},
-  "potential": {{
+  },
+  "potential": {
     "score": <float 0-10>,
     "comment": "<tekst>"
-  }},
-  "valuation": {{
+  },
+  "valuation": {
     "score": <float 0-10>,
     "comment": "<tekst>"
-  }},
-  "product_market_fit": {{
+  },
+  "product_market_fit": {
     "score": <float 0-10>,
     "comment": "<tekst som eksplisitt sier om produktet passer markedet eller ikke>"
-  }}
-}}
+  }
+}
 
 Spesielt for product_market_fit:
 - vurder hvor godt produktet/tjenesten faktisk matcher markedet/kategorien,
   målgruppen og kundebehovene
 - si tydelig om det er god match, svak match eller mis-match.
 
-Startup-data (kontekst):
-{json.dumps(startup_data, indent=2, ensure_ascii=False)}
+GI KUN JSON. INGEN FORKLARING.
+""".strip()
 
-Pitch:
-\"\"\"{idea_text}\"\"\"
 
+def _vc_prompt(idea_text: str, startup_context: str) -> str:
+    return (
+        f"Startup-data (kontekst):\n{startup_context}\n\n"
+        f'Pitch:\n"""{idea_text}"""'
+    )
 
-GI KUN JSON. INGEN FORKLARING.
-"""
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {"temperature": 0.0},
+def _vc_payload(idea_text: str, startup_data: dict) -> dict:
+    # Kompakt JSON uten plassholdere (homepage_url, "Unknown") og en pitch
+    # som forkortes hvis prompten ellers går over budsjettet
+    startup_context = compact_json(compact_startup_data(startup_data))
+    prompt, _ = fit_prompt(
+        "vc", lambda pitch: _vc_prompt(pitch, startup_context), idea_text, prefix=VC_SYSTEM
+    )
+    return _payload(VC_SYSTEM, prompt, temperature=0.0)
+
+
+INCOMPLETE_BLOCK_COMMENT = "Ingen vurdering – svaret fra modellen var ufullstendig."
+
+
+def vc_result_from_blocks(blocks: dict[str, dict]) -> dict:
+    """
+    Bygger VC-strukturen fra validerte blokker (se vc_stream_parser).
+    Manglende blokker settes til nøytral 5.0, så delvise svar kan brukes.
+    """
+    result = {
+        name: blocks.get(name) or {"score": 5.0, "comment": INCOMPLETE_BLOCK_COMMENT}
+        for name in VC_BLOCKS
     }
 
+    avg_score = sum(result[name]["score"] for name in VC_BLOCKS) / len(VC_BLOCKS)
+    overall_score = round(avg_score * 10.0, 2)  # 0–10 → 0–100
+
+    overall_comment = "Gjennomsnittlig vurdering basert på fem VC-kriterier pluss product–market fit."
+    missing = [name for name in VC_BLOCKS if name not in blocks]
+    if missing:
+        overall_comment += (
+            f" ({len(missing)} av {len(VC_BLOCKS)} kategorier manglet i svaret "
+            f"og er satt til 5: {', '.join(missing)}.)"
+        )
+
+    result["overall_score"] = overall_score
+    result["overall_comment"] = overall_comment
+    return result
+
+
+def _parse_vc_response(raw: str) -> dict:
+    """Tolker et ferdig VC-svar (tolerant). Kaster hvis ingen blokk er gyldig."""
+    parser = VCStreamParser()
+    parser.feed(raw)
+    if not parser.blocks:
+        raise ValueError(f"Fant ingen gyldige VC-blokker i responsen: {raw[:500]!r}")
+    return vc_result_from_blocks(parser.blocks)
+
+
+def _vc_from_cache(cached: dict | None) -> dict | None:
+    if cached is None:
+        return None
     try:
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=120)
-        resp.raise_for_status()
-        outer = resp.json()
+        return _parse_vc_response(cached.get("response", ""))
+    except Exception as e:
+        print("[vc_evaluate_startup_with_ollama] Ugyldig svar i cache:", e)
+        return None
+
+
+def _cached_vc(payload: dict):
+    """(cache, nøkkel, ferdig resultat eller None) for et VC-kall."""
+    cache = get_llm_cache()
+    if cache is None:
+        return None, None, None
+    key = _cache_key(payload)
+    return cache, key, _vc_from_cache(cache.get(key))
+
+
+async def _cached_vc_async(payload: dict):
+    """Som _cached_vc, med disk-oppslaget utenfor event-loopen."""
+    cache = get_llm_cache()
+    if cache is None:
+        return None, None, None
+    key = _cache_key(payload)
+    return cache, key, _vc_from_cache(await cache.aget(key))
+
+
+def _vc_cache_entry(parser: VCStreamParser, final: dict) -> dict | None:
+    """Registrerer bruk; cache-verdi (kompakt JSON av blokkene) bare for komplette svar."""
+    # Siste linje (done) har prompt_eval_count – mangler hvis vi stoppet tidlig
+    PROMPT_STATS.record_prompt_eval("vc", final)
+    record_llm_usage("vc", final)
+    if not parser.complete:
+        return None
+    meta = {k: v for k, v in final.items() if k not in ("response", "context")}
+    return {**meta, "response": json.dumps(parser.blocks, ensure_ascii=False)}
+
+
+def _store_vc(cache, key: str | None, parser: VCStreamParser, final: dict) -> None:
+    entry = _vc_cache_entry(parser, final)
+    if cache is not None and entry is not None:
+        cache.set(key, entry)
+
 
-        raw = outer.get("response", "").strip()
-        start = raw.find("{")
-        end = raw.rfind("}") + 1
-        if start == -1 or end == -1:
-            raise ValueError(f"Fant ikke JSON i responsen: {raw!r}")
+async def _store_vc_async(cache, key: str | None, parser: VCStreamParser, final: dict) -> None:
+    entry = _vc_cache_entry(parser, final)
+    if cache is not None and entry is not None:
+        await cache.aset(key, entry)
 
-        json_str = raw[start:end]
-        data = json.loads(json_str)
 
+def _finish_vc(parser: VCStreamParser, error: Exception | None) -> dict:
+    if parser.errors:
+        LLM_PARSE_FAILURES.inc(kind="vc")
+    if not parser.blocks:
+        print("[vc_evaluate_startup_with_ollama] Feil:", error or parser.errors or "tomt svar")
+        LLM_FALLBACKS.inc(stage="vc", reason="error")
+        return _vc_error_result()
+    if not parser.complete:
+        print(f"[vc_evaluate_startup_with_ollama] Delvis svar, mangler: {parser.missing}")
+        LLM_FALLBACKS.inc(stage="vc", reason="partial")
+    return vc_result_from_blocks(parser.blocks)
+
+
+def vc_evaluate_startup_with_ollama(idea_text: str, startup_data: dict) -> dict:
+    """
+    LLaMA-basert VC-vurdering av en startup.
+    Nå inkluderer den også en eksplisitt vurdering av product–market fit.
+
+    Svaret leses som token-strøm: hver blokk valideres når den er ferdig,
+    genereringen avbrytes så snart alle seks blokker er lest, og blokker
+    som kom før en eventuell feil beholdes.
+    """
+    if is_weak_pitch(idea_text):
+        return _vc_weak_pitch_result()
+
+    payload = _vc_payload(idea_text, startup_data)
+    cache, key, cached = _cached_vc(payload)
+    if cached is not None:
+        return cached
+
+    parser = VCStreamParser()
+    final: dict = {}
+    error = None
+    try:
+        with LLM_REQUEST_SECONDS.time(kind="vc"), closing(
+            get_ollama_client().stream_generate(payload, timeout=VC_TIMEOUT)
+        ) as chunks:
+            for chunk in chunks:
+                parser.feed(chunk.get("response", ""))
+                if chunk.get("done"):
+                    final = chunk
+                if parser.complete:
+                    break  # stopper genereringen – resten er bare hale
     except Exception as e:
-        print("[vc_evaluate_startup_with_ollama] Feil:", e)
-        return {
-            "team": {"score": 5.0, "comment": "Feil under vurdering."},
-            "market": {"score": 5.0, "comment": "Feil under vurdering."},
-            "product": {"score": 5.0, "comment": "Feil under vurdering."},
-            "potential": {"score": 5.0, "comment": "Feil under vurdering."},
-            "valuation": {"score": 5.0, "comment": "Feil under vurdering."},
-            "product_market_fit": {
-                "score": 5.0,
-                "comment": "Feil under vurdering."
-            },
-            "overall_score": 50.0,
-            "overall_comment": "Standardverdi pga teknisk feil i VC-vurderingen.",
-        }
-
-    # ------- Parse og bygg struktur -------
-
-    def parse_block(name: str) -> dict:
-        block = data.get(name, {}) or {}
-        score = float(block.get("score", 5.0))
-        comment = str(block.get("comment", "")) or "Ingen kommentar."
-        return {"score": score, "comment": comment}
-
-    team = parse_block("team")
-    market = parse_block("market")
-    product = parse_block("product")
-    potential = parse_block("potential")
-    valuation = parse_block("valuation")
-    product_market_fit = parse_block("product_market_fit")
-
-    avg_score = (
-        team["score"]
-        + market["score"]
-        + product["score"]
-        + potential["score"]
-        + valuation["score"]
-        + product_market_fit["score"]
-    ) / 6.0
+        error = e
 
-    overall_score = round(avg_score * 10.0, 2)  # 0–10 → 0–100
+    _store_vc(cache, key, parser, final)
+    return _finish_vc(parser, error)
 
-    return {
-        "team": team,
-        "market": market,
-        "product": product,
-        "potential": potential,
-        "valuation": valuation,
-        "product_market_fit": product_market_fit,
-        "overall_score": overall_score,
-        "overall_comment": "Gjennomsnittlig vurdering basert på fem VC-kriterier pluss product–market fit.",
-    }
 
-    # ------- Parse og bygg struktur -------
+async def vc_evaluate_startup_with_ollama_async(idea_text: str, startup_data: dict) -> dict:
+    """
+    Async-variant av vc_evaluate_startup_with_ollama.
 
-    def parse_block(name: str) -> dict:
-        block = data.get(name, {}) or {}
-        score = float(block.get("score", 5.0))
-        comment = str(block.get("comment", "")) or "Ingen kommentar."
-        return {"score": score, "comment": comment}
+    LLMOverloaded (avvist av adgangskontrollen) slippes videre i stedet for
+    å gi standardverdier, så kalleren kan vise data-only-resultat.
+    """
+    if is_weak_pitch(idea_text):
+        return _vc_weak_pitch_result()
 
-    team = parse_block("team")
-    market = parse_block("market")
-    product = parse_block("product")
-    potential = parse_block("potential")
-    valuation = parse_block("valuation")
+    payload = _vc_payload(idea_text, startup_data)
+    cache, key, cached = await _cached_vc_async(payload)
+    if cached is not None:
+        return cached
 
-    avg_score = (
-        team["score"]
-        + market["score"]
-        + product["score"]
-        + potential["score"]
-        + valuation["score"]
-    ) / 5.0
+    parser = VCStreamParser()
+    final: dict = {}
+    error = None
+    try:
+        async with get_admission_controller().slot(PRIORITY_VC):
+            stream = get_async_ollama_client().stream_generate(payload, timeout=VC_TIMEOUT)
+            with LLM_REQUEST_SECONDS.time(kind="vc"):
+                async with aclosing(stream) as chunks:
+                    async for chunk in chunks:
+                        parser.feed(chunk.get("response", ""))
+                        if chunk.get("done"):
+                            final = chunk
+                        if parser.complete:
+                            break  # stopper genereringen – resten er bare hale
+    except LLMOverloaded:
+        raise
+    except Exception as e:
+        error = e
 
-    overall_score = round(avg_score * 10.0, 2)  # 0–10  →  0–100
+    await _store_vc_async(cache, key, parser, final)
+    return _finish_vc(parser, error)
 
-    return {
-        "team": team,
-        "market": market,
-        "product": product,
-        "potential": potential,
-        "valuation": valuation,
-        "overall_score": overall_score,
-        "overall_comment": "Gjennomsnittlig vurdering basert på fem VC-kriterier.",
-    }
+
+async def stream_vc_evaluation_async(
+    idea_text: str, startup_data: dict
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Som vc_evaluate_startup_with_ollama_async, men strømmer resultatet:
+    gir ("block", {"name": ..., **blokk}) for hver VC-kategori så snart
+    LLaMA har skrevet den ferdig, og til slutt ("result", vc_result).
+
+    LLMOverloaded slippes videre; andre feil gir delvis resultat eller
+    standardverdier.
+    """
+    if is_weak_pitch(idea_text):
+        result = _vc_weak_pitch_result()
+    else:
+        payload = _vc_payload(idea_text, startup_data)
+        cache, key, result = await _cached_vc_async(payload)
+
+    if result is not None:
+        for name in VC_BLOCKS:
+            yield "block", {"name": name, **result[name]}
+        yield "result", result
+        return
+
+    parser = VCStreamParser()
+    final: dict = {}
+    error = None
+    try:
+        async with get_admission_controller().slot(PRIORITY_VC):
+            stream = get_async_ollama_client().stream_generate(payload, timeout=VC_TIMEOUT)
+            with LLM_REQUEST_SECONDS.time(kind="vc"):
+                async with aclosing(stream) as chunks:
+                    async for chunk in chunks:
+                        for name, block in parser.feed(chunk.get("response", "")):
+                            yield "block", {"name": name, **block}
+                        if chunk.get("done"):
+                            final = chunk
+                        if parser.complete:
+                            break  # stopper genereringen – resten er bare hale
+    except LLMOverloaded:
+        raise
+    except Exception as e:
+        error = e
+
+    await _store_vc_async(cache, key, parser, final)
+    yield "result", _finish_vc(parser, error)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Disk-cache for kvantiserte CatBoost-Pools til train_model.
+
+Hver trening bygger ellers Pool-objekter fra pandas og kvantiserer
+features på nytt (border_count=128). Her lagres trenings- og
+validerings-poolen ferdig kvantisert (Pool.quantize + Pool.save), og lastes
+med "quantized://" neste gang. Valideringspoolen kvantiseres med
+treningspoolens grenser (save_quantization_borders / input_borders), slik
+CatBoost gjør internt.
+
+Nøkkelen er SHA-256 av datasettet + PREPROCESS_VERSION + alt som styrer
+target/split (MIN_OPERATING_YEARS, test_size, random_state) + border_count.
+Ved treff hoppes både innlesing, build_target, preprocess og kvantisering
+over; nye tre-hyperparametre (depth, learning_rate, ...) kan da trenes
+direkte.
+
+CatBoost kan ikke predikere på kvantiserte pools med kategoriske features,
+så validerings-features lagres også rått (Parquet) for evalueringen.
+Kvantiserte pools lagrer labels som float; CATBOOST_PARAMS["class_names"]
+holder modellens labels som heltall (0/1) uansett om cachen traff.
+
+Slås av med POOL_CACHE=0.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Dict, NamedTuple, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:  # catboost importeres først når pools faktisk bygges/leses
+    from catboost import Pool
+
+POOL_CACHE = os.environ.get("POOL_CACHE", "1") not in ("0", "false", "no")
+POOL_CACHE_DIR = os.environ.get("POOL_CACHE_DIR", ".pool_cache")
+
+_TRAIN_FILE = "train.qbin"
+_VALID_FILE = "valid.qbin"
+_BORDERS_FILE = "borders.tsv"
+_VALID_FEATURES_FILE = "valid_features.parquet"
+_METADATA_FILE = "metadata.joblib"
+_INFO_FILE = "info.json"
+_LABEL_COLUMN = "__label__"
+
+
+class TrainingPools(NamedTuple):
+    train_pool: Pool
+    valid_pool: Pool
+    X_valid: pd.DataFrame
+    y_valid: pd.Series
+    metadata: Any  # PreprocessMetadata
+
+
+def pool_cache_key(key_parts: Dict[str, Any]) -> str:
+    blob = json.dumps(key_parts, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:24]
+
+
+def _entry_dir(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, key)
+
+
+def quantize_pools(train_pool: Pool, valid_pool: Pool, border_count: int, work_dir: str) -> None:
+    """Kvantiserer in-place; valideringen får treningens grenser."""
+    borders_path = os.path.join(work_dir, _BORDERS_FILE)
+    train_pool.quantize(border_count=border_count)
+    train_pool.save_quantization_borders(borders_path)
+    valid_pool.quantize(input_borders=borders_path)
+
+
+def load_cached_pools(key: str, cache_dir: str = POOL_CACHE_DIR) -> Optional[TrainingPools]:
+    directory = _entry_dir(key, cache_dir)
+    if not os.path.exists(os.path.join(directory, _INFO_FILE)):
+        return None
+
+    from catboost import Pool
+
+    started = time.perf_counter()
+    try:
+        train_pool = Pool(f"quantized://{os.path.join(directory, _TRAIN_FILE)}")
+        valid_pool = Pool(f"quantized://{os.path.join(directory, _VALID_FILE)}")
+        X_valid = pd.read_parquet(os.path.join(directory, _VALID_FEATURES_FILE))
+        y_valid = X_valid.pop(_LABEL_COLUMN)
+        metadata = joblib.load(os.path.join(directory, _METADATA_FILE))
+    except Exception as exc:  # ødelagt/ufullstendig oppføring: bygg på nytt
+        print(f"[pool_cache] Klarte ikke å lese {directory}: {exc}")
+        return None
+
+    print(
+        f"[pool_cache] Leste kvantiserte pools fra {directory} "
+        f"({train_pool.num_row()} + {valid_pool.num_row()} rader) på {time.perf_counter() - started:.2f} s"
+    )
+    return TrainingPools(train_pool, valid_pool, X_valid, y_valid, metadata)
+
+
+def save_cached_pools(
+    key: str,
+    pools: TrainingPools,
+    border_count: int,
+    key_parts: Dict[str, Any],
+    cache_dir: str = POOL_CACHE_DIR,
+) -> None:
+    """
+    Kvantiserer pools (in-place) og lagrer dem. Skrives til en midlertidig
+    mappe som flyttes på plass til slutt, så en avbrutt lagring aldri leses.
+    """
+    started = time.perf_counter()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = os.path.join(cache_dir, f".{key}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    try:
+        quantize_pools(pools.train_pool, pools.valid_pool, border_count, tmp)
+        pools.train_pool.save(os.path.join(tmp, _TRAIN_FILE))
+        pools.valid_pool.save(os.path.join(tmp, _VALID_FILE))
+        pools.X_valid.assign(**{_LABEL_COLUMN: np.asarray(pools.y_valid)}).to_parquet(
+            os.path.join(tmp, _VALID_FEATURES_FILE), index=False
+        )
+        joblib.dump(pools.metadata, os.path.join(tmp, _METADATA_FILE))
+        with open(os.path.join(tmp, _INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump({**key_parts, "created_at": time.time()}, f, indent=2)
+
+        target = _entry_dir(key, cache_dir)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"[pool_cache] Kvantiserte og lagret pools i {target} på {time.perf_counter() - started:.2f} s")
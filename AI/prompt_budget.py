@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Token-budsjett for prompts til Ollama.
+
+På en maskin uten GPU tar prompt-prosessering tid proporsjonalt med antall
+tokens, så hver prompt bør være så kort som mulig. Modulen gir:
+- estimate_tokens: rask tokenestimat uten tokenizer (tegn- og ordbasert)
+- compact_startup_data / compact_json: fjerner plassholderfelt og -verdier
+  (homepage_url, "Unknown", tomme felt) og skriver JSON uten innrykk
+- truncate_to_tokens: forkorter lange pitcher (starten + slutten beholdes)
+- fit_prompt: bygger prompten og forkorter fri tekst til den passer i
+  budsjettet for kall-typen
+- prompt_stats: antall tokens per kall-type (estimert og faktisk fra Ollama)
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+# Budsjett (tokens) per kall-type – kan overstyres med PROMPT_BUDGET_<TYPE>
+DEFAULT_BUDGETS = {
+    "category": 400,
+    "score": 900,
+    "vc": 1500,
+    "explain": 1500,
+    "single_shot": 1800,
+}
+
+# Llama 3-tokenizeren gir ca. 3,5–4 tegn per token for engelsk og litt
+# færre for norsk; vi regner forsiktig så estimatet heller blir for høyt
+CHARS_PER_TOKEN = 3.2
+TOKENS_PER_WORD = 1.4
+
+TRUNCATION_MARKER = "\n[…]\n"
+
+PLACEHOLDER_FIELDS = frozenset({"homepage_url"})
+PLACEHOLDER_VALUES = frozenset({"", "unknown", "none", "nan", "null", "n/a", "-"})
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def budget_for(kind: str) -> int:
+    env = os.environ.get(f"PROMPT_BUDGET_{kind.upper()}")
+    if env:
+        return int(env)
+    return DEFAULT_BUDGETS.get(kind, 2000)
+
+
+def estimate_tokens(text: str) -> int:
+    """Anslag på antall tokens (maks av tegn- og ordbasert estimat)."""
+    if not text:
+        return 0
+    by_chars = len(text) / CHARS_PER_TOKEN
+    by_words = len(_WORD_RE.findall(text)) * TOKENS_PER_WORD
+    return int(math.ceil(max(by_chars, by_words)))
+
+
+def _is_placeholder(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:  # NaN
+        return True
+    return isinstance(value, str) and value.strip().lower() in PLACEHOLDER_VALUES
+
+
+def compact_startup_data(startup_data: Mapping[str, Any]) -> Dict[str, Any]:
+    """Kun felt med faktisk innhold (plassholdere som homepage_url og "Unknown" fjernes)."""
+    return {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in startup_data.items()
+        if key not in PLACEHOLDER_FIELDS and not _is_placeholder(value)
+    }
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Forkorter teksten til ca. max_tokens. Starten (problem, løsning) og
+    slutten (ofte forretningsmodell/ask) beholdes, midten kuttes ved ordgrense.
+    """
+    text = text.strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    max_chars = int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER)
+    words = _WORD_RE.findall(text)
+    max_words = int(max_tokens / TOKENS_PER_WORD)
+    if max_chars <= 0 or max_words <= 0:
+        return ""
+
+    head_chars, tail_chars = int(max_chars * 0.7), int(max_chars * 0.3)
+    head_words, tail_words = int(max_words * 0.7), int(max_words * 0.3)
+
+    head = " ".join(words[:head_words])[:head_chars].rsplit(" ", 1)[0]
+    tail = " ".join(words[-tail_words:])[-tail_chars:].split(" ", 1)[-1] if tail_words else ""
+    return f"{head}{TRUNCATION_MARKER}{tail}".strip()
+
+
+class PromptStats:
+    """Tellere per kall-type: estimerte og faktiske prompt-tokens."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, kind: str) -> Dict[str, float]:
+        return self._stats.setdefault(
+            kind,
+            {
+                "prompts": 0,
+                "estimated_tokens_total": 0,
+                "estimated_tokens_max": 0,
+                "truncated": 0,
+                "over_budget": 0,
+                "evaluated": 0,
+                "prompt_eval_tokens_total": 0,
+            },
+        )
+
+    def record_prompt(self, kind: str, tokens: int, truncated: bool, over_budget: bool) -> None:
+        with self._lock:
+            entry = self._entry(kind)
+            entry["prompts"] += 1
+            entry["estimated_tokens_total"] += tokens
+            entry["estimated_tokens_max"] = max(entry["estimated_tokens_max"], tokens)
+            entry["truncated"] += int(truncated)
+            entry["over_budget"] += int(over_budget)
+
+    def record_prompt_eval(self, kind: str, response: Mapping[str, Any]) -> None:
+        """Faktisk antall prompt-tokens fra Ollama-svaret (prompt_eval_count)."""
+        count = response.get("prompt_eval_count")
+        if not isinstance(count, int):
+            return
+        with self._lock:
+            entry = self._entry(kind)
+            entry["evaluated"] += 1
+            entry["prompt_eval_tokens_total"] += count
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for kind, entry in self._stats.items():
+                prompts, evaluated = entry["prompts"], entry["evaluated"]
+                result[kind] = {
+                    **entry,
+                    "budget": budget_for(kind),
+                    "estimated_tokens_avg": entry["estimated_tokens_total"] / prompts if prompts else 0.0,
+                    "prompt_eval_tokens_avg": (
+                        entry["prompt_eval_tokens_total"] / evaluated if evaluated else 0.0
+                    ),
+                }
+            return result
+
+
+PROMPT_STATS = PromptStats()
+
+
+def fit_prompt(
+    kind: str,
+    render: Callable[[str], str],
+    free_text: str,
+    budget: Optional[int] = None,
+    prefix: str = "",
+) -> Tuple[str, int]:
+    """
+    Bygger prompten med render(free_text). Går den over budsjettet, forkortes
+    free_text (pitch/fritekst) så hele prompten passer. Er malen alene for
+    stor, sendes den likevel (og telles som over_budget). `prefix` er en fast
+    system-prompt som sendes i tillegg og teller med i budsjettet.
+
+    Returnerer (prompt, estimerte tokens inkl. prefix).
+    """
+    budget = budget_for(kind) if budget is None else budget
+    prefix_tokens = estimate_tokens(prefix)
+    prompt = render(free_text)
+    tokens = prefix_tokens + estimate_tokens(prompt)
+    truncated = False
+
+    # Estimatet er ikke helt additivt, så juster noen runder om nødvendig
+    target = budget - (tokens - estimate_tokens(free_text))
+    for _ in range(3):
+        if tokens <= budget or target <= 0:
+            break
+        shortened = truncate_to_tokens(free_text, target)
+        if shortened == free_text.strip():
+            break
+        truncated = True
+        prompt = render(shortened)
+        tokens = prefix_tokens + estimate_tokens(prompt)
+        target -= max(tokens - budget, 1)
+
+    PROMPT_STATS.record_prompt(kind, tokens, truncated, over_budget=tokens > budget)
+    return prompt, tokens
+
+
+def prompt_stats() -> Dict[str, Dict[str, Any]]:
+    return PROMPT_STATS.snapshot()
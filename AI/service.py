@@ -7,27 +7,123 @@ Start med:
 """
 from __future__ import annotations
 
+import asyncio
 import json
+import os
 import sys
-from typing import Optional
+from contextlib import aclosing, asynccontextmanager
+from typing import Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from train_startup_model import predict_success_score, PreprocessMetadata
+from train_startup_model import (
+    predict_success_score,
+    predict_success_scores,
+    get_model_registry,
+    PreprocessMetadata,
+)
+from analysis_jobs import AnalysisJobQueue, Job, JobQueueFull, request_key
+from category_matcher import get_category_matcher
+from llm_admission import LLMOverloaded, get_admission_controller
+from llm_cache import get_llm_cache
+from metrics import (
+    ANALYSES_IN_FLIGHT,
+    LLM_FALLBACKS,
+    finish_fallback_tracking,
+    finish_request_timing,
+    register_collector,
+    render as render_metrics,
+    server_timing_header,
+    stage,
+    start_fallback_tracking,
+    start_request_timing,
+)
+from model_warmup import CHECK_CATBOOST, CHECK_CATEGORIES, READINESS, start_llm_warmup
 from ollama_explainer import (
-    map_text_to_category_with_llama,
-    vc_evaluate_startup_with_ollama,
+    is_weak_pitch,
+    map_text_to_category_with_llama_async,
+    stream_vc_evaluation_async,
+    vc_evaluate_startup_with_ollama_async,
 )
+from ollama_client import close_async_ollama_client
+from prompt_budget import prompt_stats
+from single_flight import SingleFlight
+from single_shot import LLM_SINGLE_SHOT, analyze_single_shot_async
 
 # Sørg for at pickle-lastere finner PreprocessMetadata fra __main__
 sys.modules["__main__"].PreprocessMetadata = PreprocessMetadata
 
-app = FastAPI(title="Startup AI API", version="1.0.0")
+# Server-Timing-header med tid per steg (av som standard – avslører interne tider)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "") in ("1", "true", "yes")
 
 with open("all_categories.json") as f:
     ALL_CATEGORIES = json.load(f)
 
+# Lokal kategori-indeks bygges én gang; LLaMA brukes bare ved usikre treff
+CATEGORY_MATCHER = get_category_matcher(ALL_CATEGORIES)
+
+
+def _warm_up_data_model() -> None:
+    """
+    Laster CatBoost-modell + metadata (registeret bytter inn ny modell
+    automatisk hvis filene på disk endres) og gjør én prediksjon, så første
+    forespørsel ikke betaler for deserialisering og oppstart.
+    """
+    try:
+        get_model_registry().get()
+        predict_success_score(_build_startup_data(StartupDataRequest()))
+    except Exception as exc:  # pragma: no cover - modellfil kan mangle i dev
+        print(f"[service] Klarte ikke å forhåndslaste modellen: {exc}")
+        READINESS.mark(CHECK_CATBOOST, False, str(exc))
+        return
+    READINESS.mark(CHECK_CATBOOST, True, "modell lastet")
+
+
+def _warm_up_categories() -> None:
+    # Indeksen er bygget ved import; ett oppslag bekrefter at den svarer
+    CATEGORY_MATCHER.match("software")
+    CATEGORY_MATCHER.shortlist("software")
+    READINESS.mark(CHECK_CATEGORIES, True, f"{len(CATEGORY_MATCHER)} kategorier indeksert")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(_warm_up_data_model)
+    _warm_up_categories()
+    ANALYSIS_JOBS.start()
+    warmup_task = start_llm_warmup()
+
+    yield
+
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    await ANALYSIS_JOBS.stop()
+    await close_async_ollama_client()
+    cache = get_llm_cache()
+    if cache is not None:
+        await asyncio.to_thread(cache.flush)  # ventende last_access
+
+
+app = FastAPI(title="Startup AI API", version="1.0.0", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Legger til Server-Timing med tid per steg (SERVER_TIMING=1)."""
+    if not SERVER_TIMING:
+        return await call_next(request)
+    token = start_request_timing()
+    try:
+        response = await call_next(request)
+    finally:
+        timings = finish_request_timing(token)
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 
 class IdeaRequest(BaseModel):
     title: str = Field(..., min_length=1)
@@ -42,6 +138,33 @@ class IdeaRequest(BaseModel):
     funding_rounds: Optional[int] = 0
 
 
+class StartupDataRequest(BaseModel):
+    """Kun feltene data-modellen bruker (ingen idé/pitch, ingen LLaMA)."""
+    id: Optional[str] = None
+    market: Optional[str] = None  # category_list
+    tech_service: Optional[str] = None  # subcategory
+    country: Optional[str] = None  # country_code
+    region: Optional[str] = None
+    city: Optional[str] = None
+    funding_total: Optional[float] = 0
+    funding_rounds: Optional[int] = 0
+
+
+class BatchAnalyzeRequest(BaseModel):
+    startups: list[StartupDataRequest] = Field(..., min_length=1)
+
+
+class DataScore(BaseModel):
+    id: Optional[str] = None
+    data_score: float
+    success_probability: float
+    risk_level: str
+
+
+class BatchAnalyzeResponse(BaseModel):
+    results: list[DataScore]
+
+
 class AnalysisResponse(BaseModel):
     score: float
     strengths: list[str]
@@ -53,22 +176,20 @@ class AnalysisResponse(BaseModel):
     combined_score: Optional[float] = None
 
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+class JobResponse(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    deduplicated: bool = False
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
 
 
-@app.post("/analyze", response_model=AnalysisResponse)
-def analyze(req: IdeaRequest):
-  # Kartlegg markeds/tech-felter via LLaMA hvis mulig
-    mapped_market = map_text_to_category_with_llama(req.market or "", ALL_CATEGORIES)
-    mapped_tech = map_text_to_category_with_llama(req.tech_service or "", ALL_CATEGORIES)
-
-    idea_text = req.content
-    if req.team_description and req.team_description.strip():
-        idea_text += f"\n\nTeam: {req.team_description.strip()}"
-
-    startup_data = {
+def _build_startup_data(
+    req: IdeaRequest | StartupDataRequest,
+    mapped_market: Optional[str] = None,
+    mapped_tech: Optional[str] = None,
+) -> dict:
+    return {
         "homepage_url": "http://example.com",
         "category_list": mapped_market or req.market or "Unknown",
         "subcategory": mapped_tech or req.tech_service or "Unknown",
@@ -80,34 +201,34 @@ def analyze(req: IdeaRequest):
         "city": (req.city or "Unknown").strip(),
     }
 
-    # 1) Data-modell
-    try:
-        result = predict_success_score(startup_data)
-    except Exception as exc:  # pragma: no cover - runtime safeguard
-        raise HTTPException(status_code=500, detail=f"Feil i data-modellen: {exc}") from exc
 
+def _risk_level(p: float) -> str:
+    if p >= 0.66:
+        return "Lav risiko"
+    if p >= 0.33:
+        return "Moderat risiko"
+    return "Høy risiko"
+
+
+def _data_score(result: dict) -> tuple[float, float]:
+    """(sannsynlighet 0–1, data_score 0–100) fra predict_success_score."""
     if "success_probability" in result:
         p = float(result["success_probability"])
         data_score = float(result.get("success_probability_percent", p * 100.0))
     else:
         data_score = float(result.get("success_score", 0.0))
         p = data_score / 100.0 if data_score is not None else 0.0
+    return p, data_score
 
-    risk_level = "Høy risiko"
-    if p >= 0.66:
-        risk_level = "Lav risiko"
-    elif p >= 0.33:
-        risk_level = "Moderat risiko"
 
-    # 2) VC-vurdering med LLaMA (kan feile hvis Ollama ikke kjører)
-    vc_result = None
-    if idea_text and idea_text.strip():
-        try:
-            vc_result = vc_evaluate_startup_with_ollama(idea_text, startup_data)
-        except Exception:
-            # Fortsett uten VC hvis Ollama ikke svarer
-            vc_result = None
+def _idea_text(req: IdeaRequest) -> str:
+    idea_text = req.content
+    if req.team_description and req.team_description.strip():
+        idea_text += f"\n\nTeam: {req.team_description.strip()}"
+    return idea_text
+
 
+def _build_analysis_response(data_score: float, vc_result: Optional[dict]) -> AnalysisResponse:
     if vc_result:
         idea_score = vc_result.get("overall_score", 50)
         combined_score = round(0.65 * data_score + 0.35 * idea_score, 2)
@@ -133,3 +254,397 @@ def analyze(req: IdeaRequest):
         idea_score=idea_score,
         combined_score=combined_score,
     )
+
+
+@app.get("/health")
+def health():
+    """Liveness: prosessen svarer. Readiness-status tas med til informasjon."""
+    return {"status": "ok", **READINESS.snapshot()}
+
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness for lastbalansereren: 503 til modellene er lastet og varmet opp."""
+    snapshot = READINESS.snapshot()
+    if not snapshot["ready"]:
+        return JSONResponse(status_code=503, content={"status": "not_ready", **snapshot})
+    return {"status": "ready", **snapshot}
+
+
+@app.get("/stats/llm-cache")
+def llm_cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/stats/prompts")
+def prompt_token_stats():
+    """Prompt-størrelse per kall-type: estimerte tokens, budsjett og faktisk prompt_eval_count."""
+    return prompt_stats()
+
+
+@app.get("/stats/llm-queue")
+async def llm_queue_stats():
+    return get_admission_controller().stats()
+
+
+def _collect_service_metrics():
+    """Tall som allerede telles i cache, kø, jobber og prompt_budget, lest ved scrape."""
+    cache = get_llm_cache()
+    if cache is not None:
+        c = cache.stats()
+        yield "llm_cache_lookups_total", "counter", "Oppslag i LLM-cachen etter utfall", [
+            ({"result": "memory_hit"}, c["memory_hits"]),
+            ({"result": "disk_hit"}, c["disk_hits"]),
+            ({"result": "miss"}, c["misses"]),
+        ]
+        yield "llm_cache_hit_ratio", "gauge", "Andel LLM-oppslag som traff cachen", [({}, c["hit_rate"])]
+        yield "llm_cache_entries", "gauge", "Oppføringer i LLM-cachen", [
+            ({"tier": "memory"}, c["memory_entries"]),
+            ({"tier": "disk"}, c["disk_entries"]),
+        ]
+
+    q = get_admission_controller().stats()
+    yield "llm_in_flight", "gauge", "LLM-kall som kjører nå", [({}, q["in_flight"])]
+    yield "llm_queue_depth", "gauge", "LLM-kall som venter i adgangskøen", [({}, q["queue_depth"])]
+    yield "llm_admission_total", "counter", "Utfall i LLM-adgangskontrollen", [
+        ({"result": "admitted"}, q["admitted"]),
+        ({"result": "rejected_queue_full"}, q["rejected_queue_full"]),
+        ({"result": "rejected_timeout"}, q["rejected_timeout"]),
+        ({"result": "evicted"}, q["evicted"]),
+    ]
+
+    j = ANALYSIS_JOBS.stats()
+    yield "analysis_jobs", "gauge", "Analysejobber etter status", [
+        ({"status": "queued"}, j["queued"]),
+        ({"status": "running"}, j["running"]),
+        ({"status": "stored"}, j["stored"]),
+    ]
+    f = ANALYSIS_FLIGHTS.stats()
+    yield "analysis_single_flight_total", "counter", "Analyser kjørt, koalesert eller gjenbrukt", [
+        ({"result": "executed"}, f["executed"]),
+        ({"result": "coalesced"}, f["coalesced"]),
+        ({"result": "reused"}, f["reused"]),
+    ]
+
+    prompts = prompt_stats()
+    yield "llm_prompt_estimated_tokens_total", "counter", "Estimerte prompt-tokens per kall-type", [
+        ({"kind": kind}, p["estimated_tokens_total"]) for kind, p in prompts.items()
+    ]
+    yield "llm_prompts_truncated_total", "counter", "Prompts der fritekst ble forkortet", [
+        ({"kind": kind}, p["truncated"]) for kind, p in prompts.items()
+    ]
+
+
+register_collector(_collect_service_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus-tekstformat."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def _vc_or_none(idea_text: str, startup_data: dict) -> Optional[dict]:
+    """VC-vurdering med LLaMA, eller None hvis Ollama ikke svarer."""
+    if not idea_text or not idea_text.strip():
+        return None
+    try:
+        with stage("vc_evaluation"):
+            return await vc_evaluate_startup_with_ollama_async(idea_text, startup_data)
+    except LLMOverloaded as exc:
+        # Lastavlastning: for mange LLM-kall i kø – vis kun data-score
+        print(f"[analyze] VC-vurdering avvist: {exc}")
+        LLM_FALLBACKS.inc(stage="vc", reason="overloaded")
+        return None
+    except Exception:
+        # Fortsett uten VC hvis Ollama ikke svarer
+        LLM_FALLBACKS.inc(stage="vc", reason="error")
+        return None
+
+
+async def _run_analysis_single_shot(req: IdeaRequest, idea_text: str) -> AnalysisResponse:
+    """
+    Single-shot-modus (LLM_SINGLE_SHOT=1): mapping av marked/teknologi og
+    VC-vurdering i ett LLaMA-kall, deretter data-modellen med de mappede
+    kategoriene. Feiler kallet, brukes lokale treff/rå tekst og kun data-score.
+    """
+    local_data = _build_startup_data(
+        req,
+        CATEGORY_MATCHER.match(req.market) if req.market else None,
+        CATEGORY_MATCHER.match(req.tech_service) if req.tech_service else None,
+    )
+
+    try:
+        with stage("single_shot"):
+            answer = await analyze_single_shot_async(
+                idea_text, local_data, req.market, req.tech_service, CATEGORY_MATCHER
+            )
+    except LLMOverloaded as exc:
+        print(f"[analyze] Single-shot avvist: {exc}")
+        LLM_FALLBACKS.inc(stage="single_shot", reason="overloaded")
+        answer = None
+    except Exception as exc:
+        print(f"[analyze] Single-shot feilet: {exc}")
+        LLM_FALLBACKS.inc(stage="single_shot", reason="error")
+        answer = None
+
+    if answer is not None:
+        startup_data = _build_startup_data(req, answer["market"], answer["tech_service"])
+        vc_result = answer["vc"]
+    else:
+        startup_data, vc_result = local_data, None
+
+    try:
+        result = await asyncio.to_thread(predict_success_score, startup_data)
+    except Exception as exc:  # pragma: no cover - runtime safeguard
+        raise HTTPException(status_code=500, detail=f"Feil i data-modellen: {exc}") from exc
+
+    _, data_score = _data_score(result)
+    return _build_analysis_response(data_score, vc_result)
+
+
+async def _run_analysis(req: IdeaRequest) -> AnalysisResponse:
+    idea_text = _idea_text(req)
+    with ANALYSES_IN_FLIGHT.track_inprogress(), stage("analysis_total"):
+        if LLM_SINGLE_SHOT and not is_weak_pitch(idea_text):
+            return await _run_analysis_single_shot(req, idea_text)
+        return await _run_analysis_multi_call(req, idea_text)
+
+
+async def _run_analysis_multi_call(req: IdeaRequest, idea_text: str) -> AnalysisResponse:
+    # Kartlegg markeds/tech-felter via lokal indeks/LLaMA – de to er uavhengige
+    # og kjøres samtidig
+    with stage("category_mapping"):
+        mapped_market, mapped_tech = await asyncio.gather(
+            map_text_to_category_with_llama_async(
+                req.market or "", ALL_CATEGORIES, matcher=CATEGORY_MATCHER
+            ),
+            map_text_to_category_with_llama_async(
+                req.tech_service or "", ALL_CATEGORIES, matcher=CATEGORY_MATCHER
+            ),
+        )
+
+    startup_data = _build_startup_data(req, mapped_market, mapped_tech)
+
+    # 2) VC-vurdering med LLaMA startes med en gang og går parallelt med
+    #    data-modellen (kan feile hvis Ollama ikke kjører)
+    vc_task = asyncio.create_task(_vc_or_none(idea_text, startup_data))
+
+    # 1) Data-modell (CPU-arbeid i tråd så event-loopen er ledig)
+    try:
+        result = await asyncio.to_thread(predict_success_score, startup_data)
+    except Exception as exc:  # pragma: no cover - runtime safeguard
+        vc_task.cancel()
+        raise HTTPException(status_code=500, detail=f"Feil i data-modellen: {exc}") from exc
+
+    _, data_score = _data_score(result)
+
+    vc_result = await vc_task
+
+    return _build_analysis_response(data_score, vc_result)
+
+
+async def _run_analysis_tracked(req: IdeaRequest) -> Tuple[AnalysisResponse, bool]:
+    """Analysen, og om den er komplett (ingen LLM-steg falt tilbake underveis)."""
+    token = start_fallback_tracking()
+    try:
+        response = await _run_analysis(req)
+    finally:
+        fallbacks = finish_fallback_tracking(token)
+    # Svak pitch gir alltid samme svar og er ikke en forbigående feil
+    return response, all(reason == "weak_pitch" for _, reason in fallbacks)
+
+
+# Identiske samtidige analyser (dobbeltklikk, flere faner) deler én kjøring.
+# Bare komplette analyser gjenbrukes etterpå: én overbelastning eller
+# Ollama-feil skal ikke gi data-only-svar til alle i gjenbruksvinduet.
+ANALYSIS_FLIGHTS: SingleFlight[Tuple[AnalysisResponse, bool]] = SingleFlight(
+    reusable=lambda result: result[1]
+)
+
+
+async def _run_analysis_coalesced(req: IdeaRequest) -> AnalysisResponse:
+    key = request_key(req.model_dump())
+    response, _ = await ANALYSIS_FLIGHTS.do(key, lambda: _run_analysis_tracked(req))
+    return response
+
+
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze(req: IdeaRequest):
+    return await _run_analysis_coalesced(req)
+
+
+async def _run_analysis_job(payload: dict) -> dict:
+    result = await _run_analysis_coalesced(IdeaRequest(**payload))
+    return result.model_dump()
+
+
+ANALYSIS_JOBS = AnalysisJobQueue(_run_analysis_job)
+
+
+def _job_response(job: Job, deduplicated: bool = False) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        deduplicated=deduplicated,
+        result=AnalysisResponse(**job.result) if job.result is not None else None,
+        error=job.error,
+    )
+
+
+@app.post("/analyze/jobs", response_model=JobResponse, status_code=202)
+async def submit_analysis_job(req: IdeaRequest):
+    """
+    Legger /analyze i jobbkøen og svarer med en gang. Hent resultatet med
+    GET /analyze/jobs/{job_id}. Identisk forespørsel som allerede er i kø
+    eller kjører gir samme jobb (deduplicated=true).
+    """
+    try:
+        job, deduplicated = ANALYSIS_JOBS.submit(req.model_dump())
+    except JobQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return _job_response(job, deduplicated)
+
+
+@app.get("/analyze/jobs/{job_id}", response_model=JobResponse)
+async def get_analysis_job(job_id: str, wait: float = 0):
+    """Status/resultat for en jobb. Med ?wait=N ventes det til jobben er ferdig (maks N s)."""
+    job = await ANALYSIS_JOBS.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ukjent eller utløpt jobb-id")
+    return _job_response(job)
+
+
+@app.get("/stats/jobs")
+async def job_stats():
+    return {**ANALYSIS_JOBS.stats(), "single_flight": ANALYSIS_FLIGHTS.stats()}
+
+
+def _ndjson(event: str, **data) -> bytes:
+    return (json.dumps({"event": event, **data}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(req: IdeaRequest):
+    """
+    Strømmende variant av /analyze (NDJSON, én hendelse per linje):
+    - "data_score": CatBoost-score med én gang (provisional=true hvis
+      markedet ikke kunne mappes lokalt og LLaMA fortsatt jobber)
+    - "categories": mappet marked og teknologi
+    - "data_score": ny score hvis mappingen endret kategorien
+    - "vc_block": én per VC-kategori (team, market, ...) etter hvert som
+      LLaMA skriver dem
+    - "result": samme innhold som /analyze
+    """
+
+    async def events():
+        # Lokal mapping (uten LLaMA) gir en data-score med en gang
+        local_market = CATEGORY_MATCHER.match(req.market) if req.market else None
+        local_tech = CATEGORY_MATCHER.match(req.tech_service) if req.tech_service else None
+        startup_data = _build_startup_data(req, local_market, local_tech)
+        provisional = bool(req.market and req.market.strip()) and local_market is None
+
+        mapping = asyncio.ensure_future(
+            asyncio.gather(
+                map_text_to_category_with_llama_async(
+                    req.market or "", ALL_CATEGORIES, matcher=CATEGORY_MATCHER
+                ),
+                map_text_to_category_with_llama_async(
+                    req.tech_service or "", ALL_CATEGORIES, matcher=CATEGORY_MATCHER
+                ),
+            )
+        )
+
+        # Klienten kan koble fra midt i strømmen: da lukkes generatoren, og
+        # mapping- og VC-kallene må avbrytes så de ikke holder LLM-plasser
+        try:
+            try:
+                result = await asyncio.to_thread(predict_success_score, startup_data)
+            except Exception as exc:  # pragma: no cover - runtime safeguard
+                yield _ndjson("error", detail=f"Feil i data-modellen: {exc}")
+                return
+
+            p, data_score = _data_score(result)
+            yield _ndjson(
+                "data_score",
+                data_score=data_score,
+                success_probability=p,
+                risk_level=_risk_level(p),
+                provisional=provisional,
+            )
+
+            mapped_market, mapped_tech = await mapping
+            yield _ndjson("categories", market=mapped_market, tech_service=mapped_tech)
+
+            mapped_data = _build_startup_data(req, mapped_market, mapped_tech)
+            if mapped_data["category_list"] != startup_data["category_list"]:
+                try:
+                    result = await asyncio.to_thread(predict_success_score, mapped_data)
+                except Exception as exc:  # pragma: no cover - runtime safeguard
+                    yield _ndjson("error", detail=f"Feil i data-modellen: {exc}")
+                    return
+                p, data_score = _data_score(result)
+                yield _ndjson(
+                    "data_score",
+                    data_score=data_score,
+                    success_probability=p,
+                    risk_level=_risk_level(p),
+                    provisional=False,
+                )
+            startup_data = mapped_data
+
+            vc_result = None
+            idea_text = _idea_text(req)
+            if idea_text.strip():
+                try:
+                    async with aclosing(stream_vc_evaluation_async(idea_text, startup_data)) as vc_stream:
+                        async for kind, payload in vc_stream:
+                            if kind == "block":
+                                yield _ndjson("vc_block", **payload)
+                            else:
+                                vc_result = payload
+                except LLMOverloaded as exc:
+                    print(f"[analyze_stream] VC-vurdering avvist: {exc}")
+                    LLM_FALLBACKS.inc(stage="vc", reason="overloaded")
+                    vc_result = None
+                except Exception:
+                    LLM_FALLBACKS.inc(stage="vc", reason="error")
+                    vc_result = None
+
+            yield _ndjson("result", **_build_analysis_response(data_score, vc_result).model_dump())
+        finally:
+            if not mapping.done():
+                mapping.cancel()
+                # Hent utfallet så asyncio ikke logger "exception was never retrieved"
+                mapping.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+def analyze_batch(req: BatchAnalyzeRequest):
+    """
+    Kun data-modell for mange startups på én gang (f.eks. nattlig re-scoring
+    av porteføljen). Ingen LLaMA-kall: market/tech brukes som de er.
+    """
+    startup_rows = [_build_startup_data(item) for item in req.startups]
+
+    try:
+        results = predict_success_scores(startup_rows)
+    except Exception as exc:  # pragma: no cover - runtime safeguard
+        raise HTTPException(status_code=500, detail=f"Feil i data-modellen: {exc}") from exc
+
+    return BatchAnalyzeResponse(
+        results=[
+            DataScore(
+                id=item.id,
+                data_score=result["success_probability_percent"],
+                success_probability=result["success_probability"],
+                risk_level=_risk_level(result["success_probability"]),
+            )
+            for item, result in zip(req.startups, results)
+        ]
+    )
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight: samtidige identiske kall deler én beregning.
+
+Dobbeltklikk på "send" eller flere faner som sender samme idé skal ikke
+kjøre mapping + CatBoost + VC-vurdering flere ganger. SingleFlight.do(key, fn)
+- kjører fn() bare én gang per nøkkel mens den pågår; de andre venter på
+  samme resultat
+- beholder ferdige resultater i `reuse_window` sekunder, så en identisk
+  forespørsel litt senere får svaret med en gang (0 = ingen gjenbruk);
+  med `reusable` beholdes bare resultater predikatet godtar (f.eks. ikke
+  svar der et LLM-steg falt tilbake)
+
+Feil deles med de som venter, men caches ikke. Beregningen kjører som egen
+task, så den fortsetter selv om klienten som startet den kobler fra.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+ANALYZE_REUSE_SECONDS = float(os.environ.get("ANALYZE_REUSE_SECONDS", 30))
+ANALYZE_REUSE_MAX_ENTRIES = int(os.environ.get("ANALYZE_REUSE_MAX_ENTRIES", 256))
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Koalescering av samtidige async-kall per nøkkel, med kort gjenbruksvindu."""
+
+    def __init__(
+        self,
+        reuse_window: float = ANALYZE_REUSE_SECONDS,
+        max_entries: int = ANALYZE_REUSE_MAX_ENTRIES,
+        reusable: Optional[Callable[[T], bool]] = None,
+    ) -> None:
+        self.reuse_window = reuse_window
+        self.max_entries = max_entries
+        self.reusable = reusable
+
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._recent: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+
+        self.executed = 0
+        self.coalesced = 0
+        self.reused = 0
+
+    def _recent_get(self, key: str, now: float) -> Optional[Tuple[float, T]]:
+        entry = self._recent.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._recent[key]
+            return None
+        self._recent.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, value: T) -> None:
+        if self.reuse_window <= 0:
+            return
+        if self.reusable is not None and not self.reusable(value):
+            return
+        self._recent[key] = (time.monotonic() + self.reuse_window, value)
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        recent = self._recent_get(key, time.monotonic())
+        if recent is not None:
+            self.reused += 1
+            return recent[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._on_done(key, t))
+
+        # shield: en frakoblet klient skal ikke avbryte beregningen for de andre
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self._remember(key, task.result())
+
+    def forget(self, key: str) -> None:
+        """Fjern et ferdig resultat fra gjenbruksvinduet."""
+        self._recent.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reuse_window_seconds": self.reuse_window,
+            "in_flight": len(self._inflight),
+            "recent_entries": len(self._recent),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "reused": self.reused,
+        }
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+"Single-shot"-analyse: ett LLaMA-kall i stedet for tre.
+
+Vanlig /analyze gjør opptil tre generasjoner (mapping av marked, mapping av
+teknologi, VC-vurdering). I single-shot-modus (LLM_SINGLE_SHOT=1) ber vi
+modellen om alt på én gang, med Ollamas `format` (JSON-schema) så svaret
+følger strukturen, og validerer det med pydantic:
+
+    {"market_category": ..., "tech_category": ...,
+     "team": {"score", "comment"}, ..., "product_market_fit": {...}}
+
+Kategoriene som category_matcher klarer lokalt spørres ikke om; for de
+andre får modellen den korte kandidatlisten (eller bes om et engelsk
+bransjenavn), og svaret slås opp i indeksen som ellers.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from textwrap import dedent
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+from category_matcher import CategoryMatcher
+from metrics import LLM_PARSE_FAILURES
+from ollama_explainer import generate_structured_async, resolve_llm_category, vc_result_from_blocks
+from prompt_budget import compact_json, compact_startup_data, fit_prompt
+from vc_stream_parser import (
+    VC_BLOCKS,
+    VCStreamParser,
+    coerce_score,
+    loads_tolerant,
+    validate_vc_block,
+)
+
+LLM_SINGLE_SHOT = os.environ.get("LLM_SINGLE_SHOT", "") in ("1", "true", "yes")
+
+
+class VCBlockAnswer(BaseModel):
+    score: float
+    comment: str = ""
+
+    @field_validator("score", mode="before")
+    @classmethod
+    def _score_0_10(cls, value: Any) -> float:
+        score = coerce_score(value)
+        if score is None:
+            raise ValueError(f"ugyldig score: {value!r}")
+        return score
+
+
+class SingleShotAnswer(BaseModel):
+    market_category: Optional[str] = None
+    tech_category: Optional[str] = None
+    team: VCBlockAnswer
+    market: VCBlockAnswer
+    product: VCBlockAnswer
+    potential: VCBlockAnswer
+    valuation: VCBlockAnswer
+    product_market_fit: VCBlockAnswer
+
+
+_BLOCK_SCHEMA = {
+    "type": "object",
+    "properties": {"score": {"type": "number"}, "comment": {"type": "string"}},
+    "required": ["score", "comment"],
+}
+
+# Skrevet ut flatt (uten $ref) så Ollama kan lage grammatikk av det direkte
+SINGLE_SHOT_FORMAT = {
+    "type": "object",
+    "properties": {
+        "market_category": {"type": ["string", "null"]},
+        "tech_category": {"type": ["string", "null"]},
+        **{name: _BLOCK_SCHEMA for name in VC_BLOCKS},
+    },
+    "required": ["market_category", "tech_category", *VC_BLOCKS],
+}
+
+SINGLE_SHOT_SYSTEM = dedent("""
+    Du er en venture capital-investor som analyserer en startup i ett svar.
+
+    Oppgave 1 – kategorier:
+    - For "market_category" og "tech_category": velg den kategorien fra
+      kandidatlisten som passer best til friteksten. Kategorien MÅ være
+      hentet fra listen.
+    - Er kandidatlisten tom, svar med et kort engelsk bransjenavn på 1–3 ord
+      slik det brukes i Crunchbase (f.eks. "Software", "Health Care").
+    - Er det ingen fritekst for feltet, sett det til null.
+
+    Oppgave 2 – VC-vurdering i seks kategorier:
+    - team, market, product, potential, valuation
+    - product_market_fit (hvor godt produktet/tjenesten faktisk passer
+      markedet, målgruppen og behovene som er beskrevet; si tydelig om det
+      er god match, svak match eller mis-match)
+    For hver: "score" som flyttall mellom 0 og 10 (f.eks. 6.5) og en kort
+    "comment" på norsk.
+
+    Svar KUN med JSON etter det oppgitte skjemaet.
+""").strip()
+
+
+@dataclass
+class _CategoryTask:
+    text: str
+    local: Optional[str]
+    candidates: list
+
+    @property
+    def needs_llm(self) -> bool:
+        return bool(self.text.strip()) and self.local is None
+
+
+def _category_task(text: Optional[str], matcher: CategoryMatcher) -> _CategoryTask:
+    text = (text or "").strip()
+    if not text:
+        return _CategoryTask(text, None, [])
+    local = matcher.match(text)
+    return _CategoryTask(text, local, [] if local else matcher.shortlist(text))
+
+
+def _category_section(label: str, task: _CategoryTask) -> str:
+    if task.local is not None:
+        return f"{label}: (allerede avklart – sett til null)"
+    if not task.needs_llm:
+        return f"{label}: (ingen fritekst – sett til null)"
+    candidates = "\n".join(f"- {c}" for c in task.candidates) or "(tom)"
+    return f"{label} (fritekst): {task.text}\nKandidater:\n{candidates}"
+
+
+def _single_shot_prompt(
+    pitch: str, startup_context: str, market: _CategoryTask, tech: _CategoryTask
+) -> str:
+    return (
+        f"{_category_section('market_category', market)}\n\n"
+        f"{_category_section('tech_category', tech)}\n\n"
+        f"Startup-data (kontekst):\n{startup_context}\n\n"
+        f'Pitch:\n"""{pitch}"""'
+    )
+
+
+def _parse_answer(raw: str) -> tuple[Optional[str], Optional[str], Dict[str, dict]]:
+    """(market_category, tech_category, gyldige VC-blokker) fra svaret."""
+    try:
+        answer = SingleShotAnswer.model_validate_json(raw)
+        blocks = {name: validate_vc_block(getattr(answer, name).model_dump()) for name in VC_BLOCKS}
+        return answer.market_category, answer.tech_category, blocks
+    except ValidationError as e:
+        LLM_PARSE_FAILURES.inc(kind="single_shot")
+        print(f"[single_shot] Svaret fulgte ikke skjemaet, bruker det som er gyldig: {e.error_count()} feil")
+
+    # Delvis/ødelagt svar: ta med gyldige blokker og kategorier som finnes
+    parser = VCStreamParser()
+    parser.feed(raw)
+    data = loads_tolerant(raw)
+    data = data if isinstance(data, dict) else {}
+    market = data.get("market_category")
+    tech = data.get("tech_category")
+    return (
+        market if isinstance(market, str) else None,
+        tech if isinstance(tech, str) else None,
+        parser.blocks,
+    )
+
+
+def _resolve(raw: Optional[str], task: _CategoryTask, matcher: CategoryMatcher) -> Optional[str]:
+    if not task.needs_llm:
+        return task.local
+    raw = (raw or "").strip().strip('"').strip("'")
+    if not raw:
+        return None
+    return resolve_llm_category(raw, matcher, task.candidates)
+
+
+async def analyze_single_shot_async(
+    idea_text: str,
+    startup_data: dict,
+    market_text: Optional[str],
+    tech_text: Optional[str],
+    matcher: CategoryMatcher,
+) -> Dict[str, Any]:
+    """
+    Mapping av marked/teknologi + VC-vurdering i ett Ollama-kall.
+
+    Returnerer {"market": kategori|None, "tech_service": kategori|None,
+    "vc": vc_result}. Kaster LLMOverloaded hvis kallet avvises av
+    adgangskontrollen, og andre unntak hvis Ollama ikke svarer.
+    """
+    market = _category_task(market_text, matcher)
+    tech = _category_task(tech_text, matcher)
+    startup_context = compact_json(compact_startup_data(startup_data))
+
+    prompt, _ = fit_prompt(
+        "single_shot",
+        lambda pitch: _single_shot_prompt(pitch, startup_context, market, tech),
+        idea_text,
+        prefix=SINGLE_SHOT_SYSTEM,
+    )
+    data = await generate_structured_async(
+        SINGLE_SHOT_SYSTEM, prompt, SINGLE_SHOT_FORMAT, kind="single_shot"
+    )
+    raw_market, raw_tech, blocks = _parse_answer(data.get("response", ""))
+    if not blocks:
+        raise ValueError(f"Fant ingen gyldige VC-blokker i responsen: {data.get('response', '')[:500]!r}")
+
+    return {
+        "market": _resolve(raw_market, market, matcher),
+        "tech_service": _resolve(raw_tech, tech, matcher),
+        "vc": vc_result_from_blocks(blocks),
+    }
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Gjør AI-modulene importerbare når pytest kjøres fra repo-roten eller AI-mappen."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
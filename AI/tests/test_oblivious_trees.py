@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Paritetstest: ObliviousTreesModel over JSON-eksporten skal gi samme
+sannsynlighet som CatBoostClassifier.predict_proba – også for CTR-er over
+kategori-kombinasjoner, ukjente kategorier og NaN i float-featurene.
+
+    cd AI
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_startups
+from oblivious_trees import UNKNOWN_CATEGORY_HASH, ObliviousTreesModel
+from scorers import load_python_export
+from train_startup_model import preprocess_features
+
+catboost = pytest.importorskip("catboost")
+
+TOLERANCE = 1e-9
+
+
+def _with_nans(X: pd.DataFrame, step: int) -> pd.DataFrame:
+    X = X.copy()
+    X.loc[::step, "funding_total_log"] = np.nan
+    X.loc[1::step, "funding_rounds"] = np.nan
+    return X
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    X, metadata = preprocess_features(synthetic_startups(1500, seed=5), is_train=True)
+    X = _with_nans(X, 11)
+    # Target fra et samspill mellom to kategorier, så trærne splitter på CTR-er over
+    # kategori-kombinasjoner (og kombinasjoner med binariserte floats)
+    rng = np.random.default_rng(5)
+    category = X["main_category"].astype("category").cat.codes % 2 == 0
+    city = X["city"].astype("category").cat.codes % 2 == 0
+    y = ((category ^ city) | (rng.random(len(X)) < 0.05)).astype(int)
+
+    model = catboost.CatBoostClassifier(
+        iterations=60,
+        depth=6,
+        max_ctr_complexity=3,
+        random_seed=5,
+        thread_count=1,
+        verbose=False,
+        allow_writing_files=False,
+        class_names=[0, 1],
+    )
+    pool = catboost.Pool(X, y, cat_features=metadata.cat_feature_indices)
+    model.fit(pool)
+
+    export_dir = tmp_path_factory.mktemp("export")
+    json_path = os.path.join(export_dir, "model.json")
+    python_path = os.path.join(export_dir, "model.py")
+    model.save_model(json_path, format="json")
+    model.save_model(python_path, format="python", pool=pool)
+    with open(json_path, encoding="utf-8") as f:
+        evaluator = ObliviousTreesModel(
+            json.load(f), load_python_export(python_path).cat_features_hashes, UNKNOWN_CATEGORY_HASH
+        )
+    return model, evaluator, metadata
+
+
+@pytest.fixture(scope="module")
+def rows(trained) -> pd.DataFrame:
+    _, _, metadata = trained
+    X, _ = preprocess_features(synthetic_startups(700, seed=11), metadata=metadata, is_train=False)
+    X = _with_nans(X, 7)
+    X.loc[::5, "city"] = "Atlantis"
+    X.loc[2::9, "main_category"] = "Underwater Mining"
+    return X
+
+
+def _reference(trained, X: pd.DataFrame) -> np.ndarray:
+    model, _, metadata = trained
+    return model.predict_proba(catboost.Pool(X, cat_features=metadata.cat_feature_indices))[:, 1]
+
+
+def test_model_uses_ctr_splits(trained):
+    _, evaluator, _ = trained
+    first_ctr = len(evaluator.float_flat)
+    ctr_rows = evaluator.condition_row[1:] - first_ctr
+    assert ((ctr_rows >= 0) & (ctr_rows < len(evaluator.ctr_group))).any()
+    # Minst én CTR over en kombinasjon av kategorier, og én med binariserte floats
+    assert ((evaluator.group_weight != 0).sum(axis=1) >= 2).any()
+    assert evaluator.ctr_pattern_weight.any()
+
+
+def test_batch_matches_catboost(trained, rows):
+    _, evaluator, _ = trained
+    got = evaluator.predict_proba(rows)
+    assert np.max(np.abs(got - _reference(trained, rows))) < TOLERANCE
+
+
+def test_row_lists_match_catboost(trained, rows):
+    _, evaluator, _ = trained
+    sample = rows.iloc[:40]
+    got = evaluator.predict_proba(sample.to_numpy(dtype=object).tolist())
+    assert np.max(np.abs(got - _reference(trained, sample))) < TOLERANCE
+
+
+def test_single_unknown_row_with_nans(trained, rows):
+    _, evaluator, _ = trained
+    row = rows.iloc[[0]]
+    assert row["city"].iloc[0] == "Atlantis" and np.isnan(row["funding_total_log"].iloc[0])
+    got = evaluator.predict_proba(row.to_numpy(dtype=object).tolist())
+    assert abs(got[0] - _reference(trained, row)[0]) < TOLERANCE
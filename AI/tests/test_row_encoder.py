@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Paritetstest: RowEncoder.encode skal gi nøyaktig samme feature-rad som
+preprocess_features(..., is_train=False) for én rad.
+
+    cd AI
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import math
+import random
+from typing import Any, Dict, List
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_startups
+from train_startup_model import (
+    PARITY_PROBE_ROWS,
+    PreprocessMetadata,
+    RowEncoder,
+    UnsupportedRowValue,
+    _same_feature_value,
+    check_row_encoder_parity,
+    preprocess_features,
+)
+
+
+@pytest.fixture(scope="module")
+def metadata() -> PreprocessMetadata:
+    _, metadata = preprocess_features(synthetic_startups(500, seed=3), is_train=True)
+    return metadata
+
+
+@pytest.fixture(scope="module")
+def encoder(metadata: PreprocessMetadata) -> RowEncoder:
+    return RowEncoder(metadata)
+
+
+def _pandas_row(startup_data: Dict[str, Any], metadata: PreprocessMetadata) -> List[Any]:
+    X, _ = preprocess_features(pd.DataFrame([startup_data]), metadata=metadata, is_train=False)
+    return [X[col].iloc[0] for col in X.columns]
+
+
+def _assert_same_row(encoder: RowEncoder, startup_data: Dict[str, Any]) -> None:
+    fast = encoder.encode(startup_data)
+    expected = _pandas_row(startup_data, encoder.metadata)
+    assert len(fast) == len(expected)
+    for col, a, b in zip(encoder.feature_cols, fast, expected):
+        assert _same_feature_value(a, b), f"{col}: {a!r} != {b!r} for {startup_data!r}"
+
+
+EDGE_CASES = [
+    pytest.param({"funding_total_usd": None, "funding_rounds": None, "city": None}, id="none"),
+    pytest.param({"funding_total_usd": math.nan, "funding_rounds": math.nan, "region": math.nan}, id="nan"),
+    pytest.param({"funding_total_usd": "", "funding_rounds": "", "country_code": "", "category_list": ""}, id="empty"),
+    pytest.param({"funding_total_usd": "-", "funding_rounds": 2}, id="funding-dash"),
+    pytest.param({"funding_total_usd": " - ", "funding_rounds": "3"}, id="funding-dash-padded"),
+    pytest.param({"country_code": "ZZZ", "city": "Atlantis", "category_list": "Underwater Mining"}, id="unseen"),
+    pytest.param({"category_list": "Software|Analytics|Mobile"}, id="multi-segment"),
+    pytest.param({"category_list": " |Health"}, id="blank-first-segment"),
+    pytest.param({"category_list": "|"}, id="only-pipe"),
+    pytest.param({"category_list": "  Games  |Education"}, id="padded-segment"),
+    pytest.param({"funding_total_usd": "5000000", "funding_rounds": "4"}, id="numeric-strings"),
+    pytest.param({"funding_total_usd": " 1.5e6 ", "funding_rounds": "2.0"}, id="numeric-strings-float"),
+    pytest.param({"funding_total_usd": "1,000", "funding_rounds": "x"}, id="non-numeric-strings"),
+    pytest.param({"funding_total_usd": -100.0, "funding_rounds": 2.5}, id="negative-and-fraction"),
+    pytest.param({"funding_total_usd": "1e400", "funding_rounds": "inf"}, id="overflow"),
+    pytest.param({"state_code": "19", "city": 42, "region": 1.5}, id="numeric-categories"),
+    pytest.param({"state_code": 19, "country_code": "19"}, id="int-and-string-category"),
+    pytest.param({}, id="no-columns"),
+]
+
+
+@pytest.mark.parametrize("startup_data", EDGE_CASES)
+def test_edge_cases_match_pandas(encoder: RowEncoder, startup_data: Dict[str, Any]) -> None:
+    _assert_same_row(encoder, startup_data)
+
+
+def test_parity_probe_rows_match_pandas(encoder: RowEncoder) -> None:
+    assert check_row_encoder_parity(encoder) == []
+    for startup_data in PARITY_PROBE_ROWS:
+        _assert_same_row(encoder, startup_data)
+
+
+def test_synthetic_requests_match_pandas(encoder: RowEncoder) -> None:
+    df = synthetic_startups(300, seed=11)
+    for startup_data in df.to_dict(orient="records"):
+        _assert_same_row(encoder, startup_data)
+
+
+_FUZZ_VALUES: Dict[str, List[Any]] = {
+    "funding_total_usd": [None, math.nan, "", "-", " - ", "0", "1000", " 2.5e6 ", "1,000", "abc", 0, 10, -5.5, 1e300],
+    "funding_rounds": [None, math.nan, "", "1", "2.0", "x", 0, 3, 1.5, -1],
+    "country_code": [None, math.nan, "", "USA", "NOR", "ZZZ", "19", 19, 1.5],
+    "state_code": [None, "", "CA", "19", 19, "Unknown"],
+    "region": [None, math.nan, "", "Oslo", "Nowhere", 3],
+    "city": [None, "", "Oslo", "Atlantis", 42, 0.0],
+    "category_list": [None, math.nan, "", " ", "|", "Software", "Software|Games", " |Health", "Games | Mobile |", "Ny|"],
+}
+
+
+def test_fuzzed_rows_match_pandas(encoder: RowEncoder) -> None:
+    rng = random.Random(1234)
+    for _ in range(500):
+        startup_data = {
+            col: rng.choice(values) for col, values in _FUZZ_VALUES.items() if rng.random() < 0.85
+        }
+        _assert_same_row(encoder, startup_data)
+
+
+def test_unsupported_values_are_rejected(encoder: RowEncoder) -> None:
+    with pytest.raises(UnsupportedRowValue):
+        encoder.encode({"city": True})
+    with pytest.raises(UnsupportedRowValue):
+        encoder.encode({"country_code": ["USA"]})
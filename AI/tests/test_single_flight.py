@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+SingleFlight: samtidige kall deles, og gjenbruksvinduet holder bare
+resultater som `reusable` godtar.
+
+    cd AI
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import asyncio
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight: SingleFlight[int] = SingleFlight(reuse_window=0)
+    calls = []
+
+    async def compute() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+
+
+def test_reuse_window_skips_results_that_are_not_reusable():
+    flight: SingleFlight[tuple] = SingleFlight(reuse_window=30, reusable=lambda r: r[1])
+    outcomes = iter([("data-only", False), ("full", True), ("unused", True)])
+
+    async def compute() -> tuple:
+        return next(outcomes)
+
+    async def main():
+        return [await flight.do("k", compute) for _ in range(3)]
+
+    first, second, third = asyncio.run(main())
+    assert first == ("data-only", False)
+    assert second == ("full", True)
+    assert third == ("full", True)
+    assert flight.executed == 2
+    assert flight.reused == 1
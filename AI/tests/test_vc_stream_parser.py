@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+VCStreamParser: en ødelagt blokk skal ikke stoppe strømmen eller ta med
+seg de gyldige blokkene rundt.
+
+    cd AI
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+from vc_stream_parser import VCStreamParser, loads_tolerant
+
+BROKEN_ESCAPE = (
+    '{"team": {"score": 7, "comment": "Sterkt team."},'
+    ' "market": {"score": 6 "comment": "C:\\q"},'
+    ' "product": {"score": 5.5, "comment": "OK produkt."}}'
+)
+
+
+def _feed_in_chunks(parser: VCStreamParser, text: str, size: int = 7):
+    blocks = []
+    for start in range(0, len(text), size):
+        blocks.extend(parser.feed(text[start:start + size]))
+    return blocks
+
+
+def test_invalid_escape_in_regex_fallback_keeps_raw_comment():
+    block = loads_tolerant('{"score": 6 "comment": "C:\\q"}')
+    assert block == {"score": "6", "comment": "C:\\q"}
+
+
+def test_invalid_escape_does_not_lose_later_blocks():
+    parser = VCStreamParser(required=("team", "market", "product"))
+    blocks = dict(_feed_in_chunks(parser, BROKEN_ESCAPE))
+
+    assert set(blocks) == {"team", "market", "product"}
+    assert blocks["market"] == {"score": 6.0, "comment": "C:\\q"}
+    assert blocks["product"]["score"] == 5.5
+    assert parser.complete
+
+
+def test_invalid_block_is_skipped_and_stream_continues():
+    text = (
+        '```json\n{"team": {"score": "høy"}, "market": {"score": "6,5",'
+        ' "comment": "Stort marked",}, "product": {"score": 12}}\n```'
+    )
+    parser = VCStreamParser(required=("team", "market", "product"))
+    blocks = dict(_feed_in_chunks(parser, text, size=3))
+
+    assert "team" not in blocks
+    assert blocks["market"] == {"score": 6.5, "comment": "Stort marked"}
+    assert blocks["product"] == {"score": 10.0, "comment": "Ingen kommentar."}
+    assert parser.missing == ["team"]
+    assert len(parser.errors) == 1
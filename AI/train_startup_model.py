@@ -22,16 +22,44 @@ Definisjon av "suksess":
 
 from __future__ import annotations
 
+import hashlib
+import json
+import math
 import os
+import shutil
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import joblib
 import numpy as np
 import pandas as pd
-from catboost import CatBoostClassifier, Pool
-from sklearn.metrics import classification_report, roc_auc_score
-from sklearn.model_selection import train_test_split
+
+from dataset_cache import load_dataset, source_sha256
+from metrics import stage
+from pool_cache import POOL_CACHE, TrainingPools, load_cached_pools, pool_cache_key, save_cached_pools
+from scorers import (
+    CATEGORY_HASHES_FILE,
+    EXPORT_BACKENDS,
+    EXPORT_INFO_FILE,
+    EXPORT_JSON_FILE,
+    EXPORT_PYTHON_FILE,
+    MODEL_EXPORT_DIR,
+    SCORER_TOLERANCE,
+    UNKNOWN_CATEGORY_HASH,
+    CatBoostScorer,
+    Scorer,
+    create_export_scorer,
+    load_python_export,
+    load_scorer,
+    max_probability_diff,
+)
+
+# CatBoost og scikit-learn importeres først når de trengs (trening, eller
+# scorer-backend "catboost"), så serving med en eksportert modell slipper dem
+if TYPE_CHECKING:
+    from catboost import CatBoostClassifier
 
 
 # ---------------------------------------------------------------------------
@@ -44,6 +72,49 @@ METADATA_PATH = "preprocess_metadata.joblib"
 
 RANDOM_STATE = 42
 MIN_OPERATING_YEARS = 3  # kan tunes
+VALIDATION_SIZE = 0.2
+
+# Øk når preprocess_features gir annen output (gamle kvantiserte pools i
+# pool-cachen brukes da ikke)
+PREPROCESS_VERSION = 1
+
+# Skriv standalone-eksporten (scorers.py) etter hver train_model
+MODEL_EXPORT = os.environ.get("MODEL_EXPORT", "1") not in ("0", "false", "no")
+# Antall datasett-rader eksporten sjekkes mot CatBoost på (i tillegg til PARITY_PROBE_ROWS)
+EXPORT_PARITY_ROWS = 500
+
+# CatBoost-hyperparametre – ganske konservative, med early stopping.
+# tune_startup_model.py søker over depth/learning_rate/l2_leaf_reg/border_count;
+# beste sett kan gis til train_model(params=...).
+CATBOOST_PARAMS: Dict[str, Any] = {
+    "loss_function": "Logloss",
+    "eval_metric": "AUC",
+    "iterations": 2000,
+    "learning_rate": 0.03,
+    "depth": 6,
+    "l2_leaf_reg": 3.0,
+    "random_seed": RANDOM_STATE,
+    "border_count": 128,
+    "auto_class_weights": "Balanced",
+    # Target er alltid 0/1. Faste class_names gir heltalls-labels (classes_ == [0, 1])
+    # også når treningspoolen kommer fra pool-cachen – kvantiserte pools lagrer
+    # labels som float, og init_model krever samme label-type ved inkrementell trening
+    "class_names": [0, 1],
+    "od_type": "Iter",
+    "od_wait": 50,  # early stopping
+}
+
+# Kolonner preprocess_features kan bruke som features (i denne rekkefølgen)
+FEATURE_CANDIDATES = [
+    "funding_total_usd",
+    "funding_total_log",
+    "funding_rounds",
+    "country_code",
+    "state_code",
+    "region",
+    "city",
+    "main_category",
+]
 
 
 # ---------------------------------------------------------------------------
@@ -65,13 +136,28 @@ class PreprocessMetadata:
 # Hjelpefunksjoner for target / labels
 # ---------------------------------------------------------------------------
 
-def _parse_dates(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
-    """Parser dato-kolonner til datetime (in-place-kopi)."""
-    df = df.copy()
-    for c in cols:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce")
-    return df
+def _codes_and_uniques(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Koder en kolonne som (koder, unike verdier) slik at kolonnen er
+    uniques[codes], med -1 for NaN/None. category-kolonner (fra
+    datasett-cachen) brukes direkte; andre faktoriseres.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(series)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _take_labels(labels: np.ndarray, codes: np.ndarray, missing: str) -> np.ndarray:
+    """labels[codes] der kode -1 (manglende verdi) gir `missing`."""
+    return np.append(labels, np.array([missing], dtype=object))[codes]
+
+
+def _date_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """Dato-kolonne som datetime (allerede parset fra datasett-cachen, eller parses her)."""
+    if pd.api.types.is_datetime64_any_dtype(df[col]):
+        return df[col]
+    return pd.to_datetime(df[col], errors="coerce")
 
 
 def build_target(
@@ -85,13 +171,16 @@ def build_target(
         success: pd.Series med 0/1 for henholdsvis ikke-suksess/suksess
         unknown_mask: pd.Series[bool] der True betyr: "Vi vet ikke utfallet ennå"
     """
-    df = _parse_dates(df, ["founded_at", "last_funding_at"])
-
-    status = df.get("status", pd.Series(index=df.index, dtype=object)).fillna("unknown")
-    status = status.str.lower()
+    # status.fillna("unknown").str.lower(), regnet ut på de unike verdiene
+    if "status" in df.columns:
+        codes, uniques = _codes_and_uniques(df["status"])
+        lowered = pd.Series(uniques, dtype=object).str.lower().to_numpy(dtype=object)
+        status = pd.Series(_take_labels(lowered, codes, "unknown"), index=df.index)
+    else:
+        status = pd.Series("unknown", index=df.index, dtype=object)
 
     # Alder (år) mellom founded_at og last_funding_at
-    age_years = (df["last_funding_at"] - df["founded_at"]).dt.days / 365.25
+    age_years = (_date_column(df, "last_funding_at") - _date_column(df, "founded_at")).dt.days / 365.25
     age_years = age_years.fillna(0)
 
     # Start med 0 overalt
@@ -125,6 +214,59 @@ def _extract_main_category(category_list_value: Any) -> str:
     return "Unknown"
 
 
+def _main_category_column(category_list: pd.Series) -> np.ndarray:
+    """
+    Vektorisert _extract_main_category: splitten gjøres med str-accessoren
+    på de unike verdiene i category_list, og mappes tilbake via kodene.
+    """
+    codes, uniques = _codes_and_uniques(category_list)
+    labels = np.full(len(uniques), "Unknown", dtype=object)
+
+    is_str = np.fromiter((isinstance(v, str) for v in uniques), dtype=bool, count=len(uniques))
+    text = pd.Series(uniques[is_str], dtype=object)
+    first = text.str.split("|", n=1).str[0].str.strip()
+    non_blank = (text.str.strip() != "").to_numpy()
+    labels[np.flatnonzero(is_str)[non_blank]] = first.to_numpy(dtype=object)[non_blank]
+
+    return _take_labels(labels, codes, "Unknown")
+
+
+def _is_text_column(series: pd.Series) -> bool:
+    return series.dtype == "O" or isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def _text_feature(series: pd.Series) -> pd.Series:
+    """
+    series.fillna("Unknown").astype(str) for en object-/category-kolonne,
+    men str() kjøres bare én gang per unike verdi.
+    """
+    if series.dtype == "O" and pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+        # Blandede typer (1, 1.0 og True faktoriseres sammen) – ta den sikre veien
+        return series.fillna("Unknown").astype(str)
+    codes, uniques = _codes_and_uniques(series)
+    labels = np.array([str(v) for v in uniques], dtype=object)
+    return pd.Series(_take_labels(labels, codes, "Unknown"), index=series.index, name=series.name)
+
+
+def _funding_to_numeric(funding: pd.Series) -> pd.Series:
+    """
+    pd.to_numeric(errors="coerce") der "-" og "" er ukjent. Kolonner med
+    bare strenger parses én gang per unike beløp.
+    """
+    if not _is_text_column(funding):
+        return pd.to_numeric(funding, errors="coerce")
+    if funding.dtype == "O" and pd.api.types.infer_dtype(funding, skipna=True) != "string":
+        funding = funding.where(~funding.isin(["-", ""]))
+        return pd.to_numeric(funding, errors="coerce")
+
+    codes, uniques = _codes_and_uniques(funding)
+    parsed = pd.Series(uniques, dtype=object)
+    parsed = pd.to_numeric(parsed.where(~parsed.isin(["-", ""])), errors="coerce").to_numpy()
+    if (codes == -1).any():
+        parsed = np.append(parsed, np.nan)
+    return pd.Series(parsed[codes], index=funding.index, name=funding.name)
+
+
 def preprocess_features(
     df: pd.DataFrame,
     metadata: Optional[PreprocessMetadata] = None,
@@ -142,6 +284,10 @@ def preprocess_features(
         * kategori: main_category (første kategori i 'category_list')
     - Bruker IKKE datoer eller avledede tidsdifferanser som input til modellen.
 
+    Input-rammen endres ikke og kopieres ikke: hver feature bygges som egen
+    kolonne, og tekstkolonner kodes via unike verdier (som category-dtype),
+    så store rammer (1M+ rader) ikke går gjennom Python rad for rad.
+
     Args:
         df: rådata (eller dict->DataFrame for enkel prediksjon)
         metadata: PreprocessMetadata fra trening (for test/prediksjon)
@@ -151,73 +297,58 @@ def preprocess_features(
         X: feature-matrise
         metadata: PreprocessMetadata (ny ved trening, gjenbrukt ved test/prediksjon)
     """
-    df = df.copy()
+    columns: Dict[str, Any] = {}
 
     # ---------- 1. Funding_total_usd → numerisk + log ----------
     if "funding_total_usd" in df.columns:
-        df["funding_total_usd"] = (
-            df["funding_total_usd"]
-            .replace("-", np.nan)
-            .replace("", np.nan)
-        )
-        df["funding_total_usd"] = pd.to_numeric(
-            df["funding_total_usd"], errors="coerce"
-        )
+        funding = _funding_to_numeric(df["funding_total_usd"])
+        columns["funding_total_usd"] = funding
 
         # Log-transform for å jevne ut skjevhet
-        df["funding_total_log"] = np.log1p(
-            df["funding_total_usd"].fillna(0.0).clip(lower=0.0)
-        )
+        columns["funding_total_log"] = np.log1p(funding.fillna(0.0).clip(lower=0.0))
     else:
-        df["funding_total_usd"] = 0.0
-        df["funding_total_log"] = 0.0
+        columns["funding_total_usd"] = 0.0
+        columns["funding_total_log"] = 0.0
 
     # ---------- 2. funding_rounds ----------
     if "funding_rounds" in df.columns:
-        df["funding_rounds"] = pd.to_numeric(
+        columns["funding_rounds"] = pd.to_numeric(
             df["funding_rounds"], errors="coerce"
         ).fillna(0).astype(float)
     else:
-        df["funding_rounds"] = 0.0
+        columns["funding_rounds"] = 0.0
 
     # ---------- 3. main_category fra category_list ----------
     if "category_list" in df.columns:
-        df["main_category"] = df["category_list"].apply(_extract_main_category)
+        columns["main_category"] = _main_category_column(df["category_list"])
     else:
-        df["main_category"] = "Unknown"
+        columns["main_category"] = "Unknown"
 
     # ---------- 4. Velg ut kolonner vi vil bruke som features ----------
-    feature_candidates = [
-        "funding_total_usd",
-        "funding_total_log",
-        "funding_rounds",
-        "country_code",
-        "state_code",
-        "region",
-        "city",
-        "main_category",
-    ]
     # Ta bare de som faktisk finnes i df (noen kan mangle)
-    feature_cols = [c for c in feature_candidates if c in df.columns]
-
-    df = df[feature_cols]
+    for col in FEATURE_CANDIDATES:
+        if col not in columns and col in df.columns:
+            columns[col] = df[col]
+    feature_cols = [c for c in FEATURE_CANDIDATES if c in columns]
+    X = pd.DataFrame({c: columns[c] for c in feature_cols}, index=df.index)
 
     # ---------- 5. Typing: kategori vs. numerisk ----------
     # Antakelse: alt som ikke er numerisk blir kategorisk.
-    for col in df.columns:
-        if df[col].dtype == "O":
-            df[col] = df[col].fillna("Unknown").astype(str)
-
-    num_cols = df.select_dtypes(exclude=["object"]).columns.tolist()
-    df[num_cols] = df[num_cols].fillna(0.0)
+    text_cols = set()
+    for col in X.columns:
+        if _is_text_column(X[col]):
+            X[col] = _text_feature(X[col])
+            text_cols.add(col)
+        else:
+            X[col] = X[col].fillna(0.0)
 
     # ---------- 6. Metadata / kolonne-orden ----------
     if is_train:
         # Lås kolonne-rekkefølgen for modellen
-        feature_cols = list(df.columns)
+        feature_cols = list(X.columns)
 
         # Kategoriske features = object-kolonner
-        cat_features = df.select_dtypes(include=["object"]).columns.tolist()
+        cat_features = [c for c in feature_cols if c in text_cols]
         cat_feature_indices = [feature_cols.index(c) for c in cat_features]
 
         metadata = PreprocessMetadata(
@@ -231,44 +362,239 @@ def preprocess_features(
 
         # Sørg for at alle feature_cols finnes, i riktig rekkefølge
         for col in metadata.feature_cols:
-            if col not in df.columns:
+            if col not in X.columns:
                 if col in metadata.cat_features:
-                    df[col] = "Unknown"
+                    X[col] = "Unknown"
+                    text_cols.add(col)
                 else:
-                    df[col] = 0.0
+                    X[col] = 0.0
 
         # Dropp eventuelle ekstra kolonner
-        df = df[metadata.feature_cols]
+        X = X[metadata.feature_cols]
 
-        # Sørg for riktig dtype
+        # Sørg for riktig dtype (tekstkolonnene fra steg 5 er allerede ferdige)
         for col in metadata.cat_features:
-            df[col] = df[col].fillna("Unknown").astype(str)
+            if col not in text_cols:
+                X[col] = X[col].fillna("Unknown").astype(str)
 
-        for col in df.columns:
+        for col in X.columns:
             if col not in metadata.cat_features:
-                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+                X[col] = pd.to_numeric(X[col], errors="coerce").fillna(0.0)
+
+    return X, metadata
 
-    return df, metadata
+
+
+# ---------------------------------------------------------------------------
+# Rask enkel-rad-encoder (uten pandas)
+# ---------------------------------------------------------------------------
+
+class UnsupportedRowValue(ValueError):
+    """Verdien kan ikke kodes garantert likt som pandas – bruk pandas-stien."""
+
+
+def _scalar_to_numeric(value: Any) -> float:
+    """
+    Skalar-versjon av pd.to_numeric(..., errors="coerce") for én celle.
+
+    Dekker None/str/int/float. Alt annet (bool, numpy-typer, ikke-ASCII-tall,
+    '1_000' osv.) der pandas og float() kan være uenige gir
+    UnsupportedRowValue, slik at kalleren faller tilbake til pandas.
+    """
+    if value is None:
+        return math.nan
+    if isinstance(value, bool):
+        raise UnsupportedRowValue(value)
+    if isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        if not -(2 ** 63) <= value < 2 ** 63:
+            raise UnsupportedRowValue(value)
+        return float(value)
+    if isinstance(value, str):
+        if not value.isascii() or "_" in value:
+            raise UnsupportedRowValue(value)
+        try:
+            number = float(value)
+        except ValueError:
+            return math.nan
+        if math.isinf(number) and "inf" not in value.lower():
+            return math.nan  # overflow ('1e400') blir NaN i pandas
+        return number
+    raise UnsupportedRowValue(value)
+
+
+class RowEncoder:
+    """
+    Mapper én startup-dict rett til en feature-rad i metadata.feature_cols-
+    rekkefølge, uten å gå via DataFrame.
+
+    Gir nøyaktig samme verdier som preprocess_features(..., is_train=False)
+    for vanlige input-typer (None/str/int/float). For andre verdier kastes
+    UnsupportedRowValue. Raden kan gis direkte til model.predict_proba.
+    """
+
+    def __init__(self, metadata: PreprocessMetadata) -> None:
+        self.metadata = metadata
+        self.feature_cols = list(metadata.feature_cols)
+        self._cat_features = set(metadata.cat_features)
+
+    @staticmethod
+    def _raw_features(startup_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Steg 1–4 i preprocess_features for én rad."""
+        raw: Dict[str, Any] = {}
+
+        if "funding_total_usd" in startup_data:
+            value = startup_data["funding_total_usd"]
+            if isinstance(value, str) and value in ("-", ""):
+                value = None
+            funding = _scalar_to_numeric(value)
+            raw["funding_total_usd"] = funding
+            # np.log1p som i pandas-stien (math.log1p kan avvike i siste bit)
+            raw["funding_total_log"] = float(np.log1p(
+                0.0 if math.isnan(funding) else max(funding, 0.0)
+            ))
+        else:
+            raw["funding_total_usd"] = 0.0
+            raw["funding_total_log"] = 0.0
+
+        if "funding_rounds" in startup_data:
+            rounds = _scalar_to_numeric(startup_data["funding_rounds"])
+            raw["funding_rounds"] = 0.0 if math.isnan(rounds) else rounds
+        else:
+            raw["funding_rounds"] = 0.0
+
+        raw["main_category"] = _extract_main_category(startup_data.get("category_list"))
+
+        for col in FEATURE_CANDIDATES:
+            if col not in raw and col in startup_data:
+                raw[col] = startup_data[col]
+
+        return raw
+
+    @staticmethod
+    def _as_category(value: Any) -> str:
+        if value is None:
+            return "Unknown"
+        if isinstance(value, str):
+            return value
+        if isinstance(value, bool):
+            raise UnsupportedRowValue(value)
+        if isinstance(value, float):
+            # Numerisk kolonne fylles med 0.0 før den gjøres om til streng
+            return "0.0" if math.isnan(value) else str(value)
+        if isinstance(value, int):
+            return str(value)
+        raise UnsupportedRowValue(value)
+
+    @staticmethod
+    def _as_number(value: Any) -> float:
+        if value is None:
+            return 0.0
+        number = _scalar_to_numeric(value)
+        return 0.0 if math.isnan(number) else number
+
+    def encode(self, startup_data: Dict[str, Any]) -> List[Any]:
+        raw = self._raw_features(startup_data)
+        row: List[Any] = []
+        for col in self.feature_cols:
+            is_cat = col in self._cat_features
+            if col not in raw:
+                row.append("Unknown" if is_cat else 0.0)
+            elif is_cat:
+                row.append(self._as_category(raw[col]))
+            else:
+                row.append(self._as_number(raw[col]))
+        return row
+
+
+# Kanttilfeller som sjekkes mot pandas-stien hver gang en modell lastes
+PARITY_PROBE_ROWS: List[Dict[str, Any]] = [
+    {
+        "funding_total_usd": "5000000",
+        "funding_rounds": 3,
+        "country_code": "USA",
+        "state_code": "CA",
+        "region": "San Francisco Bay Area",
+        "city": "San Francisco",
+        "category_list": "Software|Analytics",
+    },
+    {
+        "homepage_url": "http://example.com",
+        "category_list": "Unknown",
+        "subcategory": "Unknown",
+        "funding_total_usd": "0",
+        "funding_rounds": 0,
+        "country_code": "Unknown",
+        "state_code": "",
+        "region": "Unknown",
+        "city": "Unknown",
+    },
+    {"funding_total_usd": "-", "funding_rounds": "2", "category_list": " |Health"},
+    {"funding_total_usd": "", "funding_rounds": None, "category_list": None},
+    {"funding_total_usd": " 1.5e6 ", "funding_rounds": "x", "country_code": None},
+    {"funding_total_usd": -100.0, "funding_rounds": 2.5, "city": 42},
+    {"funding_total_usd": math.nan, "country_code": math.nan, "region": 1.5},
+    {"funding_total_usd": "1e400", "funding_rounds": "inf"},
+    {"funding_total_usd": "1,000", "category_list": "  "},
+    {},
+]
+
+
+def _same_feature_value(fast: Any, expected: Any) -> bool:
+    if isinstance(fast, str) or isinstance(expected, str):
+        return isinstance(fast, str) and isinstance(expected, str) and fast == expected
+    fast_f, expected_f = float(fast), float(expected)
+    if math.isnan(fast_f) or math.isnan(expected_f):
+        return math.isnan(fast_f) and math.isnan(expected_f)
+    return fast_f == expected_f
+
+
+def check_row_encoder_parity(
+    encoder: RowEncoder,
+    rows: Optional[Iterable[Dict[str, Any]]] = None,
+) -> List[str]:
+    """
+    Sammenligner RowEncoder mot preprocess_features rad for rad.
+
+    Returnerer en liste med avvik (tom liste = identisk). Rader encoderen
+    selv avviser (UnsupportedRowValue) hoppes over – de går via pandas uansett.
+    """
+    mismatches: List[str] = []
+    for startup_data in PARITY_PROBE_ROWS if rows is None else rows:
+        try:
+            fast = encoder.encode(startup_data)
+        except UnsupportedRowValue:
+            continue
+
+        X, _ = preprocess_features(
+            pd.DataFrame([startup_data]), metadata=encoder.metadata, is_train=False
+        )
+        expected = [X[col].iloc[0] for col in X.columns]
+
+        if len(fast) != len(expected) or not all(
+            _same_feature_value(a, b) for a, b in zip(fast, expected)
+        ):
+            mismatches.append(f"{startup_data!r}: {fast!r} != {expected!r}")
+    return mismatches
 
 
 # ---------------------------------------------------------------------------
 # Trening av modell
 # ---------------------------------------------------------------------------
 
-def train_model(
+def load_training_data(
     csv_path: str = DATA_PATH,
-    model_path: str = MODEL_PATH,
-    metadata_path: str = METADATA_PATH,
-) -> Tuple[CatBoostClassifier, PreprocessMetadata]:
+) -> Tuple[pd.DataFrame, pd.Series, PreprocessMetadata]:
     """
-    Leser data, bygger target, filtrerer ukjente utfall, preprocesser features
-    og trener CatBoost-modell. Lagre modell + metadata til disk.
+    Leser data, bygger target, filtrerer ukjente utfall og preprocesser
+    features. Returnerer (X, y, metadata).
     """
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"Fant ikke datasett: {csv_path}")
 
     print(f"Laster data fra {csv_path} ...")
-    df_raw = pd.read_csv(csv_path, low_memory=False)
+    df_raw = load_dataset(csv_path)
 
     print(f"Antall rader før filtrering: {len(df_raw)}")
 
@@ -286,12 +612,20 @@ def train_model(
 
     # Preprocess features
     X, metadata = preprocess_features(df, is_train=True)
+    return X, y, metadata
+
+
+def _split_pools(csv_path: str) -> TrainingPools:
+    from catboost import Pool
+    from sklearn.model_selection import train_test_split
+
+    X, y, metadata = load_training_data(csv_path)
 
     # Train/test-split
     X_train, X_valid, y_train, y_valid = train_test_split(
         X,
         y,
-        test_size=0.2,
+        test_size=VALIDATION_SIZE,
         random_state=RANDOM_STATE,
         stratify=y,
     )
@@ -306,22 +640,57 @@ def train_model(
         label=y_valid,
         cat_features=metadata.cat_feature_indices,
     )
+    return TrainingPools(train_pool, valid_pool, X_valid, y_valid, metadata)
 
-    # CatBoost-hyperparametre – ganske konservative, med early stopping
-    model = CatBoostClassifier(
-        loss_function="Logloss",
-        eval_metric="AUC",
-        iterations=2000,
-        learning_rate=0.03,
-        depth=6,
-        l2_leaf_reg=3.0,
-        random_seed=RANDOM_STATE,
-        border_count=128,
-        auto_class_weights="Balanced",
-        verbose=100,
-        od_type="Iter",
-        od_wait=50,  # early stopping
-    )
+
+def _training_pools(csv_path: str, border_count: int) -> TrainingPools:
+    """
+    Trenings- og valideringspool, kvantisert med border_count. Fra
+    pool-cachen når datasettet, preprocess-versjonen og split er uendret.
+    """
+    if not POOL_CACHE:
+        return _split_pools(csv_path)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Fant ikke datasett: {csv_path}")
+
+    key_parts = {
+        "dataset": source_sha256(csv_path),
+        "preprocess_version": PREPROCESS_VERSION,
+        "min_operating_years": MIN_OPERATING_YEARS,
+        "validation_size": VALIDATION_SIZE,
+        "random_state": RANDOM_STATE,
+        "border_count": border_count,
+    }
+    key = pool_cache_key(key_parts)
+    cached = load_cached_pools(key)
+    if cached is not None:
+        return cached._replace(y_valid=cached.y_valid.astype(int))
+
+    pools = _split_pools(csv_path)
+    save_cached_pools(key, pools, border_count, key_parts)
+    return pools
+
+
+def train_model(
+    csv_path: str = DATA_PATH,
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+    params: Optional[Dict[str, Any]] = None,
+) -> Tuple[CatBoostClassifier, PreprocessMetadata]:
+    """
+    Leser data, bygger target, filtrerer ukjente utfall, preprocesser features
+    og trener CatBoost-modell. Lagre modell + metadata til disk.
+
+    params overstyrer CATBOOST_PARAMS (f.eks. beste sett fra tune_startup_model).
+    Med MODEL_EXPORT skrives også eksporten scorer-backendene bruker.
+    """
+    from catboost import CatBoostClassifier, Pool
+    from sklearn.metrics import classification_report, roc_auc_score
+
+    params = {**CATBOOST_PARAMS, "verbose": 100, **(params or {})}
+    train_pool, valid_pool, X_valid, y_valid, metadata = _training_pools(csv_path, params["border_count"])
+
+    model = CatBoostClassifier(**params)
 
     print("\nStarter trening av CatBoost-modell ...")
     model.fit(
@@ -330,8 +699,11 @@ def train_model(
         use_best_model=True,
     )
 
-    # Evaluering
-    y_valid_proba = model.predict_proba(valid_pool)[:, 1]
+    # Evaluering (på rå features – CatBoost predikerer ikke på kvantiserte
+    # pools med kategoriske features)
+    y_valid_proba = model.predict_proba(
+        Pool(X_valid, cat_features=metadata.cat_feature_indices)
+    )[:, 1]
     auc = roc_auc_score(y_valid, y_valid_proba)
     y_valid_pred = (y_valid_proba >= 0.5).astype(int)
 
@@ -346,9 +718,103 @@ def train_model(
     print(f"\nModell lagret til: {model_path}")
     print(f"Preprocess-metadata lagret til: {metadata_path}")
 
+    if MODEL_EXPORT:
+        try:
+            export_model(csv_path, model_path, metadata_path)
+        except Exception as e:
+            print(f"[export] Eksport feilet, serving bruker catboost: {e}")
+
+    # Et varmt register i samme prosess skal plukke opp den nye modellen
+    get_model_registry(model_path, metadata_path).reload()
+
     return model, metadata
 
 
+# ---------------------------------------------------------------------------
+# Eksport til standalone-formater (scorer-backends)
+# ---------------------------------------------------------------------------
+
+def export_model(
+    csv_path: str = DATA_PATH,
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+    export_dir: str = MODEL_EXPORT_DIR,
+) -> Dict[str, Any]:
+    """
+    Skriver modellen til standalone-formater for scorers.py:
+    - model.json: CatBoosts JSON-eksport (trær, grenser og CTR-tabeller; backend "numpy")
+    - model.py: CatBoosts Python-eksport (backend "python")
+    - category_hashes.json: frossen tabell kategori-verdi → CatBoost-hash
+    - export_info.json: SHA-256 av modellfilen, feature-kolonner og avvik
+
+    Kategori-verdiene hentes fra hele datasettet. Hver backend sjekkes mot
+    CatBoost på EXPORT_PARITY_ROWS rader + PARITY_PROBE_ROWS, og eksporten
+    skrives ikke hvis avviket er større enn SCORER_TOLERANCE.
+
+    ONNX er ikke med: CatBoost eksporterer ikke modeller med kategoriske
+    features til ONNX.
+    """
+    from catboost import Pool
+
+    started = time.perf_counter()
+    model, metadata = load_trained_model_and_metadata(model_path, metadata_path)
+
+    X, _ = preprocess_features(load_dataset(csv_path), metadata=metadata, is_train=False)
+    probes, _ = preprocess_features(pd.DataFrame(PARITY_PROBE_ROWS), metadata=metadata, is_train=False)
+    X_check = pd.concat(
+        [X.sample(min(EXPORT_PARITY_ROWS, len(X)), random_state=RANDOM_STATE), probes],
+        ignore_index=True,
+    )
+
+    tmp = f"{os.path.normpath(export_dir)}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        model.save_model(os.path.join(tmp, EXPORT_JSON_FILE), format="json")
+        # Python-eksporten lager CatBoosts hash-tabell for alle kategori-verdiene
+        # i poolen; den samme tabellen lagres frittstående for JSON-eksporten
+        python_path = os.path.join(tmp, EXPORT_PYTHON_FILE)
+        model.save_model(python_path, format="python", pool=Pool(X, cat_features=metadata.cat_feature_indices))
+        category_hashes = getattr(load_python_export(python_path), "cat_features_hashes", {})
+        with open(os.path.join(tmp, CATEGORY_HASHES_FILE), "w", encoding="utf-8") as f:
+            json.dump({"unknown_hash": UNKNOWN_CATEGORY_HASH, "hashes": category_hashes}, f)
+
+        reference = CatBoostScorer(model, metadata.cat_feature_indices)
+        max_diff: Dict[str, float] = {}
+        for backend in EXPORT_BACKENDS:
+            diff = max_probability_diff(reference, create_export_scorer(backend, tmp, metadata), X_check)
+            if diff > SCORER_TOLERANCE:
+                raise ValueError(
+                    f"backend {backend} avviker {diff:.3g} fra CatBoost (grense {SCORER_TOLERANCE:g})"
+                )
+            max_diff[backend] = diff
+
+        info = {
+            "model_sha256": _file_sha256(model_path),
+            "metadata_sha256": _file_sha256(metadata_path),
+            "feature_cols": list(metadata.feature_cols),
+            "cat_features": list(metadata.cat_features),
+            "tree_count": model.tree_count_,
+            "category_values": len(category_hashes),
+            "parity_rows": len(X_check),
+            "max_probability_diff": max_diff,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(tmp, EXPORT_INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+
+        shutil.rmtree(export_dir, ignore_errors=True)
+        os.replace(tmp, export_dir)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(
+        f"[export] Eksporterte modellen til {export_dir} på {time.perf_counter() - started:.2f} s "
+        f"(maks avvik mot CatBoost: {max_diff})"
+    )
+    return info
+
+
 # ---------------------------------------------------------------------------
 # Prediksjon på nye startups
 # ---------------------------------------------------------------------------
@@ -365,6 +831,8 @@ def load_trained_model_and_metadata(
     if not os.path.exists(metadata_path):
         raise FileNotFoundError(f"Fant ikke metadatafil: {metadata_path}")
 
+    from catboost import CatBoostClassifier
+
     model = CatBoostClassifier()
     model.load_model(model_path)
     metadata: PreprocessMetadata = joblib.load(metadata_path)
@@ -372,6 +840,210 @@ def load_trained_model_and_metadata(
     return model, metadata
 
 
+# ---------------------------------------------------------------------------
+# Modell-register (varm modell per prosess)
+# ---------------------------------------------------------------------------
+
+def _file_fingerprint(path: str) -> Tuple[int, int]:
+    """(mtime_ns, størrelse) – billig sjekk av om en fil kan ha endret seg."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """Et ferdig lastet (modell, metadata)-par slik registeret deler det ut."""
+    scorer: Scorer  # CatBoost eller en eksportert backend (SCORER_BACKEND)
+    metadata: PreprocessMetadata
+    row_encoder: Optional[RowEncoder]  # None hvis paritetssjekken feilet
+    model_sha256: str
+    metadata_sha256: str
+    loaded_at: float
+
+
+class ModelRegistry:
+    """
+    Holder modellen (som Scorer, se scorers.py) og PreprocessMetadata varme
+    i minnet.
+
+    - Første kall til get() laster fra disk; senere kall gjenbruker objektene.
+    - Maks én gang per `check_interval` sekunder sjekkes mtime/størrelse på
+      filene. Ved endring sammenlignes SHA-256, og bare hvis innholdet faktisk
+      er nytt lastes modellen på nytt.
+    - Nytt par bygges ferdig før det byttes inn med én referansetilordning,
+      så samtidige kall ser enten gammel eller ny modell – aldri en blanding.
+    - Feiler omlasting (f.eks. halvskrevet fil) beholdes forrige modell.
+    """
+
+    def __init__(
+        self,
+        model_path: str = MODEL_PATH,
+        metadata_path: str = METADATA_PATH,
+        check_interval: float = 2.0,
+    ) -> None:
+        self.model_path = model_path
+        self.metadata_path = metadata_path
+        self.check_interval = check_interval
+
+        self._current: Optional[LoadedModel] = None
+        self._fingerprints: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _read_fingerprints(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        return _file_fingerprint(self.model_path), _file_fingerprint(self.metadata_path)
+
+    def _load(self, force: bool = False) -> LoadedModel:
+        """
+        Bygger nytt LoadedModel ferdig i en lokal variabel; self._current
+        byttes først når alt har lyktes, så en feil etterlater forrige modell.
+        """
+        fingerprints = self._read_fingerprints()
+        model_sha = _file_sha256(self.model_path)
+        metadata_sha = _file_sha256(self.metadata_path)
+
+        current = self._current
+        if (
+            not force
+            and current is not None
+            and current.model_sha256 == model_sha
+            and current.metadata_sha256 == metadata_sha
+        ):
+            # Kun mtime endret (touch / kopi av samme fil) – behold modellen
+            self._fingerprints = fingerprints
+            return current
+
+        metadata: PreprocessMetadata = joblib.load(self.metadata_path)
+        scorer = load_scorer(self.model_path, metadata, model_sha)
+
+        row_encoder: Optional[RowEncoder] = RowEncoder(metadata)
+        mismatches = check_row_encoder_parity(row_encoder)
+        if mismatches:
+            print(
+                "[ModelRegistry] RowEncoder avviker fra pandas-stien, bruker pandas:\n"
+                + "\n".join(mismatches)
+            )
+            row_encoder = None
+
+        loaded = LoadedModel(
+            scorer=scorer,
+            metadata=metadata,
+            row_encoder=row_encoder,
+            model_sha256=model_sha,
+            metadata_sha256=metadata_sha,
+            loaded_at=time.time(),
+        )
+        self._fingerprints = fingerprints
+        self._current = loaded
+        return loaded
+
+    def get(self) -> LoadedModel:
+        """Returnerer varm modell, og laster på nytt hvis filene er endret."""
+        current = self._current
+        now = time.monotonic()
+        if current is not None and now - self._last_check < self.check_interval:
+            return current
+
+        with self._lock:
+            current = self._current
+            if current is not None and now - self._last_check < self.check_interval:
+                return current
+            self._last_check = now
+
+            if current is None:
+                return self._load()
+
+            try:
+                if self._read_fingerprints() == self._fingerprints:
+                    return current
+                return self._load()
+            except Exception as e:
+                print(f"[ModelRegistry] Omlasting feilet, beholder forrige modell: {e}")
+                return current
+
+    def reload(self) -> LoadedModel:
+        """
+        Tvinger ny innlesing (f.eks. rett etter trening). Feiler den, beholdes
+        forrige modell som i get(); uten forrige modell kastes feilen.
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            current = self._current
+            try:
+                return self._load(force=True)
+            except Exception as e:
+                if current is None:
+                    raise
+                print(f"[ModelRegistry] Omlasting feilet, beholder forrige modell: {e}")
+                return current
+
+
+_REGISTRIES: Dict[Tuple[str, str], ModelRegistry] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def get_model_registry(
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+) -> ModelRegistry:
+    """Prosess-globalt register per (modellfil, metadatafil)."""
+    key = (os.path.abspath(model_path), os.path.abspath(metadata_path))
+    registry = _REGISTRIES.get(key)
+    if registry is None:
+        with _REGISTRIES_LOCK:
+            registry = _REGISTRIES.get(key)
+            if registry is None:
+                registry = ModelRegistry(model_path=model_path, metadata_path=metadata_path)
+                _REGISTRIES[key] = registry
+    return registry
+
+
+def _score_result(proba_success: float) -> Dict[str, Any]:
+    return {
+        "success_probability": proba_success,
+        "success_probability_percent": proba_success * 100.0,
+    }
+
+
+def predict_success_scores(
+    startups: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+    model_path: str = MODEL_PATH,
+    metadata_path: str = METADATA_PATH,
+) -> List[Dict[str, Any]]:
+    """
+    Batch-variant av predict_success_score.
+
+    Tar en liste med startup-dicts (eller en DataFrame med rådata-kolonner),
+    preprocesser alt i én omgang og scorer hele batchen med ett kall.
+    Returnerer én resultat-dict per rad, i samme rekkefølge som input.
+    """
+    if isinstance(startups, pd.DataFrame):
+        df_input = startups
+    else:
+        df_input = pd.DataFrame(list(startups))
+
+    if len(df_input) == 0:
+        return []
+
+    loaded = get_model_registry(model_path, metadata_path).get()
+
+    with stage("preprocess"):
+        X, _ = preprocess_features(df_input, metadata=loaded.metadata, is_train=False)
+
+    with stage("predict_proba"):
+        proba_success = loaded.scorer.predict_proba(X)
+
+    return [_score_result(float(p)) for p in proba_success]
+
+
 def predict_success_score(
     startup_data: Dict[str, Any],
     model_path: str = MODEL_PATH,
@@ -381,6 +1053,10 @@ def predict_success_score(
     Tar et dictionary med input om en startup, preprocesser på samme måte
     som i trening, og returnerer en sannsynlighet for suksess.
 
+    Modellen hentes fra det prosess-globale ModelRegistry, så disk-lesing og
+    unpickling skjer bare ved første kall eller når filene endres. Raden
+    kodes med RowEncoder (uten pandas) når det er mulig.
+
     Eksempel på startup_data:
     {
         "funding_total_usd": "5000000",
@@ -392,20 +1068,22 @@ def predict_success_score(
         "category_list": "Software|Analytics",
     }
     """
-    model, metadata = load_trained_model_and_metadata(
-        model_path=model_path, metadata_path=metadata_path
-    )
-
-    df_input = pd.DataFrame([startup_data])
-    X, _ = preprocess_features(df_input, metadata=metadata, is_train=False)
-
-    pool = Pool(X, cat_features=metadata.cat_feature_indices)
-    proba_success = float(model.predict_proba(pool)[0, 1])
-
-    return {
-        "success_probability": proba_success,
-        "success_probability_percent": proba_success * 100.0,
-    }
+    loaded = get_model_registry(model_path, metadata_path).get()
+
+    if loaded.row_encoder is not None:
+        try:
+            with stage("preprocess"):
+                row = loaded.row_encoder.encode(startup_data)
+        except UnsupportedRowValue:
+            pass
+        else:
+            with stage("predict_proba"):
+                proba = float(loaded.scorer.predict_proba([row])[0])
+            return _score_result(proba)
+
+    return predict_success_scores(
+        [startup_data], model_path=model_path, metadata_path=metadata_path
+    )[0]
 
 
 # ---------------------------------------------------------------------------
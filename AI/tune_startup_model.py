@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Hyperparameter-søk med stratifisert k-fold kryssvalidering for
+startup-modellen (CatBoost).
+
+- Data leses og preprocesses én gang (via datasett-cachen), og skrives til
+  en midlertidig Parquet-fil som worker-prosessene leser ved oppstart.
+- Hver worker bygger én Pool per fold én gang og gjenbruker dem for alle
+  trials den kjører.
+- Trials fordeles på en prosesspool; hver trial får et fast antall
+  CatBoost-tråder (thread_count), så workers * tråder ≈ antall kjerner.
+- Håpløse trials stoppes tidlig: etter --min-folds folds avbrytes en trial
+  hvis snitt-AUC så langt er mer enn --prune-margin under beste fullførte
+  trial. Innenfor hver fold stopper CatBoost selv (od_wait).
+- Hver trial legges til i en leaderboard-fil (JSON lines), merket med
+  SHA-256 av datasettet.
+
+Eksempler:
+    python tune_startup_model.py --trials 40 --folds 5 --workers 8
+    python tune_startup_model.py --show
+    python tune_startup_model.py --refit      # train_model med beste sett
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier, Pool
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from dataset_cache import source_sha256
+from train_startup_model import (
+    CATBOOST_PARAMS,
+    DATA_PATH,
+    METADATA_PATH,
+    MODEL_PATH,
+    RANDOM_STATE,
+    load_training_data,
+    train_model,
+)
+
+LEADERBOARD_PATH = os.environ.get("TUNING_LEADERBOARD", "tuning_leaderboard.jsonl")
+
+# Parameterne det søkes over. Lister trekkes uniformt, tupler log-uniformt.
+SEARCH_SPACE: Dict[str, Any] = {
+    "depth": [4, 5, 6, 7, 8],
+    "learning_rate": (0.01, 0.2),
+    "l2_leaf_reg": (1.0, 30.0),
+    "border_count": [32, 64, 128, 254],
+}
+TUNED_PARAMS = list(SEARCH_SPACE)
+
+STATUS_COMPLETE = "complete"
+STATUS_PRUNED = "pruned"
+STATUS_FAILED = "failed"
+
+_LABEL_COLUMN = "__label__"
+
+
+def sample_params(rng: random.Random) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    for name, space in SEARCH_SPACE.items():
+        if isinstance(space, tuple):
+            low, high = space
+            params[name] = round(math.exp(rng.uniform(math.log(low), math.log(high))), 4)
+        else:
+            params[name] = rng.choice(space)
+    return params
+
+
+# ---------------------------------------------------------------------------
+# Worker-prosess: én sett fold-Pools per prosess, gjenbrukt av alle trials
+# ---------------------------------------------------------------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(
+    data_path: str,
+    folds: List[Tuple[np.ndarray, np.ndarray]],
+    cat_feature_indices: List[int],
+    best_auc: Any,
+    thread_count: int,
+) -> None:
+    X = pd.read_parquet(data_path)
+    y = X.pop(_LABEL_COLUMN).to_numpy()
+
+    pools = []
+    for train_idx, valid_idx in folds:
+        train_pool = Pool(X.iloc[train_idx], label=y[train_idx], cat_features=cat_feature_indices)
+        valid_pool = Pool(X.iloc[valid_idx], label=y[valid_idx], cat_features=cat_feature_indices)
+        pools.append((train_pool, valid_pool, y[valid_idx]))
+
+    _WORKER.update(pools=pools, best_auc=best_auc, thread_count=thread_count)
+
+
+def run_trial(
+    trial_id: int,
+    params: Dict[str, Any],
+    base_params: Dict[str, Any],
+    min_folds: int,
+    prune_margin: float,
+) -> Dict[str, Any]:
+    """Kryssvaliderer ett parametersett i en worker. Kaster ikke – feil blir status."""
+    started = time.perf_counter()
+    fold_aucs: List[float] = []
+    best_iterations: List[int] = []
+    status = STATUS_COMPLETE
+    error = None
+
+    try:
+        for i, (train_pool, valid_pool, y_valid) in enumerate(_WORKER["pools"]):
+            model = CatBoostClassifier(
+                **{
+                    **base_params,
+                    **params,
+                    "thread_count": _WORKER["thread_count"],
+                    "verbose": False,
+                    "allow_writing_files": False,
+                }
+            )
+            model.fit(train_pool, eval_set=valid_pool, use_best_model=True)
+            fold_aucs.append(float(roc_auc_score(y_valid, model.predict_proba(valid_pool)[:, 1])))
+            best_iterations.append(int(model.get_best_iteration() or 0))
+
+            best = _WORKER["best_auc"].value
+            if i + 1 >= min_folds and best > 0 and statistics.mean(fold_aucs) < best - prune_margin:
+                status = STATUS_PRUNED
+                break
+    except Exception as exc:  # en ugyldig kombinasjon skal ikke stoppe søket
+        status, error = STATUS_FAILED, str(exc)
+
+    return {
+        "trial": trial_id,
+        "status": status,
+        "params": params,
+        "mean_auc": statistics.mean(fold_aucs) if fold_aucs else None,
+        "std_auc": statistics.stdev(fold_aucs) if len(fold_aucs) > 1 else 0.0,
+        "fold_aucs": fold_aucs,
+        "best_iterations": best_iterations,
+        "seconds": round(time.perf_counter() - started, 2),
+        "error": error,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Leaderboard
+# ---------------------------------------------------------------------------
+
+def append_leaderboard(entry: Dict[str, Any], path: str = LEADERBOARD_PATH) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def read_leaderboard(path: str = LEADERBOARD_PATH, dataset: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Fullførte trials, best først (valgfritt bare for ett datasett)."""
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("status") != STATUS_COMPLETE:
+                continue
+            if dataset is not None and entry.get("dataset") != dataset:
+                continue
+            entries.append(entry)
+    return sorted(entries, key=lambda e: e["mean_auc"], reverse=True)
+
+
+def print_leaderboard(entries: List[Dict[str, Any]], top: int = 10) -> None:
+    if not entries:
+        print("Leaderboard er tom.")
+        return
+    print(f"{'#':>3} {'AUC':>8} {'±':>7} {'depth':>6} {'lr':>8} {'l2':>8} {'borders':>8} {'iter':>6} {'sek':>7}  run")
+    for rank, e in enumerate(entries[:top], start=1):
+        p = e["params"]
+        iterations = int(statistics.median(e["best_iterations"])) if e["best_iterations"] else 0
+        print(
+            f"{rank:>3} {e['mean_auc']:>8.4f} {e['std_auc']:>7.4f} {p['depth']:>6} "
+            f"{p['learning_rate']:>8.4f} {p['l2_leaf_reg']:>8.3f} {p['border_count']:>8} "
+            f"{iterations:>6} {e['seconds']:>7.1f}  {e.get('run_id', '')}"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Søk
+# ---------------------------------------------------------------------------
+
+def tune(
+    csv_path: str = DATA_PATH,
+    trials: int = 20,
+    folds: int = 5,
+    workers: Optional[int] = None,
+    threads_per_trial: Optional[int] = None,
+    min_folds: int = 2,
+    prune_margin: float = 0.01,
+    iterations: int = CATBOOST_PARAMS["iterations"],
+    od_wait: int = CATBOOST_PARAMS["od_wait"],
+    seed: int = RANDOM_STATE,
+    leaderboard_path: str = LEADERBOARD_PATH,
+) -> List[Dict[str, Any]]:
+    """
+    Kjører søket og returnerer alle trial-resultater (også stoppede).
+    Første trial er alltid dagens CATBOOST_PARAMS, som referanse.
+    """
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, trials))
+    threads_per_trial = threads_per_trial or max(1, cpus // workers)
+
+    dataset = source_sha256(csv_path)
+    X, y, metadata = load_training_data(csv_path)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    fold_indices = list(splitter.split(X, y))
+
+    rng = random.Random(seed)
+    candidates = [{name: CATBOOST_PARAMS[name] for name in TUNED_PARAMS}]
+    candidates += [sample_params(rng) for _ in range(trials - 1)]
+    base_params = {**CATBOOST_PARAMS, "iterations": iterations, "od_wait": od_wait}
+
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    print(
+        f"[tune] {len(candidates)} trials, {folds} folds, {workers} workers x "
+        f"{threads_per_trial} tråder, {len(X)} rader (run {run_id})"
+    )
+
+    ctx = mp.get_context("spawn")
+    best_auc = ctx.Value("d", 0.0)
+    results: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "train.parquet")
+        X.assign(**{_LABEL_COLUMN: y.to_numpy()}).to_parquet(data_path, index=False)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(data_path, fold_indices, metadata.cat_feature_indices, best_auc, threads_per_trial),
+        ) as pool:
+            futures = [
+                pool.submit(run_trial, i, params, base_params, min_folds, prune_margin)
+                for i, params in enumerate(candidates)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["status"] == STATUS_COMPLETE and result["mean_auc"] > best_auc.value:
+                    best_auc.value = result["mean_auc"]
+
+                entry = {
+                    "run_id": run_id,
+                    "dataset": dataset,
+                    "folds": folds,
+                    "timestamp": time.time(),
+                    **result,
+                }
+                append_leaderboard(entry, leaderboard_path)
+                results.append(entry)
+
+                auc = f"{result['mean_auc']:.4f}" if result["mean_auc"] is not None else "-"
+                print(
+                    f"[tune] trial {result['trial']:>3} {result['status']:<8} AUC={auc} "
+                    f"({len(result['fold_aucs'])}/{folds} folds, {result['seconds']:.1f} s) {result['params']}"
+                )
+
+    print(f"[tune] Ferdig på {time.perf_counter() - started:.1f} s, beste AUC {best_auc.value:.4f}")
+    return results
+
+
+def best_params(dataset: str, path: str = LEADERBOARD_PATH) -> Optional[Dict[str, Any]]:
+    entries = read_leaderboard(path, dataset=dataset)
+    return dict(entries[0]["params"]) if entries else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DATA_PATH)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="prosesser (standard: antall kjerner, maks trials)")
+    parser.add_argument("--threads-per-trial", type=int, help="CatBoost thread_count per trial")
+    parser.add_argument("--min-folds", type=int, default=2, help="folds før en trial kan stoppes")
+    parser.add_argument("--prune-margin", type=float, default=0.01, help="AUC under beste før stopp")
+    parser.add_argument("--iterations", type=int, default=CATBOOST_PARAMS["iterations"])
+    parser.add_argument("--od-wait", type=int, default=CATBOOST_PARAMS["od_wait"])
+    parser.add_argument("--seed", type=int, default=RANDOM_STATE)
+    parser.add_argument("--leaderboard", default=LEADERBOARD_PATH)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--show", action="store_true", help="vis leaderboard og avslutt")
+    parser.add_argument("--refit", action="store_true", help="tren train_model med beste sett for datasettet")
+    args = parser.parse_args()
+
+    if args.show:
+        print_leaderboard(read_leaderboard(args.leaderboard), args.top)
+        return
+
+    if args.refit:
+        params = best_params(source_sha256(args.csv), args.leaderboard)
+        if params is None:
+            raise SystemExit("Ingen fullførte trials for dette datasettet – kjør søket først.")
+        print(f"[tune] Trener med beste sett: {params}")
+        train_model(csv_path=args.csv, model_path=MODEL_PATH, metadata_path=METADATA_PATH, params=params)
+        return
+
+    tune(
+        csv_path=args.csv,
+        trials=args.trials,
+        folds=args.folds,
+        workers=args.workers,
+        threads_per_trial=args.threads_per_trial,
+        min_folds=args.min_folds,
+        prune_margin=args.prune_margin,
+        iterations=args.iterations,
+        od_wait=args.od_wait,
+        seed=args.seed,
+        leaderboard_path=args.leaderboard,
+    )
+    print()
+    print_leaderboard(read_leaderboard(args.leaderboard, dataset=source_sha256(args.csv)), args.top)
+
+
+if __name__ == "__main__":
+    main()
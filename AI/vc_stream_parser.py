@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Inkrementell, tolerant lesing av VC-JSON-en mens LLaMA genererer den.
+
+LLaMA skal skrive ett toppnivå-objekt med én blokk per VC-kategori:
+
+    {"team": {"score": 6.5, "comment": "..."}, "market": {...}, ...}
+
+VCStreamParser tar imot tekstbiter (tokens) etter hvert som de kommer og
+gir hver blokk ("navn", {"score": float, "comment": str}) så snart dens
+avsluttende } er lest. Den er tolerant for vanlige avvik fra modellen:
+- tekst eller ```json-gjerder før/etter JSON-en
+- blokkene pakket inn i et ekstra objekt ({"evaluation": {"team": ...}})
+- etterfølgende komma, score som streng ("6,5") eller utenfor 0–10
+- en ødelagt blokk stopper ikke resten; gyldige blokker beholdes
+
+Når alle påkrevde blokker er lest er `complete` True, og kalleren kan
+avbryte genereringen i stedet for å vente på resten av svaret.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+VC_BLOCKS = ("team", "market", "product", "potential", "valuation", "product_market_fit")
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SCORE_RE = re.compile(r'"score"\s*:\s*"?(-?\d+(?:[.,]\d+)?)')
+_COMMENT_RE = re.compile(r'"comment"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+
+
+def coerce_score(value: Any) -> Optional[float]:
+    """Score som flyttall klemt til 0–10 (tall eller streng, også med komma), ellers None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        score = float(value)
+    elif isinstance(value, str):
+        try:
+            score = float(value.strip().replace(",", "."))
+        except ValueError:
+            return None
+    else:
+        return None
+    if score != score:  # NaN
+        return None
+    return min(max(score, 0.0), 10.0)
+
+
+def validate_vc_block(value: Any) -> Optional[Dict[str, Any]]:
+    """Normaliserer en blokk til {"score", "comment"}, eller None hvis ugyldig."""
+    if not isinstance(value, dict):
+        return None
+    score = coerce_score(value.get("score"))
+    if score is None:
+        return None
+    comment = value.get("comment")
+    comment = comment.strip() if isinstance(comment, str) else ""
+    return {"score": score, "comment": comment or "Ingen kommentar."}
+
+
+def loads_tolerant(text: str) -> Any:
+    """json.loads med noen reparasjoner før vi gir opp."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+    except json.JSONDecodeError:
+        pass
+    # Siste utvei: plukk ut score/comment med regex
+    score = _SCORE_RE.search(text)
+    if score is None:
+        return None
+    comment = _COMMENT_RE.search(text)
+    return {"score": score.group(1), "comment": _unescape(comment.group(1)) if comment else ""}
+
+
+def _unescape(raw: str) -> str:
+    """JSON-streng uten anførselstegn; ugyldige escapes (f.eks. "C:\\q") gir råteksten."""
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+
+class VCStreamParser:
+    """
+    Tegn-for-tegn tilstandsmaskin over hele svaret. Hvert objekt som åpnes
+    husker nøkkelen foran seg; når et objekt med et kjent blokk-navn lukkes,
+    tolkes og valideres teksten det dekker.
+    """
+
+    def __init__(self, required: Iterable[str] = VC_BLOCKS) -> None:
+        self.required = tuple(required)
+        self.blocks: Dict[str, Dict[str, Any]] = {}
+        self.errors: List[str] = []
+
+        self._text: List[str] = []
+        self._pos = 0
+        self._stack: List[Tuple[Optional[str], int]] = []  # (nøkkel, startposisjon)
+
+        self._in_string = False
+        self._escape = False
+        self._string_buf: List[str] = []
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return all(name in self.blocks for name in self.required)
+
+    @property
+    def missing(self) -> List[str]:
+        return [name for name in self.required if name not in self.blocks]
+
+    def feed(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Leser mer tekst og returnerer blokkene som ble ferdige og gyldige nå."""
+        completed: List[Tuple[str, Dict[str, Any]]] = []
+        self._text.append(text)
+
+        for ch in text:
+            pos = self._pos
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string_buf)
+                else:
+                    self._string_buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_buf = []
+                self._last_string = None
+            elif ch == ":":
+                self._pending_key = self._last_string
+            elif ch == "{":
+                self._stack.append((self._pending_key, pos))
+                self._pending_key = None
+                self._last_string = None
+            elif ch == "}":
+                self._pending_key = None
+                if self._stack:
+                    key, start = self._stack.pop()
+                    block = self._finish_object(key, start, pos + 1)
+                    if block is not None:
+                        completed.append(block)
+            elif ch == ",":
+                self._pending_key = None
+                self._last_string = None
+
+        return completed
+
+    def _finish_object(
+        self, key: Optional[str], start: int, end: int
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if key not in self.required or key in self.blocks:
+            return None
+
+        text = "".join(self._text)
+        self._text = [text]
+        block = validate_vc_block(loads_tolerant(text[start:end]))
+        if block is None:
+            self.errors.append(f"Ugyldig blokk '{key}': {text[start:end][:200]!r}")
+            return None
+
+        self.blocks[key] = block
+        return key, block
@@ -133,41 +133,83 @@ function simulateAiAnalysis(title: string, content: string): AiAnalysis {
   };
 }
 
+type AiAnalysisResponse = {
+  score: number;
+  strengths: string[];
+  weaknesses: string[];
+  summary: string;
+  explanation?: string | null;
+  data_score?: number;
+  idea_score?: number;
+  combined_score?: number;
+  dataScore?: number;
+  ideaScore?: number;
+  combinedScore?: number;
+};
+
+type AiJobResponse = {
+  job_id: string;
+  status: "queued" | "running" | "done" | "failed";
+  deduplicated?: boolean;
+  result?: AiAnalysisResponse | null;
+  error?: string | null;
+};
+
+// Hvor lenge vi venter totalt på en analyse, og hvor lenge hvert long-poll-kall holdes
+const aiJobTimeoutMs = Number(process.env.AI_JOB_TIMEOUT_MS ?? 150_000);
+const aiPollWaitSeconds = Number(process.env.AI_POLL_WAIT_SECONDS ?? 20);
+const aiRequestSlackMs = 5_000;
+
+async function fetchAiJob(url: string, init: RequestInit, timeoutMs: number): Promise<AiJobResponse> {
+  const res = await fetch(url, { ...init, signal: AbortSignal.timeout(timeoutMs) });
+  if (!res.ok) {
+    throw new Error(`AI-tjenesten svarte ${res.status}`);
+  }
+  return (await res.json()) as AiJobResponse;
+}
+
 async function callAiService(payload: IdeaBody): Promise<AiAnalysis> {
+  const deadline = Date.now() + aiJobTimeoutMs;
   try {
-    const res = await fetch(`${aiApiUrl}/analyze`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        title: payload.title,
-        content: payload.content,
-        market: payload.market,
-        tech_service: payload.techService,
-        country: payload.country,
-        region: payload.region,
-        city: payload.city,
-        funding_total: payload.fundingTotal,
-        funding_rounds: payload.fundingRounds,
-        team_description: payload.team,
-      }),
-    });
+    // Send inn jobben (svarer med en gang), og hent resultatet med long-poll
+    let job = await fetchAiJob(
+      `${aiApiUrl}/analyze/jobs`,
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          title: payload.title,
+          content: payload.content,
+          market: payload.market,
+          tech_service: payload.techService,
+          country: payload.country,
+          region: payload.region,
+          city: payload.city,
+          funding_total: payload.fundingTotal,
+          funding_rounds: payload.fundingRounds,
+          team_description: payload.team,
+        }),
+      },
+      aiRequestSlackMs
+    );
+
+    while (job.status === "queued" || job.status === "running") {
+      const remainingMs = deadline - Date.now();
+      if (remainingMs <= 0) {
+        throw new Error(`AI-jobben ${job.job_id} ble ikke ferdig innen ${aiJobTimeoutMs} ms`);
+      }
+      const waitSeconds = Math.max(1, Math.min(aiPollWaitSeconds, Math.floor(remainingMs / 1000)));
+      job = await fetchAiJob(
+        `${aiApiUrl}/analyze/jobs/${job.job_id}?wait=${waitSeconds}`,
+        { method: "GET" },
+        waitSeconds * 1000 + aiRequestSlackMs
+      );
+    }
 
-    if (!res.ok) {
-      throw new Error(`AI-tjenesten svarte ${res.status}`);
+    if (job.status !== "done" || !job.result) {
+      throw new Error(`AI-jobben feilet: ${job.error ?? "ukjent feil"}`);
     }
-    const data = (await res.json()) as {
-      score: number;
-      strengths: string[];
-      weaknesses: string[];
-      summary: string;
-      explanation?: string | null;
-      data_score?: number;
-      idea_score?: number;
-      combined_score?: number;
-      dataScore?: number;
-      ideaScore?: number;
-      combinedScore?: number;
-    };
+    const data = job.result;
 
     return {
       score: data.score,